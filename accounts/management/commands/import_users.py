@@ -0,0 +1,261 @@
+# accounts/management/commands/import_users.py
+
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import json
+import os
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+User = get_user_model()
+
+FIELDS = ('username', 'email', 'password', 'first_name', 'last_name', 'role')
+
+
+def hash_password(password):
+    # runs in the worker processes, which inherit the configured Django on fork
+    return make_password(password)
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates users from a CSV (header row) or NDJSON file with the columns "
+        "username, email, password and optionally first_name, last_name, role. "
+        "Passwords are hashed in a process pool; rows that fail validation are "
+        "reported and skipped without stopping the import."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or - for stdin")
+        parser.add_argument(
+            '--format',
+            choices=('csv', 'ndjson'),
+            help='Input format (defaults to the file extension, csv for stdin)',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Password hashing processes',
+        )
+        parser.add_argument(
+            '--errors',
+            help='Also write rejected rows as NDJSON to this file',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate only; nothing is hashed or written',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        self.dry_run = options['dry_run']
+        self.errors_file = open(options['errors'], 'w') if options['errors'] else None
+        self.seen_usernames = set()
+        self.seen_emails = set()
+        self.created = 0
+        self.rejected = 0
+        self.hash_seconds = 0.0
+        self.workers = options['workers']
+
+        started = time.monotonic()
+        try:
+            with self.open_input(path) as fh, ProcessPoolExecutor(max_workers=options['workers']) as pool:
+                self.pool = pool
+                batch = []
+                for line_no, row in self.read_rows(fh, input_format):
+                    batch.append((line_no, row))
+                    if len(batch) >= options['batch_size']:
+                        self.import_batch(batch)
+                        batch = []
+                if batch:
+                    self.import_batch(batch)
+        finally:
+            if self.errors_file:
+                self.errors_file.close()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Validated' if self.dry_run else 'Created'} {self.created} users, "
+            f"rejected {self.rejected} rows in {elapsed:.1f}s "
+            f"({(self.created + self.rejected) / max(elapsed, 1e-9):.0f} rows/s, "
+            f"hashing {self.hash_seconds:.1f}s with {options['workers']} workers)"
+        ))
+
+    def open_input(self, path):
+        if path == '-':
+            return open(sys.stdin.fileno(), encoding='utf-8', newline='', closefd=False)
+        try:
+            return open(path, encoding='utf-8', newline='')
+        except OSError as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+
+    def read_rows(self, fh, input_format):
+        """
+        Yields (line number, dict) one row at a time; unparseable lines are
+        reported and skipped.
+        """
+        if input_format == 'csv':
+            reader = csv.DictReader(fh)
+            missing = {'username', 'email', 'password'} - set(reader.fieldnames or ())
+            if missing:
+                raise CommandError(f"CSV header is missing: {', '.join(sorted(missing))}")
+            for row in reader:
+                yield reader.line_num, row
+            return
+
+        for line_no, line in enumerate(fh, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                self.reject(line_no, {}, {'row': [f'Invalid JSON: {e}']})
+                continue
+            if not isinstance(row, dict):
+                self.reject(line_no, {}, {'row': ['Expected a JSON object']})
+                continue
+            yield line_no, row
+
+    def clean(self, row):
+        """
+        Returns (cleaned row, errors) using the same rules as RegisterView
+        plus AUTH_PASSWORD_VALIDATORS.
+        """
+        data = {field: str(row.get(field) or '').strip() for field in FIELDS}
+        data['password'] = str(row.get('password') or '')
+        data['role'] = data['role'] or User.Role.USER
+        errors = {}
+
+        username = data['username']
+        if not username:
+            errors['username'] = ['This field is required']
+        elif len(username) < 3:
+            errors['username'] = ['Username must be at least 3 characters']
+        elif len(username) > 150:
+            errors['username'] = ['Username must be less than 150 characters']
+        elif username.lower() in self.seen_usernames:
+            errors['username'] = ['Duplicate username in this file']
+
+        email = data['email']
+        if not email:
+            errors['email'] = ['This field is required']
+        elif '@' not in email or '.' not in email:
+            errors['email'] = ['Enter a valid email address']
+        elif email.lower() in self.seen_emails:
+            errors['email'] = ['Duplicate email in this file']
+
+        if data['role'] not in User.Role.values:
+            errors['role'] = [f"Must be one of {', '.join(User.Role.values)}"]
+
+        if not data['password']:
+            errors['password'] = ['This field is required']
+        else:
+            try:
+                validate_password(data['password'], User(username=username, email=email))
+            except ValidationError as e:
+                errors['password'] = list(e.messages)
+
+        return data, errors
+
+    def import_batch(self, batch):
+        candidates = []
+        for line_no, row in batch:
+            data, errors = self.clean(row)
+            if errors:
+                self.reject(line_no, row, errors)
+                continue
+            self.seen_usernames.add(data['username'].lower())
+            self.seen_emails.add(data['email'].lower())
+            candidates.append((line_no, data))
+
+        candidates = self.drop_existing(candidates)
+        if self.dry_run or not candidates:
+            self.created += len(candidates)
+            return
+
+        started = time.monotonic()
+        hashes = self.pool.map(
+            hash_password,
+            [data['password'] for _, data in candidates],
+            chunksize=max(1, len(candidates) // (self.workers * 4)),
+        )
+        users = [
+            User(
+                username=data['username'],
+                email=data['email'],
+                password=password_hash,
+                first_name=data['first_name'],
+                last_name=data['last_name'],
+                role=data['role'],
+            )
+            for (_, data), password_hash in zip(candidates, hashes)
+        ]
+        self.hash_seconds += time.monotonic() - started
+
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+            self.created += len(users)
+        except IntegrityError:
+            # someone registered one of these names meanwhile; find out which row
+            for (line_no, data), user in zip(candidates, users):
+                try:
+                    with transaction.atomic():
+                        user.save()
+                    self.created += 1
+                except IntegrityError as e:
+                    self.reject(line_no, data, {'row': [str(e)]})
+
+        self.stdout.write(f"Created {self.created} users, rejected {self.rejected} rows")
+
+    def drop_existing(self, candidates):
+        """
+        Rejects rows whose username or email already exists, case-insensitively,
+        with one query per field for the whole batch.
+        """
+        if not candidates:
+            return candidates
+
+        usernames = {data['username'].lower() for _, data in candidates}
+        emails = {data['email'].lower() for _, data in candidates}
+        taken_usernames = set(
+            User.objects.annotate(key=Lower('username'))
+            .filter(key__in=usernames).values_list('key', flat=True)
+        )
+        taken_emails = set(
+            User.objects.annotate(key=Lower('email'))
+            .filter(key__in=emails).values_list('key', flat=True)
+        )
+
+        kept = []
+        for line_no, data in candidates:
+            errors = {}
+            if data['username'].lower() in taken_usernames:
+                errors['username'] = ['This username is already taken']
+            if data['email'].lower() in taken_emails:
+                errors['email'] = ['This email is already registered']
+            if errors:
+                self.reject(line_no, data, errors)
+            else:
+                kept.append((line_no, data))
+        return kept
+
+    def reject(self, line_no, row, errors):
+        self.rejected += 1
+        summary = '; '.join(f"{field}: {' '.join(messages)}" for field, messages in errors.items())
+        self.stderr.write(f"Line {line_no}: {row.get('username', '')} | {summary}")
+        if self.errors_file:
+            row = {field: value for field, value in row.items() if field != 'password'}
+            self.errors_file.write(json.dumps({'line': line_no, 'row': row, 'errors': errors}) + '\n')
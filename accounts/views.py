@@ -24,6 +24,7 @@ from core.responses import (
     success_response,
     validation_error_response,
 )
+from core.sql import query_budget
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -56,6 +57,7 @@ class SecureLoginView(TokenObtainPairView):
 
     serializer_class = CustomTokenObtainPairSerializer
     throttle_classes = [LoginThrottle]
+    query_budget = 6
     
     def post(self, request, *args, **kwargs):
         username = request.data.get('username', 'unknown')
@@ -169,7 +171,10 @@ class SecureTokenRefreshView(TokenRefreshView):
     def post(self, request, *args, **kwargs):
         request_id = getattr(request, 'id', None)
         
-        logger.info(f"Token refresh attempt | request_id={request_id}")
+        logger.info(
+            "Token refresh attempt | request_id=%s", request_id,
+            extra={'request_id': request_id}
+        )
         
         try:
             refresh_token = request.COOKIES.get('__Host-refresh_token')
@@ -182,16 +187,17 @@ class SecureTokenRefreshView(TokenRefreshView):
                     request_id=request_id
                 )
             
-            request.data._mutable = True
-            request.data['refresh'] = refresh_token
-            request.data._mutable = False
-            
-            response = super().post(request, *args, **kwargs)
-            
-            access_token = response.data['access']
-            new_refresh_token = response.data.get('refresh')
+            # JSON bodies parse to a plain dict, not a mutable QueryDict
+            serializer = self.get_serializer(data={'refresh': refresh_token})
+            serializer.is_valid(raise_exception=True)
+
+            access_token = serializer.validated_data['access']
+            new_refresh_token = serializer.validated_data.get('refresh')
             
-            logger.info(f"Token refreshed | request_id={request_id}")
+            logger.info(
+                "Token refreshed | request_id=%s", request_id,
+                extra={'request_id': request_id}
+            )
             
             response = success_response(
                 message="Token refreshed successfully",
@@ -250,6 +256,7 @@ class RegisterView(APIView):
 
     permission_classes = [AllowAny]
     throttle_classes = [RegisterThrottle]
+    query_budget = 6
     
     def post(self, request, *args, **kwargs):
         request_id = getattr(request, 'id', None)
@@ -312,14 +319,18 @@ class RegisterView(APIView):
                 request_id=request_id
             )
         
+        # hash before the transaction: on SQLite (BEGIN IMMEDIATE) the write
+        # lock is held for the whole atomic block
+        user = User(
+            username=User.normalize_username(username),
+            email=User.objects.normalize_email(email),
+            role=User.Role.USER
+        )
+        user.set_password(password)
+        
         try:
             with transaction.atomic():
-                user = User.objects.create_user(
-                    username=username,
-                    email=email,
-                    password=password,
-                    role=User.Role.USER
-                )
+                user.save()
                 
                 logger.info(
                     f"Registration successful | user_id={user.id} | username={username} | email={email} | ip={ip} | request_id={request_id}"
@@ -399,6 +410,7 @@ class RegisterView(APIView):
         return ip
 
 
+@query_budget(7)
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def logout_view(request):
@@ -0,0 +1,109 @@
+# benchmarks/async_views.py
+
+"""
+Compares the chat read endpoints served by the async views and
+async-capable core middleware against the old sync-only stack, both run
+through Django's ASGI handler as Daphne would. Reports latency
+percentiles, throughput, sync_to_async thread hops per request and the
+peak thread count.
+
+    python -m benchmarks.async_views --requests 2000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+
+from .harness import (
+    ThreadUsage,
+    asgi_get,
+    disable_throttling,
+    print_table,
+    run_load,
+    seed_chat,
+    setup_django,
+    summarize,
+)
+
+ENDPOINTS = {
+    'messages': ('/api/chat/messages/', 'limit=50'),
+    'online-users': ('/api/chat/online-users/', ''),
+    'search': ('/api/chat/search/', 'q=benchmark'),
+}
+
+
+def build_app(mode):
+    from django.conf import settings
+    from django.core.asgi import get_asgi_application
+    from django.test.utils import override_settings
+
+    from .sync_baseline import SYNC_ONLY_MIDDLEWARE
+
+    if mode == 'async':
+        overrides = override_settings()
+    else:
+        overrides = override_settings(
+            ROOT_URLCONF='benchmarks.sync_baseline',
+            MIDDLEWARE=[SYNC_ONLY_MIDDLEWARE.get(name, name) for name in settings.MIDDLEWARE],
+        )
+    overrides.enable()
+    return get_asgi_application(), overrides
+
+
+async def bench(app, endpoint, token, total, concurrency):
+    path, query = ENDPOINTS[endpoint]
+    cookies = {'__Host-access_token': token}
+
+    async def request():
+        status, _ = await asgi_get(app, path, query, cookies)
+        return status
+
+    # warm up caches and connections before measuring
+    await run_load(request, min(total, 50), concurrency)
+
+    usage = ThreadUsage()
+    with usage.track():
+        latencies, elapsed, statuses = await run_load(request, total, concurrency)
+
+    return {
+        **summarize(latencies),
+        'req_per_s': total / elapsed,
+        'hops_per_req': usage.hops / total,
+        'peak_threads': usage.peak_threads,
+        'statuses': ','.join(f'{code}x{count}' for code, count in sorted(statuses.items())),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--messages', type=int, default=500, help='Messages to seed')
+    parser.add_argument(
+        '--endpoint', choices=sorted(ENDPOINTS), action='append',
+        help='Endpoint to benchmark (repeatable, defaults to all)',
+    )
+    args = parser.parse_args()
+
+    setup_django()
+    disable_throttling()
+    _, token = seed_chat(args.messages)
+
+    rows = []
+    for endpoint in args.endpoint or sorted(ENDPOINTS):
+        for mode in ('sync', 'async'):
+            app, overrides = build_app(mode)
+            try:
+                result = asyncio.run(bench(app, endpoint, token, args.requests, args.concurrency))
+            finally:
+                overrides.disable()
+            rows.append({'endpoint': endpoint, 'mode': mode, **result})
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}")
+    print_table(rows, [
+        'endpoint', 'mode', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms',
+        'req_per_s', 'hops_per_req', 'peak_threads', 'statuses',
+    ])
+
+
+if __name__ == '__main__':
+    main()
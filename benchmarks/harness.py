@@ -0,0 +1,357 @@
+# benchmarks/harness.py
+
+"""
+Shared helpers for the scripts in this package: Django setup against a
+throwaway test database, seeding, an in-process ASGI client and latency
+summaries. Run the scripts from the repository root, e.g.
+
+    python -m benchmarks.async_views --requests 2000 --concurrency 50
+    python -m benchmarks.websocket_fanout --clients 200 --rate 50
+"""
+
+from contextlib import contextmanager
+import asyncio
+import atexit
+import json
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+
+def setup_django(quiet=True, test_db=True, local_cache=True):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+    import django
+    django.setup()
+
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import override_settings
+
+    settings.ALLOWED_HOSTS = list(settings.ALLOWED_HOSTS) + ['testserver']
+    if local_cache:
+        # everything runs in this process, so a per-process cache behaves the
+        # same and the run needs no Redis; override_settings resets the handler
+        override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        }).enable()
+    if quiet:
+        # request logging costs the same in every mode; keep the output readable
+        logging.disable(logging.INFO)
+
+    if test_db:
+        if connection.vendor == 'sqlite':
+            # a file, like production: writers wait on the busy timeout instead of
+            # failing with "table is locked" as in the shared-cache in-memory database
+            connection.settings_dict['TEST']['NAME'] = os.path.join(
+                tempfile.gettempdir(), f'benchmark-{os.getpid()}.sqlite3'
+            )
+            atexit.register(connection.creation.destroy_test_db, verbosity=0)
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+
+def seed_users(count, prefix='bench-ws'):
+    """
+    Creates `count` users in one insert. Returns a list of (user, access_token).
+    """
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from accounts.models import CustomUser
+
+    CustomUser.objects.bulk_create(
+        CustomUser(username=f'{prefix}-{i}', email=f'{prefix}-{i}@example.com')
+        for i in range(count)
+    )
+    users = CustomUser.objects.filter(username__startswith=f'{prefix}-').order_by('id')
+    return [(user, str(AccessToken.for_user(user))) for user in users]
+
+
+def seed_chat(messages=200, username='bench'):
+    """
+    Creates a user and `messages` chat messages. Returns (user, access_token).
+    """
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from accounts.models import CustomUser
+    from chat.models import Message
+
+    user, _ = CustomUser.objects.get_or_create(
+        username=username, defaults={'email': f'{username}@example.com'}
+    )
+    Message.objects.bulk_create(
+        Message(user=user, content=f'benchmark message {i}') for i in range(messages)
+    )
+    return user, str(AccessToken.for_user(user))
+
+
+def disable_throttling():
+    """
+    Raises the DRF throttle rates so a benchmark run is not cut off at the
+    daily quota. The throttle cache lookups still happen on every request.
+    """
+    from django.urls import get_resolver
+    from rest_framework.throttling import AnonRateThrottle, SimpleRateThrottle, UserRateThrottle
+
+    rates = {'anon': '100000000/day', 'user': '100000000/day'}
+    AnonRateThrottle.THROTTLE_RATES = rates
+    UserRateThrottle.THROTTLE_RATES = rates
+
+    # views' own throttles (LoginThrottle, ...) hard-code `rate`; import them first
+    get_resolver().url_patterns
+    pending = [SimpleRateThrottle]
+    while pending:
+        throttle = pending.pop()
+        pending.extend(throttle.__subclasses__())
+        if 'rate' in vars(throttle):
+            throttle.rate = '100000000/day'
+
+
+async def asgi_get(app, path, query='', cookies=None):
+    """
+    Sends one GET through an ASGI application. Returns (status, body).
+    """
+    status, _, body = await asgi_request(app, 'GET', path, query, cookies)
+    return status, body
+
+
+async def asgi_request(app, method, path, query='', cookies=None, json_body=None):
+    """
+    Sends one request through an ASGI application. Returns
+    (status, cookies set by the response, body).
+    """
+    headers = [(b'host', b'localhost')]
+    if cookies:
+        cookie = '; '.join(f'{name}={value}' for name, value in cookies.items())
+        headers.append((b'cookie', cookie.encode()))
+
+    request_body = b''
+    if json_body is not None:
+        request_body = json.dumps(json_body).encode()
+        headers.append((b'content-type', b'application/json'))
+        headers.append((b'content-length', str(len(request_body)).encode()))
+
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'headers': headers,
+        'client': ('127.0.0.1', 50000),
+        'server': ('localhost', 80),
+    }
+    disconnected = asyncio.Event()
+    sent_request = False
+    status = None
+    set_cookies = {}
+    body = []
+
+    async def receive():
+        nonlocal sent_request
+        if not sent_request:
+            sent_request = True
+            return {'type': 'http.request', 'body': request_body, 'more_body': False}
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+            for name, value in message.get('headers', ()):
+                if name.lower() == b'set-cookie':
+                    cookie_name, _, rest = value.decode().partition('=')
+                    set_cookies[cookie_name] = rest.split(';', 1)[0]
+        elif message['type'] == 'http.response.body':
+            body.append(message.get('body', b''))
+
+    await app(scope, receive, send)
+    disconnected.set()
+    return status, set_cookies, b''.join(body)
+
+
+class AsgiWebSocket:
+    """
+    One WebSocket client talking to an ASGI application in this process.
+    Server frames are handed to `on_frame(client, text)` as they are sent,
+    so receive timestamps carry no reader-task scheduling delay.
+    """
+
+    def __init__(self, app, path, query='', cookies=None, on_frame=None):
+        self.app = app
+        self.path = path
+        self.query = query
+        self.cookies = cookies or {}
+        self.on_frame = on_frame
+        self.inbox = asyncio.Queue()
+        self.accepted = False
+        self.close_code = None
+        self._answered = asyncio.Event()
+        self.task = None
+
+    async def connect(self, timeout=10):
+        headers = [(b'host', b'localhost'), (b'origin', b'http://localhost')]
+        if self.cookies:
+            cookie = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+            headers.append((b'cookie', cookie.encode()))
+
+        scope = {
+            'type': 'websocket',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'scheme': 'ws',
+            'path': self.path,
+            'raw_path': self.path.encode(),
+            'query_string': self.query.encode(),
+            'headers': headers,
+            'subprotocols': [],
+            'client': ('127.0.0.1', 50000),
+            'server': ('localhost', 80),
+        }
+        self.task = asyncio.create_task(self.app(scope, self.inbox.get, self._send))
+        await self.inbox.put({'type': 'websocket.connect'})
+        await asyncio.wait_for(self._answered.wait(), timeout)
+        return self.accepted
+
+    async def _send(self, message):
+        if message['type'] == 'websocket.accept':
+            self.accepted = True
+            self._answered.set()
+        elif message['type'] == 'websocket.close':
+            self.close_code = message.get('code', 1000)
+            self._answered.set()
+        elif message['type'] == 'websocket.send' and self.on_frame is not None:
+            self.on_frame(self, message.get('text'))
+
+    async def send(self, text):
+        await self.inbox.put({'type': 'websocket.receive', 'text': text})
+
+    async def disconnect(self, code=1000, timeout=10):
+        if self.task is None or self.task.done():
+            return
+        await self.inbox.put({'type': 'websocket.disconnect', 'code': code})
+        try:
+            await asyncio.wait_for(self.task, timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class ThreadUsage:
+    """
+    Counts sync_to_async thread hops (including database_sync_to_async)
+    and the peak number of live threads while active.
+    """
+
+    def __init__(self):
+        self.hops = 0
+        self.peak_threads = threading.active_count()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self):
+        from asgiref.sync import SyncToAsync
+
+        original = SyncToAsync.__call__
+        usage = self
+
+        async def counting_call(self, *args, **kwargs):
+            with usage._lock:
+                usage.hops += 1
+            result = await original(self, *args, **kwargs)
+            usage.peak_threads = max(usage.peak_threads, threading.active_count())
+            return result
+
+        SyncToAsync.__call__ = counting_call
+        try:
+            yield self
+        finally:
+            SyncToAsync.__call__ = original
+
+
+class QueryUsage:
+    """
+    Counts SQL queries recorded by core.sql for every request or event
+    while active.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self):
+        from core.sql import QueryStats
+
+        original = QueryStats.record
+        usage = self
+
+        def counting_record(self, sql, duration):
+            with usage._lock:
+                usage.queries += 1
+            return original(self, sql, duration)
+
+        QueryStats.record = counting_record
+        try:
+            yield self
+        finally:
+            QueryStats.record = original
+
+
+async def run_load(request, total, concurrency):
+    """
+    Calls `request()` `total` times with at most `concurrency` in flight.
+    Returns (latencies in seconds, wall time, statuses).
+    """
+    latencies = []
+    statuses = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            status = await request()
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return latencies, time.perf_counter() - started, statuses
+
+
+def summarize(latencies):
+    ordered = sorted(latencies)
+    if not ordered:
+        return {}
+
+    def pct(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        'mean_ms': statistics.fmean(ordered) * 1000,
+        'p50_ms': pct(0.50),
+        'p95_ms': pct(0.95),
+        'p99_ms': pct(0.99),
+        'max_ms': ordered[-1] * 1000,
+    }
+
+
+def print_table(rows, columns):
+    widths = {
+        column: max(len(column), *(len(_fmt(row.get(column))) for row in rows))
+        for column in columns
+    }
+    print('  '.join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        print('  '.join(_fmt(row.get(column)).ljust(widths[column]) for column in columns))
+
+
+def _fmt(value):
+    if isinstance(value, float):
+        return f'{value:.2f}'
+    return '' if value is None else str(value)
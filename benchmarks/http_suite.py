@@ -0,0 +1,246 @@
+# benchmarks/http_suite.py
+
+"""
+Regression benchmark for the auth and chat REST endpoints, run in-process
+through Django's ASGI handler with the production middleware stack.
+Reports requests per second, latency percentiles and SQL queries per
+request for each scenario.
+
+    python -m benchmarks.http_suite                  # run and print
+    python -m benchmarks.http_suite --save           # record baselines
+    python -m benchmarks.http_suite --compare        # exit 1 on regression
+
+Baselines live in benchmarks/baselines/http_suite.json. Throughput is
+machine-dependent: re-record them with --save on the machine that runs
+--compare. Query counts are not, and by default may not grow at all.
+Login and register hash a password per request, so they run fewer
+requests than the read scenarios.
+"""
+
+from itertools import count
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+
+from .harness import (
+    QueryUsage,
+    asgi_request,
+    disable_throttling,
+    print_table,
+    run_load,
+    seed_chat,
+    setup_django,
+    summarize,
+)
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baselines', 'http_suite.json')
+
+PASSWORD = 'bench-password-123'
+
+
+def login(app, user, token):
+    async def request():
+        status, _, _ = await asgi_request(
+            app, 'POST', '/api/auth/login/',
+            json_body={'username': user.username, 'password': PASSWORD},
+        )
+        return status
+    return request
+
+
+def refresh(app, user, token):
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    # refresh tokens are rotated and blacklisted, so each request needs its own
+    pool = []
+
+    def prepare(total):
+        pool.extend(str(RefreshToken.for_user(user)) for _ in range(total))
+
+    async def request():
+        status, _, _ = await asgi_request(
+            app, 'POST', '/api/auth/token/refresh/',
+            cookies={'__Host-refresh_token': pool.pop()}, json_body={},
+        )
+        return status
+    request.prepare = prepare
+    return request
+
+
+def register(app, user, token):
+    sequence = count()
+
+    async def request():
+        n = next(sequence)
+        status, _, _ = await asgi_request(
+            app, 'POST', '/api/auth/register/',
+            json_body={
+                'username': f'bench-register-{n}',
+                'email': f'bench-register-{n}@example.com',
+                'password': PASSWORD,
+            },
+        )
+        return status
+    return request
+
+
+def get(path, query=''):
+    def scenario(app, user, token):
+        async def request():
+            status, _, _ = await asgi_request(
+                app, 'GET', path, query, cookies={'__Host-access_token': token}
+            )
+            return status
+        return request
+    return scenario
+
+
+# name: (factory, default requests, expected status)
+SCENARIOS = {
+    'login': (login, 20, 200),
+    'refresh': (refresh, 300, 200),
+    'register': (register, 20, 201),
+    'messages-50': (get('/api/chat/messages/', 'limit=50'), 1000, 200),
+    'messages-100': (get('/api/chat/messages/', 'limit=100'), 1000, 200),
+    'online-users': (get('/api/chat/online-users/'), 1000, 200),
+}
+
+
+async def bench(app, name, user, token, total, concurrency):
+    factory, _, expected_status = SCENARIOS[name]
+    request = factory(app, user, token)
+    warmup = min(total, 10)
+
+    prepare = getattr(request, 'prepare', None)
+    if prepare is not None:
+        await asyncio.to_thread(prepare, warmup + total)
+
+    # warm up caches and connections before measuring
+    await run_load(request, warmup, concurrency)
+
+    usage = QueryUsage()
+    with usage.track():
+        latencies, elapsed, statuses = await run_load(request, total, concurrency)
+
+    return {
+        **summarize(latencies),
+        'req_per_s': total / elapsed,
+        'queries_per_req': usage.queries / total,
+        'errors': total - statuses.get(expected_status, 0),
+        'statuses': ','.join(f'{code}x{n}' for code, n in sorted(statuses.items())),
+    }
+
+
+def compare(rows, baselines, tolerance, query_tolerance):
+    """
+    Returns a list of regressions against the stored baselines.
+    """
+    failures = []
+    for row in rows:
+        baseline = baselines.get(row['scenario'])
+        if baseline is None:
+            continue
+
+        floor = baseline['req_per_s'] * (1 - tolerance)
+        if row['req_per_s'] < floor:
+            failures.append(
+                f"{row['scenario']}: {row['req_per_s']:.1f} req/s, "
+                f"baseline {baseline['req_per_s']:.1f} (floor {floor:.1f})"
+            )
+
+        ceiling = baseline['queries_per_req'] + query_tolerance
+        if row['queries_per_req'] > ceiling + 1e-9:
+            failures.append(
+                f"{row['scenario']}: {row['queries_per_req']:.2f} queries/request, "
+                f"baseline {baseline['queries_per_req']:.2f}"
+            )
+
+        if row['errors']:
+            failures.append(f"{row['scenario']}: unexpected statuses {row['statuses']}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, help='Requests per scenario (defaults per scenario)')
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--messages', type=int, default=500, help='Messages to seed')
+    parser.add_argument(
+        '--scenario', choices=sorted(SCENARIOS), action='append',
+        help='Scenario to run (repeatable, defaults to all)',
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--save', action='store_true', help='Write the results as the new baselines')
+    mode.add_argument('--compare', action='store_true', help='Fail if results regress past the baselines')
+    parser.add_argument(
+        '--tolerance', type=float, default=0.2,
+        help='Allowed throughput drop as a fraction of the baseline',
+    )
+    parser.add_argument(
+        '--query-tolerance', type=float, default=0,
+        help='Allowed increase in queries per request',
+    )
+    args = parser.parse_args()
+
+    setup_django()
+    disable_throttling()
+
+    from django.core.asgi import get_asgi_application
+
+    user, token = seed_chat(args.messages)
+    user.set_password(PASSWORD)
+    user.save(update_fields=['password'])
+    app = get_asgi_application()
+
+    rows = []
+    for name in args.scenario or list(SCENARIOS):
+        total = args.requests or SCENARIOS[name][1]
+        result = asyncio.run(bench(app, name, user, token, total, args.concurrency))
+        rows.append({'scenario': name, 'requests': total, **result})
+
+    print(f"concurrency {args.concurrency}")
+    print_table(rows, [
+        'scenario', 'requests', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms',
+        'req_per_s', 'queries_per_req', 'statuses',
+    ])
+
+    if args.save:
+        baselines = {}
+        if os.path.exists(BASELINE_PATH):
+            with open(BASELINE_PATH) as fh:
+                baselines = json.load(fh)['scenarios']
+        for row in rows:
+            baselines[row['scenario']] = {
+                'req_per_s': round(row['req_per_s'], 1),
+                'queries_per_req': round(row['queries_per_req'], 2),
+                'p50_ms': round(row['p50_ms'], 2),
+                'p95_ms': round(row['p95_ms'], 2),
+            }
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, 'w') as fh:
+            json.dump({
+                'machine': f'{platform.machine()} {platform.processor() or platform.system()}, '
+                           f'{os.cpu_count()} CPUs, Python {platform.python_version()}',
+                'concurrency': args.concurrency,
+                'scenarios': baselines,
+            }, fh, indent=2, sort_keys=True)
+            fh.write('\n')
+        print(f"Baselines written to {BASELINE_PATH}")
+
+    elif args.compare:
+        with open(BASELINE_PATH) as fh:
+            baselines = json.load(fh)['scenarios']
+        failures = compare(rows, baselines, args.tolerance, args.query_tolerance)
+        if failures:
+            print("Regressions:")
+            for failure in failures:
+                print(f"  {failure}")
+            sys.exit(1)
+        print("No regressions against baselines")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# benchmarks/json_renderer.py
+
+"""
+Microbenchmark of the stock DRF JSONRenderer/JSONParser against
+core.renderers.UJSONRenderer and core.parsers.UJSONParser on the
+envelope returned by the chat history endpoint. Messages are shaped like
+chat.history.serialize_message, so timestamps are already ISO strings.
+
+    python -m benchmarks.json_renderer --messages 100 --repeat 2000
+"""
+
+from datetime import timedelta
+from io import BytesIO
+import argparse
+import json
+import timeit
+
+from .harness import print_table, setup_django
+
+SAMPLE_TEXTS = (
+    'hey, anyone around?',
+    'Deploy is done, check https://example.com/status/ when you can',
+    'ćevapi ili pljeskavica? 🍔',
+    'line one\nline two with "quotes" and a tab\t',
+)
+
+
+def history_payload(messages):
+    from django.utils import timezone
+
+    from core.responses import success_response
+
+    now = timezone.now()
+    data = [
+        {
+            'id': 10000 + i,
+            'message': SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)],
+            'username': f'user{i % 7}',
+            'user_id': i % 7 + 1,
+            'timestamp': (now - timedelta(seconds=messages - i)).isoformat(),
+        }
+        for i in range(messages)
+    ]
+    return success_response(
+        data=data,
+        message="Messages retrieved successfully",
+        meta={'next_before': data[0]['id']},
+        request_id='3f1c2a7e-8d4b-4c1e-9b7a-5e6f7a8b9c0d',
+    ).data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--messages', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django(test_db=False)
+
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from core.parsers import UJSONParser
+    from core.renderers import UJSONRenderer
+
+    payload = history_payload(args.messages)
+    stock_bytes = JSONRenderer().render(payload)
+    fast_bytes = UJSONRenderer().render(payload)
+
+    rows = []
+    for name, renderer, parser_class in (
+        ('stdlib', JSONRenderer(), JSONParser()),
+        ('ujson', UJSONRenderer(), UJSONParser()),
+    ):
+        render_s = min(timeit.repeat(
+            lambda: renderer.render(payload), number=args.repeat, repeat=5
+        )) / args.repeat
+        parse_s = min(timeit.repeat(
+            lambda: parser_class.parse(BytesIO(stock_bytes)), number=args.repeat, repeat=5
+        )) / args.repeat
+        rows.append({'impl': name, 'render_us': render_s * 1e6, 'parse_us': parse_s * 1e6})
+
+    for row in rows[1:]:
+        row['render_speedup'] = rows[0]['render_us'] / row['render_us']
+        row['parse_speedup'] = rows[0]['parse_us'] / row['parse_us']
+
+    print(f"{args.messages}-message history envelope, {len(stock_bytes)} bytes")
+    print(f"byte-identical output: {stock_bytes == fast_bytes}, "
+          f"equal after decoding: {json.loads(stock_bytes) == json.loads(fast_bytes)}")
+    print_table(rows, ['impl', 'render_us', 'parse_us', 'render_speedup', 'parse_speedup'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+# benchmarks/sqlite_writes.py
+
+"""
+Concurrent chat-insert throughput on SQLite: several worker processes,
+each with many concurrent writers, insert messages into one database
+file, as Daphne workers do on a single node. Compares
+
+    default      stock Django SQLite settings, one thread per write
+    tuned        SQLITE_TUNED_OPTIONS (WAL, synchronous=NORMAL, mmap,
+                 busy timeout, BEGIN IMMEDIATE), one thread per write
+    tuned+queue  the tuned profile plus the CHAT_WRITE_QUEUE writer
+
+and reports committed messages per second, failed writes (e.g. "database
+is locked") and per-write latency.
+
+    python -m benchmarks.sqlite_writes --processes 4 --concurrency 50 --messages 4000
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from .harness import print_table, run_load, setup_django, summarize
+
+PROFILES = ('default', 'tuned', 'tuned+queue')
+
+
+def prepare_template(directory):
+    """
+    Migrates one database file that every profile starts from a copy of.
+    """
+    from django.core.management import call_command
+    from django.db import connection
+
+    path = os.path.join(directory, 'template.sqlite3')
+    connection.close()
+    connection.settings_dict['NAME'] = path
+    connection.settings_dict['OPTIONS'] = {}
+    call_command('migrate', verbosity=0)
+    connection.close()
+    return path
+
+
+def use_profile(path, profile):
+    from django.conf import settings
+    from django.db import connection
+
+    connection.close()
+    connection.settings_dict['NAME'] = path
+    connection.settings_dict['OPTIONS'] = {} if profile == 'default' else dict(settings.SQLITE_TUNED_OPTIONS)
+    settings.CHAT_WRITE_QUEUE = profile == 'tuned+queue'
+
+
+def seed_writers(count):
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+
+    User = get_user_model()
+    User.objects.bulk_create(
+        User(username=f'bench-writer-{i}', email=f'bench-writer-{i}@example.com')
+        for i in range(count)
+    )
+    users = list(User.objects.filter(username__startswith='bench-writer-').order_by('id'))
+    connection.close()
+    return users
+
+
+def create_message(user, content):
+    from chat import history
+    from chat.models import Message
+
+    message = Message.objects.create(user=user, content=content)
+    history.invalidate()
+    return message
+
+
+async def write_messages(user, total, concurrency):
+    from channels.db import database_sync_to_async
+    from django.conf import settings
+
+    from chat.writer import writer
+
+    save = database_sync_to_async(create_message, thread_sensitive=False)
+    counter = iter(range(total))
+
+    async def request():
+        content = f'benchmark message {next(counter)}'
+        try:
+            if settings.CHAT_WRITE_QUEUE:
+                await writer.save(user, content)
+            else:
+                await save(user, content)
+        except Exception as e:
+            return 'locked' if 'locked' in str(e) else type(e).__name__
+        return 'ok'
+
+    return await run_load(request, total, concurrency)
+
+
+def worker(user, total, concurrency, results):
+    latencies, _, statuses = asyncio.run(write_messages(user, total, concurrency))
+    results.put((latencies, statuses))
+
+
+def run_profile(profile, template, directory, args):
+    from chat.models import Message
+
+    path = os.path.join(directory, f"{profile.replace('+', '-')}.sqlite3")
+    shutil.copyfile(template, path)
+    use_profile(path, profile)
+    users = seed_writers(args.processes)
+
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    per_process = args.messages // args.processes
+    processes = [
+        context.Process(target=worker, args=(user, per_process, args.concurrency, results))
+        for user in users
+    ]
+
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    wall = time.perf_counter() - started
+
+    latencies = [latency for process_latencies, _ in outcomes for latency in process_latencies]
+    statuses = {}
+    for _, process_statuses in outcomes:
+        for status, count in process_statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+
+    stored = Message.objects.count()
+    ok = statuses.pop('ok', 0)
+    return {
+        'profile': profile,
+        'written': ok,
+        'stored': stored,
+        'failed': sum(statuses.values()),
+        'errors': ', '.join(f'{status}={count}' for status, count in sorted(statuses.items())) or None,
+        'msg_per_s': ok / wall,
+        'wall_s': wall,
+        **summarize(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--processes', type=int, default=4, help='Worker processes writing at the same time')
+    parser.add_argument('--concurrency', type=int, default=50, help='Writes in flight per process')
+    parser.add_argument('--messages', type=int, default=4000, help='Messages in total, per profile')
+    parser.add_argument('--profiles', default=','.join(PROFILES), help='Comma-separated subset of ' + ', '.join(PROFILES))
+    args = parser.parse_args()
+
+    profiles = [profile for profile in args.profiles.split(',') if profile]
+    unknown = set(profiles) - set(PROFILES)
+    if unknown:
+        parser.error(f"unknown profile: {', '.join(sorted(unknown))}")
+
+    setup_django(test_db=False)
+
+    from django.db import connection
+
+    if connection.vendor != 'sqlite':
+        parser.error('needs the SQLite database (unset DATABASE_URL)')
+
+    directory = tempfile.mkdtemp(prefix='sqlite-writes-')
+    try:
+        template = prepare_template(directory)
+        rows = [run_profile(profile, template, directory, args) for profile in profiles]
+    finally:
+        connection.close()
+        shutil.rmtree(directory, ignore_errors=True)
+
+    print(
+        f"{args.processes} processes x {args.concurrency} concurrent writers, "
+        f"{args.messages // args.processes * args.processes} messages per profile"
+    )
+    print_table(rows, [
+        'profile', 'written', 'stored', 'failed', 'msg_per_s', 'wall_s',
+        'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'errors',
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# benchmarks/sync_baseline.py
+
+"""
+The pre-ASGI request path, kept only as a benchmark baseline: sync-only
+copies of the core middleware and DRF function views for the chat reads.
+Used as ROOT_URLCONF by benchmarks.async_views in `sync` mode.
+"""
+
+from django.urls import path
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+
+from chat import search
+from chat.consumers import ChatConsumer
+from chat.views import load_messages
+from core import middleware
+from core.responses import success_response
+
+
+class MetricsMiddleware(middleware.MetricsMiddleware):
+    async_capable = False
+
+
+class RequestIDMiddleware(middleware.RequestIDMiddleware):
+    async_capable = False
+
+
+class SecurityHeadersMiddleware(middleware.SecurityHeadersMiddleware):
+    async_capable = False
+
+
+SYNC_ONLY_MIDDLEWARE = {
+    'core.middleware.MetricsMiddleware': 'benchmarks.sync_baseline.MetricsMiddleware',
+    'core.middleware.RequestIDMiddleware': 'benchmarks.sync_baseline.RequestIDMiddleware',
+    'core.middleware.SecurityHeadersMiddleware': 'benchmarks.sync_baseline.SecurityHeadersMiddleware',
+}
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_messages(request):
+    limit = min(int(request.GET.get('limit', 50)), 100)
+    return success_response(
+        data=load_messages(limit),
+        message="Messages retrieved successfully",
+        request_id=request.id
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_online_users(request):
+    return success_response(
+        data=ChatConsumer.online_usernames(),
+        message="Online users retrieved successfully",
+        request_id=request.id
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_messages(request):
+    results, has_next = search.search_messages(request.GET.get('q', ''), page=1, page_size=20)
+    return success_response(
+        data=results,
+        message="Search completed successfully",
+        request_id=request.id
+    )
+
+
+urlpatterns = [
+    path('api/chat/messages/', get_messages),
+    path('api/chat/online-users/', get_online_users),
+    path('api/chat/search/', search_messages),
+]
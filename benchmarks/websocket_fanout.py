@@ -0,0 +1,229 @@
+# benchmarks/websocket_fanout.py
+
+"""
+WebSocket capacity benchmark for the global chat: opens N authenticated
+clients against ws/chat/ through the full ASGI stack (origin check, JWT
+cookie auth, ChatConsumer), drives a fixed message rate and reports
+send-to-receive latency per recipient and per full fan-out, the cost of
+presence (user list) updates while clients join and leave, and the CPU
+time of this process.
+
+The server runs in this process, so CPU figures include the clients;
+they are still comparable between runs. The in-memory channel layer is
+the default stand-in and also replaces the cache with a per-process
+one, so that mode needs no Redis; --layer redis uses CHANNEL_LAYERS and
+CACHES from settings. The run fails when fewer than --min-delivery of the
+expected deliveries arrive.
+
+    python -m benchmarks.websocket_fanout --clients 200 --rate 50 --duration 10
+"""
+
+import argparse
+import asyncio
+import json
+import resource
+import time
+
+from .harness import AsgiWebSocket, print_table, seed_users, setup_django, summarize
+
+PONG = '{"action":"pong"}'
+
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+class Recorder:
+    """
+    Collects what the clients receive. Fan-out latency is measured from
+    the moment a message is handed to the server to its last recipient.
+    """
+
+    def __init__(self, clients):
+        self.clients = clients
+        self.sent_at = {}
+        self.latencies = []
+        self.deliveries = {}
+        self.last_delivery = {}
+        self.presence_frames = 0
+        self.last_frame = time.perf_counter()
+
+    def on_frame(self, client, text):
+        now = time.perf_counter()
+        self.last_frame = now
+        data = json.loads(text)
+        action = data.get('action')
+
+        if action == 'ping':
+            client.inbox.put_nowait({'type': 'websocket.receive', 'text': PONG})
+        elif action == 'user_list_update':
+            self.presence_frames += 1
+        elif action == 'new_message' and data['message'].startswith('bench '):
+            seq = int(data['message'].split()[1])
+            self.latencies.append(now - self.sent_at[seq])
+            self.deliveries[seq] = self.deliveries.get(seq, 0) + 1
+            self.last_delivery[seq] = now
+
+    def fanout_latencies(self):
+        return [self.last_delivery[seq] - self.sent_at[seq] for seq in self.last_delivery]
+
+    async def quiet(self, idle=0.5, timeout=30):
+        """
+        Waits until no frame has arrived for `idle` seconds.
+        """
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            if time.perf_counter() - self.last_frame >= idle:
+                return
+            await asyncio.sleep(idle / 5)
+
+
+async def measure(phase, recorder, coro):
+    frames_before = recorder.presence_frames
+    cpu_before = cpu_seconds()
+    started = time.perf_counter()
+    result = await coro
+    finished = time.perf_counter()
+    await recorder.quiet()
+    # until the last frame the phase caused; the quiet period itself is not work
+    wall = max(finished, recorder.last_frame) - started
+    cpu = cpu_seconds() - cpu_before
+    return result, {
+        'phase': phase,
+        'wall_s': wall,
+        'cpu_s': cpu,
+        'cpu_pct': cpu / wall * 100 if wall else 0.0,
+        'presence_frames': recorder.presence_frames - frames_before,
+    }
+
+
+async def connect_all(app, users, recorder, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    refused = 0
+
+    async def one(token):
+        nonlocal refused
+        async with semaphore:
+            client = AsgiWebSocket(
+                app, '/ws/chat/', 'history=0',
+                cookies={'__Host-access_token': token}, on_frame=recorder.on_frame,
+            )
+            started = time.perf_counter()
+            accepted = await client.connect(timeout=60)
+            latencies.append(time.perf_counter() - started)
+            if accepted and client.close_code is None:
+                recorder.clients.append(client)
+            else:
+                refused += 1
+
+    await asyncio.gather(*(one(token) for _, token in users))
+    return latencies, refused
+
+
+async def drive_messages(recorder, rate, duration):
+    clients = recorder.clients
+    total = int(rate * duration)
+    started = time.perf_counter()
+
+    for seq in range(total):
+        delay = started + seq / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        recorder.sent_at[seq] = time.perf_counter()
+        await clients[seq % len(clients)].send(json.dumps({'message': f'bench {seq}'}))
+
+    return total / (time.perf_counter() - started)
+
+
+async def run(args, users):
+    from config.asgi import application
+
+    recorder = Recorder([])
+    rows = []
+
+    (connect_latencies, refused), row = await measure(
+        'connect', recorder, connect_all(application, users, recorder, args.connect_concurrency)
+    )
+    rows.append({**row, **summarize(connect_latencies), 'refused': refused})
+
+    if not recorder.clients:
+        return rows, recorder, 0.0
+
+    achieved_rate, row = await measure(
+        'messages', recorder, drive_messages(recorder, args.rate, args.duration)
+    )
+    rows.append({**row, **summarize(recorder.latencies)})
+    rows.append({'phase': 'full fan-out', **summarize(recorder.fanout_latencies())})
+
+    _, row = await measure(
+        'disconnect', recorder, asyncio.gather(*(client.disconnect() for client in recorder.clients))
+    )
+    rows.append(row)
+    return rows, recorder, achieved_rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--rate', type=float, default=20, help='Chat messages per second, all clients together')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds to send messages for')
+    parser.add_argument('--connect-concurrency', type=int, default=50, help='Handshakes in flight while connecting')
+    parser.add_argument('--layer', choices=('memory', 'redis'), default='memory')
+    parser.add_argument(
+        '--fanout', choices=('channel_layer', 'local'), default='channel_layer',
+        help='CHAT_FANOUT mode; local needs Redis at REDIS_URL',
+    )
+    parser.add_argument(
+        '--capacity', type=int, default=100,
+        help='Per-channel capacity of the in-memory layer (channels_redis defaults to 100)',
+    )
+    parser.add_argument(
+        '--min-delivery', type=float, default=0.9,
+        help='Fail when fewer than this fraction of the expected deliveries arrive',
+    )
+    args = parser.parse_args()
+
+    # memory mode needs no Redis, including for the cache
+    setup_django(local_cache=args.layer == 'memory')
+
+    from django.conf import settings
+
+    if args.layer == 'memory':
+        settings.CHANNEL_LAYERS = {
+            'default': {
+                'BACKEND': 'channels.layers.InMemoryChannelLayer',
+                'CONFIG': {'capacity': args.capacity},
+            },
+        }
+        # the replay stream lives in Redis
+        settings.CHAT_REPLAY_ENABLED = False
+    settings.CHAT_FANOUT = args.fanout
+    # one node's capacity is what is being measured
+    settings.CHAT_MAX_CONNECTIONS_PER_PROCESS = 0
+
+    users = seed_users(args.clients)
+    rows, recorder, achieved_rate = asyncio.run(run(args, users))
+
+    connected = len(recorder.clients)
+    expected = len(recorder.sent_at) * connected
+    print(
+        f"{connected}/{args.clients} clients, layer {args.layer}, fan-out {args.fanout}, "
+        f"{achieved_rate:.1f} msg/s for {args.duration:g}s, "
+        f"deliveries {len(recorder.latencies)}/{expected}"
+    )
+    if len(recorder.latencies) < expected * args.min_delivery or not expected:
+        # latency rows over a handful of deliveries would look like a working run
+        raise SystemExit(
+            f"Only {len(recorder.latencies)} of {expected} deliveries arrived; "
+            f"is Redis reachable for layer {args.layer} / fan-out {args.fanout}?"
+        )
+    print_table(rows, [
+        'phase', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms',
+        'wall_s', 'cpu_s', 'cpu_pct', 'presence_frames', 'refused',
+    ])
+
+
+if __name__ == '__main__':
+    main()
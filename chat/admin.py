@@ -2,6 +2,7 @@
 
 from django.contrib import admin
 from .models import Message
+from .search import filter_queryset
 
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
@@ -10,6 +11,15 @@ class MessageAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'content')
     readonly_fields = ('timestamp',)
     
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        
+        by_user = queryset.filter(user__username__iexact=search_term)
+        by_content = filter_queryset(queryset, search_term)
+        return by_user | by_content, False
+    
     def content_preview(self, obj):
         return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
     content_preview.short_description = 'Content'
\ No newline at end of file
@@ -0,0 +1,278 @@
+# chat/archive.py
+
+"""
+Append-only cold storage for old chat messages.
+
+Each archive file holds one batch of messages sorted by id (ids are issued
+in timestamp order) and is never modified after it is written:
+
+    MAGIC | header length (4 bytes) | JSON header | column blocks
+
+The id and timestamp columns form the index and are stored as whole-file
+int64 arrays, so a cursor lookup is a binary search over the decompressed
+id array. The remaining columns are split into row groups and compressed
+independently, which lets a page read decompress only the groups it needs.
+
+Headers of the files on disk are cached per process; decompressed index
+columns are kept in an LRU of CHAT_ARCHIVE_INDEX_CACHE columns.
+"""
+
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone as dt_timezone
+import json
+import os
+import struct
+import threading
+import zlib
+
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'UMARC1\n'
+SUFFIX = '.umarc'
+ROW_GROUP_SIZE = 1024
+COMPRESSION_LEVEL = 6
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+_cache = {}
+_indexes = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _to_micros(value):
+    # integer arithmetic: going through a float timestamp can be 1µs off
+    return (value - EPOCH) // MICROSECOND
+
+
+def _from_micros(value):
+    return EPOCH + value * MICROSECOND
+
+
+def _pack_ints(values):
+    return zlib.compress(array('q', values).tobytes(), COMPRESSION_LEVEL)
+
+
+def _unpack_ints(blob):
+    values = array('q')
+    values.frombytes(zlib.decompress(blob))
+    return values
+
+
+def _pack_json(values):
+    return zlib.compress(json.dumps(values, separators=(',', ':')).encode(), COMPRESSION_LEVEL)
+
+
+def _unpack_json(blob):
+    return json.loads(zlib.decompress(blob))
+
+
+def archive_dir():
+    return str(settings.CHAT_ARCHIVE_DIR)
+
+
+def file_name(min_id, max_id):
+    return f'messages-{min_id:012d}-{max_id:012d}{SUFFIX}'
+
+
+def write_archive(rows, directory=None):
+    """
+    Writes `rows` (dicts with id, timestamp, user_id, username, content,
+    sorted by id) into a new archive file and returns its path. The file
+    is fsynced and renamed into place, so readers never see partial files.
+    """
+    if not rows:
+        return None
+
+    directory = directory or archive_dir()
+    os.makedirs(directory, exist_ok=True)
+
+    blocks = []
+    offset = 0
+
+    def add_block(blob):
+        nonlocal offset
+        blocks.append(blob)
+        location = [offset, len(blob)]
+        offset += len(blob)
+        return location
+
+    header = {
+        'count': len(rows),
+        'min_id': rows[0]['id'],
+        'max_id': rows[-1]['id'],
+        'min_ts': _to_micros(rows[0]['timestamp']),
+        'max_ts': _to_micros(rows[-1]['timestamp']),
+        'row_group_size': ROW_GROUP_SIZE,
+        'index': {
+            'id': add_block(_pack_ints([row['id'] for row in rows])),
+            'timestamp': add_block(_pack_ints([_to_micros(row['timestamp']) for row in rows])),
+        },
+        'row_groups': [],
+    }
+
+    for start in range(0, len(rows), ROW_GROUP_SIZE):
+        group = rows[start:start + ROW_GROUP_SIZE]
+        header['row_groups'].append({
+            'user_id': add_block(_pack_ints([row['user_id'] for row in group])),
+            'username': add_block(_pack_json([row['username'] for row in group])),
+            'content': add_block(_pack_json([row['content'] for row in group])),
+        })
+
+    header_bytes = json.dumps(header, separators=(',', ':')).encode()
+    path = os.path.join(directory, file_name(header['min_id'], header['max_id']))
+    tmp_path = f'{path}.tmp'
+
+    with open(tmp_path, 'wb') as fh:
+        fh.write(MAGIC)
+        fh.write(struct.pack('>I', len(header_bytes)))
+        fh.write(header_bytes)
+        for blob in blocks:
+            fh.write(blob)
+        fh.flush()
+        os.fsync(fh.fileno())
+
+    os.replace(tmp_path, path)
+    return path
+
+
+class ArchiveFile:
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as fh:
+            if fh.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a chat archive file: {path}")
+            (header_length,) = struct.unpack('>I', fh.read(4))
+            self.header = json.loads(fh.read(header_length))
+        self.data_offset = len(MAGIC) + 4 + header_length
+
+    @property
+    def min_id(self):
+        return self.header['min_id']
+
+    @property
+    def max_id(self):
+        return self.header['max_id']
+
+    def _read_block(self, location):
+        offset, length = location
+        with open(self.path, 'rb') as fh:
+            fh.seek(self.data_offset + offset)
+            return fh.read(length)
+
+    def _index(self, column):
+        key = (self.path, column)
+        with _cache_lock:
+            values = _indexes.get(key)
+            if values is not None:
+                _indexes.move_to_end(key)
+                return values
+
+        values = _unpack_ints(self._read_block(self.header['index'][column]))
+        with _cache_lock:
+            _indexes[key] = values
+            while len(_indexes) > settings.CHAT_ARCHIVE_INDEX_CACHE:
+                _indexes.popitem(last=False)
+        return values
+
+    @property
+    def ids(self):
+        return self._index('id')
+
+    @property
+    def timestamps(self):
+        return self._index('timestamp')
+
+    def contains(self, message_id):
+        if not self.min_id <= message_id <= self.max_id:
+            return False
+        ids = self.ids
+        position = bisect_left(ids, message_id)
+        return position < len(ids) and ids[position] == message_id
+
+    def rows(self, start, stop):
+        """Returns rows in positions [start, stop) in id order."""
+        size = self.header['row_group_size']
+        ids, timestamps = self.ids, self.timestamps
+        result = []
+        for group_index in range(start // size, (stop - 1) // size + 1):
+            group = self.header['row_groups'][group_index]
+            user_ids = _unpack_ints(self._read_block(group['user_id']))
+            usernames = _unpack_json(self._read_block(group['username']))
+            contents = _unpack_json(self._read_block(group['content']))
+            base = group_index * size
+            for position in range(max(start, base), min(stop, base + len(user_ids))):
+                local = position - base
+                result.append({
+                    'id': ids[position],
+                    'message': contents[local],
+                    'username': usernames[local],
+                    'user_id': user_ids[local],
+                    'timestamp': _from_micros(timestamps[position]).isoformat(),
+                })
+        return result
+
+    def before(self, before_id, limit):
+        """Returns up to `limit` newest rows with id < before_id, oldest first."""
+        stop = bisect_left(self.ids, before_id) if before_id is not None else len(self.ids)
+        start = max(0, stop - limit)
+        if start >= stop:
+            return []
+        return self.rows(start, stop)
+
+
+def list_files(directory=None):
+    directory = directory or archive_dir()
+    if not os.path.isdir(directory):
+        return []
+
+    files = []
+    with _cache_lock:
+        paths = [os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith(SUFFIX)]
+        # forget files that were removed from this directory
+        prefix, current = os.path.join(directory, ''), set(paths)
+        for path in [path for path in _cache if path.startswith(prefix) and path not in current]:
+            del _cache[path]
+        for path in paths:
+            archive_file = _cache.get(path)
+            if archive_file is None:
+                try:
+                    archive_file = ArchiveFile(path)
+                except (OSError, ValueError) as e:
+                    logger.error(f"Skipping unreadable archive file | path={path} | error={str(e)}")
+                    continue
+                _cache[path] = archive_file
+            files.append(archive_file)
+    return files
+
+
+def read_before(before_id, limit, directory=None):
+    """
+    Returns up to `limit` archived messages with id < before_id (or the
+    newest archived messages when before_id is None), oldest first, in the
+    same shape `get_messages` serializes rows from the database.
+    """
+    collected = []
+    for archive_file in reversed(list_files(directory)):
+        if before_id is not None and archive_file.min_id >= before_id:
+            continue
+        collected = archive_file.before(before_id, limit - len(collected)) + collected
+        if len(collected) >= limit:
+            break
+        before_id = archive_file.min_id
+    return collected
+
+
+def is_archived(message_id, directory=None, files=None):
+    """
+    Pass `files` (from list_files) when checking many ids, so the
+    directory is listed once.
+    """
+    if files is None:
+        files = list_files(directory)
+    return any(f.contains(message_id) for f in files)
@@ -2,9 +2,23 @@
 
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from urllib.parse import parse_qs
+from core.metrics import (
+    CHAT_GROUP_SEND_SECONDS,
+    CHAT_SAVE_SECONDS,
+    WS_ACTIVE_CONNECTIONS,
+    WS_CONNECTIONS,
+    WS_MESSAGES,
+)
+from core import dbrouting, tracing
+from core.sql import track_queries
+from . import drain, fanout, history, replay
+import asyncio
 import json
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
@@ -12,42 +26,168 @@ class ChatConsumer(AsyncWebsocketConsumer):
     
     connected_users = {}
     
+    CONNECT_QUERY_BUDGET = 2
+    RECEIVE_QUERY_BUDGET = 1
+    
+    # application-level close codes, seen by the browser in CloseEvent.code
+    CLOSE_TOO_MANY_CONNECTIONS = 4429
+    CLOSE_HEARTBEAT_TIMEOUT = 4408
+    CLOSE_SERVICE_RESTART = 1012
+    
+    PING_FRAME = '{"action":"ping"}'
+    PONG_FRAME = '{"action":"pong"}'
+    
+    heartbeat_task = None
+    missed_pongs = 0
+    
     async def connect(self):
+        drain.bind_loop()
+        with tracing.trace(self.scope.get('request_id'), 'ws.connect'), \
+                track_queries('ws:connect', budget=self.CONNECT_QUERY_BUDGET):
+            await self._connect()
+        
+        # started outside the trace and query context so they don't leak into it
+        if self.channel_name in ChatConsumer.connected_users and settings.CHAT_HEARTBEAT_INTERVAL > 0:
+            self.heartbeat_task = asyncio.create_task(self.heartbeat())
+    
+    async def _connect(self):
         self.room_group_name = 'global_chat'
         
         if isinstance(self.scope['user'], AnonymousUser):
+            WS_CONNECTIONS.inc(event='rejected')
             await self.close()
             return
         
-        await self.channel_layer.group_add(
-            self.room_group_name,
-            self.channel_name
-        )
+        if drain.is_draining():
+            WS_CONNECTIONS.inc(event='drain_refused')
+            await self.accept()
+            await self.drain_close({'reconnect_after_ms': drain.reconnect_delay_ms()})
+            return
+        
+        # check and register without an await in between, so concurrent
+        # handshakes cannot both take the last slot
+        limit = self.connection_limit(self.scope['user'].id)
+        if limit:
+            WS_CONNECTIONS.inc(event='limited')
+            logger.warning(
+                "WebSocket connection refused | user=%s | limit=%s | open=%s",
+                self.scope['user'].username, limit, len(ChatConsumer.connected_users)
+            )
+            # accept first so the client gets the close code instead of a failed handshake
+            await self.accept()
+            await self.close(code=self.CLOSE_TOO_MANY_CONNECTIONS)
+            return
         
         ChatConsumer.connected_users[self.channel_name] = {
             'user_id': self.scope['user'].id,
             'username': self.scope['user'].username,
         }
         
+        await fanout.group_add(self.room_group_name, self)
+        
         await self.accept()
-        logger.info(f"User {self.scope['user'].username} connected to chat")
+        WS_CONNECTIONS.inc(event='connect')
+        WS_ACTIVE_CONNECTIONS.inc()
+        logger.info("User %s connected to chat", self.scope['user'].username)
+        
+        last_message_id = self.get_query_int('last_message_id')
+        history_limit = self.get_query_int('history')
+        if last_message_id is not None:
+            with tracing.span('ws.replay', last_message_id=last_message_id):
+                await self.replay_missed(last_message_id)
+        elif history_limit:
+            with tracing.span('ws.snapshot', limit=history_limit):
+                await self.send_snapshot(min(history_limit, history.MAX_CACHED_MESSAGES))
         
         await self.broadcast_user_list()
     
     async def disconnect(self, close_code):
-        if hasattr(self, 'room_group_name'):
-            if self.channel_name in ChatConsumer.connected_users:
-                del ChatConsumer.connected_users[self.channel_name]
-            
-            await self.channel_layer.group_discard(
-                self.room_group_name,
-                self.channel_name
-            )
-            logger.info(f"User disconnected from chat: {close_code}")
-            
+        if self.heartbeat_task is not None:
+            self.heartbeat_task.cancel()
+        
+        if await self.release():
+            WS_CONNECTIONS.inc(event='disconnect')
+            logger.info("User disconnected from chat: %s", close_code)
+    
+    async def release(self):
+        """
+        Drops this socket from the group and the online list. Safe to call
+        twice: a reaped connection is released again when its disconnect
+        finally arrives.
+        """
+        if ChatConsumer.connected_users.pop(self.channel_name, None) is None:
+            return False
+        
+        WS_ACTIVE_CONNECTIONS.dec()
+        await fanout.group_discard(self.room_group_name, self)
+        if not drain.is_draining():
             await self.broadcast_user_list()
+        return True
+    
+    def connection_limit(self, user_id):
+        """
+        Returns the limit a new connection for `user_id` would exceed, or None.
+        """
+        process_limit = settings.CHAT_MAX_CONNECTIONS_PER_PROCESS
+        if process_limit and len(ChatConsumer.connected_users) >= process_limit:
+            return process_limit
+        
+        user_limit = settings.CHAT_MAX_CONNECTIONS_PER_USER
+        if user_limit:
+            open_for_user = sum(
+                1 for channel_data in ChatConsumer.connected_users.values()
+                if channel_data['user_id'] == user_id
+            )
+            if open_for_user >= user_limit:
+                return user_limit
+        return None
+    
+    async def heartbeat(self):
+        try:
+            while True:
+                await asyncio.sleep(settings.CHAT_HEARTBEAT_INTERVAL)
+                if self.missed_pongs >= settings.CHAT_HEARTBEAT_MAX_MISSED:
+                    await self.reap()
+                    return
+                self.missed_pongs += 1
+                await self.send(text_data=self.PING_FRAME)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Heartbeat failed, reaping connection: %s", e)
+            await self.reap()
+    
+    async def reap(self):
+        WS_CONNECTIONS.inc(event='reaped')
+        logger.info(
+            "Reaping unresponsive WebSocket | user=%s | missed_pongs=%s",
+            self.scope['user'].username, self.missed_pongs
+        )
+        await self.release()
+        await self.close(code=self.CLOSE_HEARTBEAT_TIMEOUT)
+    
+    async def drain_close(self, event):
+        if self.channel_name in ChatConsumer.connected_users:
+            WS_CONNECTIONS.inc(event='drained')
+        await self.send(text_data=json.dumps({
+            'action': 'reconnect',
+            'after_ms': event['reconnect_after_ms'],
+        }))
+        await self.close(code=self.CLOSE_SERVICE_RESTART)
     
     async def receive(self, text_data):
+        WS_MESSAGES.inc(direction='in')
+        # any frame proves the client is alive
+        self.missed_pongs = 0
+        if text_data == self.PONG_FRAME:
+            return
+        
+        trace_id = str(uuid.uuid4())
+        with tracing.trace(trace_id, 'ws.chat_message', connection=self.scope.get('request_id')), \
+                track_queries('ws:chat_message', trace_id, budget=self.RECEIVE_QUERY_BUDGET):
+            await self.handle_message(text_data)
+    
+    async def handle_message(self, text_data):
         try:
             data = json.loads(text_data)
             message = data.get('message', '').strip()
@@ -56,61 +196,156 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 return
             
             user = self.scope['user']
-            saved_message = await self.save_message(user, message)
+            with CHAT_SAVE_SECONDS.time(), tracing.span('db.save_message'):
+                saved_message = await self.save_message(user, message)
             
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    'type': 'chat_message',
-                    'message': message,
-                    'username': user.username,
-                    'user_id': user.id,
-                    'timestamp': saved_message.timestamp.isoformat(),
-                    'message_id': saved_message.id,
-                }
-            )
+            event = {
+                'type': 'chat_message',
+                'message': message,
+                'username': user.username,
+                'user_id': user.id,
+                'timestamp': saved_message.timestamp.isoformat(),
+                'message_id': saved_message.id,
+                'trace_id': tracing.current_trace_id(),
+            }
+            
+            if settings.CHAT_REPLAY_ENABLED:
+                try:
+                    with tracing.span('replay.append'):
+                        await replay.append(self.message_frame(event))
+                except Exception as e:
+                    logger.warning("Replay stream append failed: %s", e)
+            
+            with CHAT_GROUP_SEND_SECONDS.time(event='chat_message'), tracing.span('channel_layer.group_send'):
+                await fanout.group_send(self.room_group_name, event)
         except Exception as e:
-            logger.error(f"Error in receive: {str(e)}")
+            logger.error("Error in receive: %s", e)
+    
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        WS_MESSAGES.inc(direction='out')
+        await super().send(text_data=text_data, bytes_data=bytes_data, close=close)
     
     async def chat_message(self, event):
-        await self.send(text_data=json.dumps({
+        # spans of the sender's trace, emitted by every receiving consumer
+        with tracing.trace(event.get('trace_id'), 'ws.deliver', sampled=True):
+            await self.send(text_data=self.render_event(event))
+    
+    @staticmethod
+    def message_frame(event):
+        return {
             'action': 'new_message',
             'message': event['message'],
             'username': event['username'],
             'user_id': event['user_id'],
             'timestamp': event['timestamp'],
             'message_id': event['message_id'],
-        }))
+        }
     
-    async def clear_all_messages(self, event):
+    @classmethod
+    def render_event(cls, event):
+        """
+        The frame sent to the browser for a room event.
+        """
+        event_type = event['type']
+        if event_type == 'chat_message':
+            frame = cls.message_frame(event)
+        elif event_type == 'user_list_update':
+            frame = {'action': 'user_list_update', 'users': event['users']}
+        elif event_type == 'clear_all_messages':
+            frame = {'action': 'clear_all'}
+        else:
+            raise ValueError(f"Unknown room event: {event_type}")
+        return json.dumps(frame)
+    
+    def get_query_int(self, name):
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        try:
+            return int(query[name][0])
+        except (KeyError, IndexError, ValueError):
+            return None
+    
+    async def send_snapshot(self, limit):
+        messages = await database_sync_to_async(history.recent_messages)(limit)
         await self.send(text_data=json.dumps({
-            'action': 'clear_all',
+            'action': 'snapshot',
+            'messages': messages,
+            'users': ChatConsumer.online_usernames(),
         }))
     
-    async def user_list_update(self, event):
+    async def replay_missed(self, last_message_id):
+        frames, complete = [], False
+        
+        if settings.CHAT_REPLAY_ENABLED:
+            try:
+                frames, complete = await replay.missed_since(last_message_id)
+            except Exception as e:
+                logger.warning("Replay stream read failed: %s", e)
+        
+        if not complete:
+            frames = await self.get_messages_after(last_message_id, settings.CHAT_REPLAY_MAX_MESSAGES + 1)
+        
+        truncated = len(frames) > settings.CHAT_REPLAY_MAX_MESSAGES
+        frames = frames[:settings.CHAT_REPLAY_MAX_MESSAGES]
+        
         await self.send(text_data=json.dumps({
-            'action': 'user_list_update',
-            'users': event['users'],
+            'action': 'replay',
+            'messages': frames,
+            'truncated': truncated,
         }))
+        logger.info("Replayed %s missed messages | source=%s", len(frames), 'stream' if complete else 'db')
     
-    async def broadcast_user_list(self):
+    async def clear_all_messages(self, event):
+        await self.send(text_data=self.render_event(event))
+    
+    async def user_list_update(self, event):
+        await self.send(text_data=self.render_event(event))
+    
+    @classmethod
+    def online_usernames(cls):
         unique_users = {}
-        for channel_data in ChatConsumer.connected_users.values():
+        for channel_data in cls.connected_users.values():
             user_id = channel_data['user_id']
             if user_id not in unique_users:
                 unique_users[user_id] = channel_data['username']
         
-        user_list = list(unique_users.values())
+        return list(unique_users.values())
+    
+    async def broadcast_user_list(self):
+        user_list = ChatConsumer.online_usernames()
         
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'user_list_update',
-                'users': user_list,
-            }
+        with CHAT_GROUP_SEND_SECONDS.time(event='user_list_update'):
+            await fanout.group_send(
+                self.room_group_name,
+                {
+                    'type': 'user_list_update',
+                    'users': user_list,
+                }
+            )
+    
+    @database_sync_to_async
+    def get_messages_after(self, last_message_id, limit):
+        from .models import Message
+        messages = (
+            Message.objects.select_related('user')
+            .filter(id__gt=last_message_id)
+            .order_by('id')[:limit]
         )
+        return [
+            self.message_frame({**history.serialize_message(msg), 'message_id': msg.id})
+            for msg in messages
+        ]
+    
+    async def save_message(self, user, content):
+        if settings.CHAT_WRITE_QUEUE:
+            from .writer import writer
+            return await writer.save(user, content)
+        return await self.create_message(user, content)
     
     @database_sync_to_async
-    def save_message(self, user, content):
+    def create_message(self, user, content):
         from .models import Message
-        return Message.objects.create(user=user, content=content)
\ No newline at end of file
+        message = Message.objects.create(user=user, content=content)
+        history.append([message])
+        # the user's next history reads over HTTP go to the primary
+        dbrouting.record_write(user.id)
+        return message
\ No newline at end of file
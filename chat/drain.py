@@ -0,0 +1,124 @@
+# chat/drain.py
+
+"""
+Graceful drain of a worker's WebSocket connections before a restart.
+
+Sending SIGUSR1 to a Daphne worker (see the drain_worker management
+command) puts it in drain mode: new sockets are turned away with close
+code 1012 (Service Restart), open ones are closed one by one spread over
+CHAT_DRAIN_WINDOW seconds, each told how long to wait before it
+reconnects, and buffered log records are flushed once the last socket
+has been asked to leave. Stop the worker after the window has passed.
+
+The handler is installed from config.asgi at startup, which also
+registers the worker so drain_worker only signals pids that handle it.
+"""
+
+import asyncio
+import logging
+import random
+import signal
+import threading
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from core import workers
+
+from . import fanout
+
+logger = logging.getLogger(__name__)
+
+_draining = False
+_loop = None
+
+
+def is_draining():
+    return _draining
+
+
+def reconnect_delay_ms():
+    return random.randint(0, settings.CHAT_DRAIN_RECONNECT_JITTER_MS)
+
+
+async def drain(window=None):
+    global _draining
+    if _draining:
+        return
+    _draining = True
+
+    from .consumers import ChatConsumer
+
+    window = settings.CHAT_DRAIN_WINDOW if window is None else window
+    channel_names = list(ChatConsumer.connected_users)
+    pause = window / len(channel_names) if channel_names else 0
+    logger.warning(
+        "Drain started | connections=%s | window_s=%s", len(channel_names), window
+    )
+
+    channel_layer = get_channel_layer()
+    for channel_name in channel_names:
+        # may have left on its own meanwhile
+        if channel_name in ChatConsumer.connected_users:
+            await channel_layer.send(channel_name, {
+                'type': 'drain_close',
+                'reconnect_after_ms': reconnect_delay_ms(),
+            })
+        await asyncio.sleep(pause)
+
+    # drained sockets skip the per-disconnect user list broadcast; send one
+    try:
+        await fanout.group_send('global_chat', {
+            'type': 'user_list_update',
+            'users': ChatConsumer.online_usernames(),
+        })
+    except Exception as e:
+        logger.warning("Drain user list broadcast failed: %s", e)
+
+    await sync_to_async(flush_logs, thread_sensitive=False)()
+    logger.warning("Drain finished | remaining=%s", len(ChatConsumer.connected_users))
+
+
+def flush_logs():
+    for handler in logging.getLogger().handlers:
+        handler.flush()
+    for logger_ in list(logging.Logger.manager.loggerDict.values()):
+        for handler in getattr(logger_, 'handlers', ()):
+            handler.flush()
+
+
+def bind_loop():
+    """
+    Remembers the worker's event loop; called by the consumer on connect.
+    """
+    global _loop
+    _loop = asyncio.get_running_loop()
+
+
+def _handle_signal(signum, frame):
+    global _draining
+    loop = _loop
+    if loop is None or loop.is_closed():
+        # no socket has connected yet: refuse new ones, nothing to close
+        _draining = True
+        threading.Thread(target=_drain_idle, name='drain', daemon=True).start()
+        return
+    loop.call_soon_threadsafe(lambda: loop.create_task(drain()))
+
+
+def _drain_idle():
+    logger.warning("Drain started | connections=0")
+    flush_logs()
+    logger.warning("Drain finished | remaining=0")
+
+
+def install_signal_handler():
+    """
+    Lets this worker be drained with SIGUSR1. Must be called from the main
+    thread at startup, e.g. from the ASGI entry point, so the signal never
+    reaches the worker while its default action (terminate) still applies.
+    """
+    if hasattr(signal, 'SIGUSR1') and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR1, _handle_signal)
+        workers.register('SIGUSR1')
@@ -0,0 +1,155 @@
+# chat/fanout.py
+
+"""
+Room broadcasts for chat consumers.
+
+With CHAT_FANOUT = 'channel_layer' (the default) rooms are channel layer
+groups: every socket joins the group and group_send stores one copy per
+socket in Redis.
+
+With CHAT_FANOUT = 'local' each worker process subscribes once per room
+to a Redis pub/sub channel and keeps the room's sockets in memory. A
+broadcast is one PUBLISH; every process renders the frame once and
+writes it to its own sockets, so Redis traffic grows with the number of
+processes instead of the number of connections. Pub/sub is fire and
+forget: a process that is reconnecting to Redis misses what was
+published meanwhile, which clients recover from through replay.
+"""
+
+from collections import defaultdict
+import asyncio
+import json
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+import redis
+import redis.asyncio as aioredis
+
+from core import tracing
+
+logger = logging.getLogger(__name__)
+
+
+def is_local():
+    return settings.CHAT_FANOUT == 'local'
+
+
+def redis_channel(room):
+    return f'{settings.CHAT_FANOUT_PREFIX}{room}'
+
+
+class LocalFanout:
+
+    def __init__(self):
+        self.rooms = defaultdict(set)
+        # serializes subscribe/unsubscribe per room; rooms are few and fixed
+        self.locks = defaultdict(asyncio.Lock)
+        self.client = None
+        self.pubsub = None
+        self.listener = None
+
+    def get_client(self):
+        if self.client is None:
+            self.client = aioredis.from_url(settings.CHAT_FANOUT_REDIS_URL, decode_responses=True)
+            self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        return self.client
+
+    async def join(self, room, consumer):
+        async with self.locks[room]:
+            if room not in self.rooms:
+                # subscribe before the room exists, so a failed subscribe
+                # does not leave later joins believing it is subscribed
+                self.get_client()
+                await self.pubsub.subscribe(redis_channel(room))
+                if self.listener is None or self.listener.done():
+                    self.listener = asyncio.get_running_loop().create_task(self.listen())
+                logger.info("Fan-out subscribed | room=%s", room)
+            self.rooms[room].add(consumer)
+
+    async def leave(self, room, consumer):
+        async with self.locks[room]:
+            consumers = self.rooms.get(room)
+            if consumers is None:
+                return
+            consumers.discard(consumer)
+            if not consumers:
+                del self.rooms[room]
+                await self.pubsub.unsubscribe(redis_channel(room))
+                logger.info("Fan-out unsubscribed | room=%s", room)
+
+    async def publish(self, room, event):
+        await self.get_client().publish(redis_channel(room), json.dumps(event))
+
+    async def listen(self):
+        prefix_length = len(settings.CHAT_FANOUT_PREFIX)
+        while True:
+            try:
+                if not self.pubsub.subscribed:
+                    await asyncio.sleep(0.1)
+                    continue
+                message = await self.pubsub.get_message(timeout=1.0)
+                if message is not None and message['type'] == 'message':
+                    await self.deliver(message['channel'][prefix_length:], json.loads(message['data']))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # redis-py resubscribes on reconnect
+                logger.warning("Fan-out listener error: %s", e)
+                await asyncio.sleep(1)
+
+    async def deliver(self, room, event):
+        from .consumers import ChatConsumer
+
+        consumers = list(self.rooms.get(room, ()))
+        if not consumers:
+            return
+
+        with tracing.trace(event.get('trace_id'), 'ws.deliver', sampled=True, sockets=len(consumers)):
+            text = ChatConsumer.render_event(event)
+            for consumer in consumers:
+                try:
+                    await consumer.send(text_data=text)
+                except Exception as e:
+                    logger.warning("Fan-out send failed | channel=%s | error=%s", consumer.channel_name, e)
+
+
+hub = LocalFanout()
+
+
+async def group_add(room, consumer):
+    if is_local():
+        await hub.join(room, consumer)
+    else:
+        await consumer.channel_layer.group_add(room, consumer.channel_name)
+
+
+async def group_discard(room, consumer):
+    if is_local():
+        await hub.leave(room, consumer)
+    else:
+        await consumer.channel_layer.group_discard(room, consumer.channel_name)
+
+
+async def group_send(room, event):
+    if is_local():
+        await hub.publish(room, event)
+    else:
+        await get_channel_layer().group_send(room, event)
+
+
+def group_send_sync(room, event):
+    """
+    For sync views: async_to_sync runs each call in a fresh event loop, which
+    must not reuse the hub's asyncio Redis connections.
+    """
+    if not is_local():
+        async_to_sync(get_channel_layer().group_send)(room, event)
+        return
+
+    client = redis.Redis.from_url(settings.CHAT_FANOUT_REDIS_URL)
+    try:
+        client.publish(redis_channel(room), json.dumps(event))
+    finally:
+        client.close()
@@ -0,0 +1,80 @@
+# chat/history.py
+
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Message
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = 'chat:recent_messages'
+# bumped by every write; the cached list records the version it was built at
+VERSION_KEY = 'chat:recent_messages:version'
+MAX_CACHED_MESSAGES = 100
+
+
+def serialize_message(msg):
+    return {
+        'id': msg.id,
+        'message': msg.content,
+        'username': msg.user.username,
+        'user_id': msg.user.id,
+        'timestamp': msg.timestamp.isoformat(),
+    }
+
+
+def recent_messages(limit=50):
+    """
+    Returns the newest `limit` messages oldest first. The newest
+    MAX_CACHED_MESSAGES are cached as one serialized list shared by the
+    REST endpoint and the WebSocket snapshot. New messages are appended to
+    it; a list built before the latest write is never served, so a reader
+    that raced a write cannot bring back stale history.
+    """
+    cached = cache.get_many([VERSION_KEY, CACHE_KEY])
+    version = cached.get(VERSION_KEY, 0)
+    entry = cached.get(CACHE_KEY)
+
+    if entry is not None and entry['version'] == version:
+        data = entry['messages']
+    else:
+        messages = Message.objects.select_related('user').all()[:MAX_CACHED_MESSAGES]
+        data = [serialize_message(msg) for msg in reversed(messages)]
+        cache.set(CACHE_KEY, {'version': version, 'messages': data}, settings.CHAT_HISTORY_CACHE_TIMEOUT)
+
+    return data[-limit:] if limit > 0 else []
+
+
+def _bump_version():
+    cache.add(VERSION_KEY, 0, None)
+    return cache.incr(VERSION_KEY)
+
+
+def append(messages):
+    """
+    Adds just-saved `messages` to the cached list. When another write got
+    in between, the list is left behind for the next reader to rebuild.
+    Best effort, like invalidate().
+    """
+    try:
+        version = _bump_version()
+        entry = cache.get(CACHE_KEY)
+        if entry is None or entry['version'] != version - 1:
+            return
+        by_id = {message['id']: message for message in entry['messages']}
+        by_id.update((msg.id, serialize_message(msg)) for msg in messages)
+        data = [by_id[message_id] for message_id in sorted(by_id)][-MAX_CACHED_MESSAGES:]
+        cache.set(CACHE_KEY, {'version': version, 'messages': data}, settings.CHAT_HISTORY_CACHE_TIMEOUT)
+    except Exception as e:
+        logger.warning("Chat history update failed: %s", e)
+
+
+def invalidate():
+    # best effort: callers have already committed, and an unreachable cache
+    # serves nothing stale; entries expire after CHAT_HISTORY_CACHE_TIMEOUT
+    try:
+        _bump_version()
+    except Exception as e:
+        logger.warning("Chat history invalidation failed: %s", e)
@@ -0,0 +1,114 @@
+# chat/management/commands/archive_messages.py
+
+from datetime import timedelta
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from chat import archive, history
+from chat.models import Message
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves chat messages older than the cutoff into compressed, append-only "
+        "archive files and deletes them from the chat_messages table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days',
+            type=int,
+            default=settings.CHAT_ARCHIVE_AFTER_DAYS,
+            help='Archive messages older than this many days',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Messages per archive file',
+        )
+        parser.add_argument(
+            '--directory',
+            default=None,
+            help='Archive directory (defaults to CHAT_ARCHIVE_DIR)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many messages would be archived',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        batch_size = options['batch_size']
+        directory = options['directory'] or archive.archive_dir()
+
+        pending = Message.objects.filter(timestamp__lt=cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f"Would archive {pending.count()} messages older than {cutoff.isoformat()}")
+            return
+
+        self.purge_already_archived(pending, directory)
+
+        total = 0
+        started = time.monotonic()
+
+        while True:
+            rows = [
+                {
+                    'id': row['id'],
+                    'timestamp': row['timestamp'],
+                    'user_id': row['user_id'],
+                    'username': row['user__username'],
+                    'content': row['content'],
+                }
+                for row in pending.order_by('id').values(
+                    'id', 'timestamp', 'user_id', 'user__username', 'content'
+                )[:batch_size]
+            ]
+            if not rows:
+                break
+
+            path = archive.write_archive(rows, directory)
+
+            with transaction.atomic():
+                Message.objects.filter(
+                    id__gte=rows[0]['id'],
+                    id__lte=rows[-1]['id'],
+                    timestamp__lt=cutoff,
+                ).delete()
+
+            total += len(rows)
+            self.stdout.write(f"Archived {len(rows)} messages to {path}")
+
+        history.invalidate()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {total} messages older than {cutoff.isoformat()} in {elapsed:.1f}s"
+        ))
+
+    def purge_already_archived(self, pending, directory):
+        """
+        Removes rows a previous run wrote to an archive file but did not get
+        to delete (for example when it was interrupted between the two steps).
+        """
+        files = archive.list_files(directory)
+        if not files:
+            return
+
+        newest_archived = files[-1].max_id
+        leftover = [
+            message_id
+            for message_id in pending.filter(id__lte=newest_archived).values_list('id', flat=True)
+            if archive.is_archived(message_id, files=files)
+        ]
+        if leftover:
+            Message.objects.filter(id__in=leftover).delete()
+            self.stdout.write(self.style.WARNING(
+                f"Removed {len(leftover)} messages already present in the archive"
+            ))
@@ -0,0 +1,90 @@
+# chat/management/commands/chat_partitions.py
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from chat import history, partitions
+from chat.models import Message
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-creates upcoming monthly partitions of chat_messages and drops "
+        "partitions past the retention window. Run it daily from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=settings.CHAT_PARTITION_MONTHS_AHEAD,
+            help='How many future months to pre-create partitions for',
+        )
+        parser.add_argument(
+            '--retention-months',
+            type=int,
+            default=settings.CHAT_MESSAGE_RETENTION_MONTHS,
+            help='Drop partitions entirely older than this many months (0 keeps everything)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would be created or dropped',
+        )
+
+    def handle(self, *args, **options):
+        months_ahead = options['months_ahead']
+        retention_months = options['retention_months']
+        dry_run = options['dry_run']
+
+        if not partitions.is_partitioned():
+            self.handle_unpartitioned(retention_months, dry_run)
+            return
+
+        if dry_run:
+            existing = set(partitions.list_partitions())
+            current = partitions.month_start(timezone.now())
+            for offset in range(months_ahead + 1):
+                name = partitions.partition_name(partitions.add_months(current, offset))
+                if name not in existing:
+                    self.stdout.write(f"Would create {name}")
+            if retention_months:
+                for name in partitions.expired_partitions(retention_months):
+                    self.stdout.write(f"Would drop {name}")
+            return
+
+        with transaction.atomic():
+            created = partitions.ensure_partitions(months_ahead)
+            dropped = partitions.drop_expired_partitions(retention_months)
+
+        if dropped:
+            history.invalidate()
+        for name in created:
+            self.stdout.write(self.style.SUCCESS(f"Created {name}"))
+        for name in dropped:
+            self.stdout.write(self.style.WARNING(f"Dropped {name}"))
+        if not created and not dropped:
+            self.stdout.write("Partitions up to date")
+
+    def handle_unpartitioned(self, retention_months, dry_run):
+        self.stdout.write(
+            f"{partitions.TABLE_NAME} is not partitioned on {connection.vendor}, "
+            "falling back to DELETE for retention"
+        )
+        if not retention_months:
+            return
+
+        cutoff = partitions.add_months(
+            partitions.month_start(timezone.now()), -retention_months
+        )
+        expired = Message.objects.filter(timestamp__lt=cutoff)
+
+        if dry_run:
+            self.stdout.write(f"Would delete {expired.count()} messages older than {cutoff.date()}")
+            return
+
+        deleted, _ = expired.delete()
+        history.invalidate()
+        self.stdout.write(self.style.WARNING(f"Deleted {deleted} messages older than {cutoff.date()}"))
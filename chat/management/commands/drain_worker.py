@@ -0,0 +1,55 @@
+# chat/management/commands/drain_worker.py
+
+import os
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import workers
+
+
+class Command(BaseCommand):
+    help = (
+        "Puts a running Daphne worker in drain mode: it refuses new WebSockets "
+        "and closes open ones over the drain window with a jittered reconnect delay."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('pid', type=int, help='PID of the worker to drain')
+        parser.add_argument(
+            '--stop',
+            action='store_true',
+            help='Send SIGTERM once the drain window (plus --grace) has passed',
+        )
+        parser.add_argument(
+            '--grace',
+            type=float,
+            default=5,
+            help='Extra seconds to wait after the window before stopping',
+        )
+
+    def handle(self, *args, **options):
+        pid = options['pid']
+
+        try:
+            workers.send(pid, signal.SIGUSR1)
+        except workers.UnknownWorker as e:
+            raise CommandError(f"{e}; only workers started from config.asgi can be drained")
+        except ProcessLookupError:
+            raise CommandError(f"No process with pid {pid}")
+        except PermissionError:
+            raise CommandError(f"Not allowed to signal pid {pid}")
+
+        window = settings.CHAT_DRAIN_WINDOW
+        self.stdout.write(f"Draining pid {pid} over {window:g}s")
+        if not options['stop']:
+            return
+
+        time.sleep(window + options['grace'])
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Stopped pid {pid}"))
@@ -0,0 +1,217 @@
+# chat/management/commands/generate_dataset.py
+
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+from itertools import accumulate
+import csv
+import io
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from chat import history, partitions
+from chat.models import Message
+
+User = get_user_model()
+
+# share of the day's messages per UTC hour: quiet at night, peak in the evening
+HOURLY_WEIGHTS = (
+    2, 1, 1, 1, 1, 2, 3, 5, 7, 8, 8, 8,
+    9, 9, 8, 8, 8, 9, 11, 13, 14, 12, 8, 4,
+)
+# Monday first
+WEEKDAY_WEIGHTS = (1.0, 1.0, 1.0, 1.0, 0.95, 0.7, 0.65)
+
+WORDS = (
+    'hey', 'hi', 'ok', 'yes', 'no', 'thanks', 'lol', 'sure', 'when', 'where', 'why',
+    'deploy', 'build', 'release', 'bug', 'fix', 'test', 'review', 'merge', 'branch',
+    'server', 'database', 'cache', 'redis', 'postgres', 'latency', 'query', 'index',
+    'meeting', 'lunch', 'coffee', 'tomorrow', 'today', 'tonight', 'weekend', 'later',
+    'anyone', 'around', 'check', 'this', 'that', 'link', 'docs', 'issue', 'ticket',
+    'dobro', 'jutro', 'hvala', 'može', 'važi', 'ćao', 'ekipa', 'sutra', 'danas',
+    'the', 'a', 'is', 'it', 'to', 'and', 'of', 'in', 'for', 'on', 'with', 'we', 'you',
+    'I', 'just', 'now', 'still', 'again', 'looks', 'good', 'broken', 'works', 'done',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-loads synthetic users and chat history for performance work: "
+        "skewed per-user activity, growth over time and daily/weekly cycles. "
+        "Same --seed and --end give the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--messages', type=int, default=1000000)
+        parser.add_argument('--days', type=int, default=365, help='Span of history ending at --end')
+        parser.add_argument(
+            '--end',
+            type=lambda value: datetime.fromisoformat(value).replace(tzinfo=dt_timezone.utc),
+            default=None,
+            help='Last day of history, YYYY-MM-DD (defaults to today, UTC)',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument(
+            '--prefix',
+            default='loadtest_',
+            help='Username prefix; refuses to run if such users already exist',
+        )
+        parser.add_argument(
+            '--password',
+            default='loadtest-password',
+            help='Password of every generated user, hashed once and reused',
+        )
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(f"Users with prefix '{prefix}' already exist; pick another --prefix")
+        if options['users'] < 1:
+            raise CommandError("--users must be at least 1")
+
+        rng = random.Random(options['seed'])
+        end_day = (options['end'] or datetime.now(dt_timezone.utc)).date()
+        start = datetime.combine(end_day - timedelta(days=options['days'] - 1), dt_time(), dt_timezone.utc)
+        self.batch_size = options['batch_size']
+        self.use_copy = connection.vendor == 'postgresql'
+
+        started = time.monotonic()
+        user_ids = self.create_users(rng, options['users'], prefix, options['password'], start)
+        self.report('users', len(user_ids), started)
+
+        if partitions.is_partitioned():
+            months = (end_day.year - start.year) * 12 + end_day.month - start.month
+            partitions.ensure_partitions(months, start=start)
+
+        started = time.monotonic()
+        total = self.create_messages(rng, user_ids, options['messages'], start, options['days'])
+        self.report('messages', total, started)
+
+        if self.use_copy:
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE "{User._meta.db_table}"')
+                cursor.execute(f'ANALYZE "{Message._meta.db_table}"')
+        history.invalidate()
+
+    def report(self, what, count, started):
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {count} {what} in {elapsed:.1f}s ({count / max(elapsed, 1e-9):.0f}/s)"
+        ))
+
+    def create_users(self, rng, count, prefix, password, start):
+        # one hash for everyone: real PBKDF2, but paid once instead of per user
+        password_hash = make_password(password, salt=f'{prefix}{rng.random()}'.replace('.', ''))
+        columns = (
+            'password', 'is_superuser', 'username', 'first_name', 'last_name', 'email',
+            'is_staff', 'is_active', 'date_joined', 'role',
+        )
+
+        def rows():
+            for i in range(count):
+                username = f'{prefix}{i:07d}'
+                joined = start - timedelta(seconds=rng.randrange(30 * 86400))
+                yield (
+                    password_hash, False, username, '', '', f'{username}@example.com',
+                    False, True, joined, User.Role.USER,
+                )
+
+        self.load(User._meta.db_table, columns, rows(), count)
+
+        return list(
+            User.objects.filter(username__startswith=prefix)
+            .order_by('id').values_list('id', flat=True)
+        )
+
+    def create_messages(self, rng, user_ids, count, start, days):
+        # activity is heavily skewed: a few users write most of the messages
+        ranked = user_ids[:]
+        rng.shuffle(ranked)
+        user_weights = list(accumulate(1 / (rank + 1) ** 1.1 for rank in range(len(ranked))))
+
+        # history grows over the span, weekends are quieter
+        day_weights = list(accumulate(
+            (0.3 + 0.7 * day / max(days - 1, 1)) * WEEKDAY_WEIGHTS[(start + timedelta(days=day)).weekday()]
+            for day in range(days)
+        ))
+        per_day = [0] * days
+        remaining = count
+        while remaining:
+            chunk = min(remaining, 100000)
+            for day in rng.choices(range(days), cum_weights=day_weights, k=chunk):
+                per_day[day] += 1
+            remaining -= chunk
+
+        hour_weights = list(accumulate(HOURLY_WEIGHTS))
+
+        def rows():
+            # day by day and sorted within the day, so ids grow with time
+            for day, day_count in enumerate(per_day):
+                day_start = start + timedelta(days=day)
+                offsets = sorted(
+                    hour * 3600 + rng.randrange(3600)
+                    for hour in rng.choices(range(24), cum_weights=hour_weights, k=day_count)
+                )
+                authors = rng.choices(ranked, cum_weights=user_weights, k=day_count)
+                for offset, user_id in zip(offsets, authors):
+                    yield (user_id, self.message_text(rng), day_start + timedelta(seconds=offset))
+
+        self.load(Message._meta.db_table, ('user_id', 'content', 'timestamp'), rows(), count)
+        return count
+
+    @staticmethod
+    def message_text(rng):
+        # mostly short chat lines with a long tail
+        length = min(150, max(1, int(rng.lognormvariate(1.6, 0.7))))
+        return ' '.join(rng.choices(WORDS, k=length))
+
+    def batches(self, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def load(self, table, columns, rows, total):
+        """
+        COPY ... FROM STDIN on PostgreSQL, multi-row executemany elsewhere; one
+        transaction per batch. Not bulk_create: Message.timestamp is
+        auto_now_add, which would overwrite the generated timestamps.
+        """
+        column_list = ', '.join(f'"{column}"' for column in columns)
+        if self.use_copy:
+            sql = f'COPY "{table}" ({column_list}) FROM STDIN WITH (FORMAT csv)'
+        else:
+            placeholders = ', '.join(['%s'] * len(columns))
+            sql = f'INSERT INTO "{table}" ({column_list}) VALUES ({placeholders})'
+        adapt = connection.ops.adapt_datetimefield_value
+
+        done = 0
+        for batch in self.batches(rows):
+            batch = [
+                [adapt(value) if isinstance(value, datetime) else value for value in row]
+                for row in batch
+            ]
+            with transaction.atomic(), connection.cursor() as cursor:
+                if self.use_copy:
+                    buffer = io.StringIO()
+                    csv.writer(buffer).writerows(batch)
+                    if hasattr(cursor.cursor, 'copy'):
+                        # psycopg 3
+                        with cursor.cursor.copy(sql) as copy:
+                            copy.write(buffer.getvalue())
+                    else:
+                        buffer.seek(0)
+                        cursor.cursor.copy_expert(sql, buffer)
+                else:
+                    cursor.executemany(sql, batch)
+            done += len(batch)
+            self.stdout.write(f"{table}: {done}/{total}", ending='\r' if done < total else '\n')
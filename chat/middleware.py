@@ -7,7 +7,10 @@ from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from django.contrib.auth import get_user_model
 from urllib.parse import parse_qs
+from core import tracing
+from core.metrics import AUTH_RESULTS
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -25,16 +28,20 @@ def get_user_from_token(token_string):
         
         if not user.is_active:
             raise InvalidToken('User is inactive')
-            
+        
+        AUTH_RESULTS.inc(transport='websocket', result='success')
         return user
         
     except (InvalidToken, TokenError) as e:
+        AUTH_RESULTS.inc(transport='websocket', result='invalid')
         logger.warning(f"Invalid token: {str(e)}")
         return AnonymousUser()
     except User.DoesNotExist:
+        AUTH_RESULTS.inc(transport='websocket', result='invalid')
         logger.warning(f"User not found for token")
         return AnonymousUser()
     except Exception as e:
+        AUTH_RESULTS.inc(transport='websocket', result='error')
         logger.error(f"Unexpected error in WebSocket auth: {str(e)}")
         return AnonymousUser()
 
@@ -51,10 +58,14 @@ class JWTAuthMiddleware(BaseMiddleware):
                     cookies[key] = value
         
         token = cookies.get('__Host-access_token')
+        scope['request_id'] = headers.get(b'x-request-id', b'').decode() or str(uuid.uuid4())
         
-        if token:
-            scope['user'] = await get_user_from_token(token)
-        else:
-            scope['user'] = AnonymousUser()
+        with tracing.trace(scope['request_id'], 'ws.handshake'):
+            if token:
+                with tracing.span('auth.jwt', transport='websocket'):
+                    scope['user'] = await get_user_from_token(token)
+            else:
+                AUTH_RESULTS.inc(transport='websocket', result='anonymous')
+                scope['user'] = AnonymousUser()
         
         return await super().__call__(scope, receive, send)
\ No newline at end of file
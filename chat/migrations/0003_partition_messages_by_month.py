@@ -0,0 +1,102 @@
+from datetime import datetime, timezone
+
+from django.db import migrations
+
+
+MONTHS_AHEAD = 3
+
+
+def _month_start(value):
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def _add_months(value, months):
+    index = value.year * 12 + (value.month - 1) + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('ALTER TABLE "chat_messages" RENAME TO "chat_messages_legacy"')
+        cursor.execute('CREATE SEQUENCE "chat_messages_part_id_seq"')
+        cursor.execute(
+            'CREATE TABLE "chat_messages" ('
+            '"id" bigint NOT NULL DEFAULT nextval(\'chat_messages_part_id_seq\'), '
+            '"content" text NOT NULL, '
+            '"timestamp" timestamp with time zone NOT NULL, '
+            '"user_id" bigint NOT NULL, '
+            'CONSTRAINT "chat_messages_part_pkey" PRIMARY KEY ("id", "timestamp"), '
+            'CONSTRAINT "chat_messages_part_user_id_fk" FOREIGN KEY ("user_id") '
+            'REFERENCES "users" ("id") DEFERRABLE INITIALLY DEFERRED'
+            ') PARTITION BY RANGE ("timestamp")'
+        )
+        cursor.execute('ALTER SEQUENCE "chat_messages_part_id_seq" OWNED BY "chat_messages"."id"')
+        cursor.execute('CREATE INDEX "chat_messages_part_timestamp_idx" ON "chat_messages" ("timestamp")')
+        cursor.execute('CREATE INDEX "chat_messages_part_user_id_idx" ON "chat_messages" ("user_id")')
+        cursor.execute('CREATE TABLE "chat_messages_default" PARTITION OF "chat_messages" DEFAULT')
+
+        cursor.execute('SELECT MIN("timestamp") FROM "chat_messages_legacy"')
+        oldest = cursor.fetchone()[0] or datetime.now(timezone.utc)
+        current = _month_start(oldest)
+        last = _add_months(_month_start(datetime.now(timezone.utc)), MONTHS_AHEAD)
+        while current <= last:
+            end = _add_months(current, 1)
+            name = f'chat_messages_p{current.year:04d}_{current.month:02d}'
+            cursor.execute(
+                f'CREATE TABLE "{name}" PARTITION OF "chat_messages" '
+                f"FOR VALUES FROM ('{current.isoformat()}') TO ('{end.isoformat()}')"
+            )
+            current = end
+
+        cursor.execute(
+            'INSERT INTO "chat_messages" ("id", "content", "timestamp", "user_id") '
+            'SELECT "id", "content", "timestamp", "user_id" FROM "chat_messages_legacy"'
+        )
+        cursor.execute(
+            'SELECT setval(\'chat_messages_part_id_seq\', '
+            'COALESCE((SELECT MAX("id") FROM "chat_messages"), 0) + 1, false)'
+        )
+        cursor.execute('DROP TABLE "chat_messages_legacy"')
+
+
+def unpartition_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('ALTER TABLE "chat_messages" RENAME TO "chat_messages_partitioned"')
+        cursor.execute(
+            'CREATE TABLE "chat_messages" ('
+            '"id" bigint NOT NULL PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY, '
+            '"content" text NOT NULL, '
+            '"timestamp" timestamp with time zone NOT NULL, '
+            '"user_id" bigint NOT NULL REFERENCES "users" ("id") DEFERRABLE INITIALLY DEFERRED'
+            ')'
+        )
+        cursor.execute('CREATE INDEX "chat_messages_timestamp_idx" ON "chat_messages" ("timestamp")')
+        cursor.execute('CREATE INDEX "chat_messages_user_id_idx" ON "chat_messages" ("user_id")')
+        cursor.execute(
+            'INSERT INTO "chat_messages" ("id", "content", "timestamp", "user_id") '
+            'OVERRIDING SYSTEM VALUE '
+            'SELECT "id", "content", "timestamp", "user_id" FROM "chat_messages_partitioned"'
+        )
+        cursor.execute(
+            'SELECT setval(pg_get_serial_sequence(\'chat_messages\', \'id\'), '
+            'COALESCE((SELECT MAX("id") FROM "chat_messages"), 0) + 1, false)'
+        )
+        cursor.execute('DROP TABLE "chat_messages_partitioned" CASCADE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_alter_message_timestamp'),
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_table, unpartition_table),
+    ]
@@ -0,0 +1,72 @@
+from django.db import migrations, OperationalError
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'ALTER TABLE "chat_messages" ADD COLUMN "search_vector" tsvector '
+                'GENERATED ALWAYS AS (to_tsvector(\'simple\', "content")) STORED'
+            )
+            cursor.execute(
+                'CREATE INDEX "chat_messages_search_idx" ON "chat_messages" '
+                'USING GIN ("search_vector")'
+            )
+
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            try:
+                cursor.execute(
+                    'CREATE VIRTUAL TABLE "chat_messages_fts" USING fts5('
+                    '"content", content=\'chat_messages\', content_rowid=\'id\')'
+                )
+            except OperationalError:
+                # SQLite built without FTS5; chat.search falls back to LIKE.
+                return
+            cursor.execute(
+                'CREATE TRIGGER "chat_messages_fts_ai" AFTER INSERT ON "chat_messages" BEGIN '
+                'INSERT INTO "chat_messages_fts" (rowid, "content") VALUES (new."id", new."content"); '
+                'END'
+            )
+            cursor.execute(
+                'CREATE TRIGGER "chat_messages_fts_ad" AFTER DELETE ON "chat_messages" BEGIN '
+                'INSERT INTO "chat_messages_fts" ("chat_messages_fts", rowid, "content") '
+                'VALUES (\'delete\', old."id", old."content"); '
+                'END'
+            )
+            cursor.execute(
+                'CREATE TRIGGER "chat_messages_fts_au" AFTER UPDATE ON "chat_messages" BEGIN '
+                'INSERT INTO "chat_messages_fts" ("chat_messages_fts", rowid, "content") '
+                'VALUES (\'delete\', old."id", old."content"); '
+                'INSERT INTO "chat_messages_fts" (rowid, "content") VALUES (new."id", new."content"); '
+                'END'
+            )
+            cursor.execute('INSERT INTO "chat_messages_fts" ("chat_messages_fts") VALUES (\'rebuild\')')
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX IF EXISTS "chat_messages_search_idx"')
+            cursor.execute('ALTER TABLE "chat_messages" DROP COLUMN IF EXISTS "search_vector"')
+
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            for trigger in ('chat_messages_fts_ai', 'chat_messages_fts_ad', 'chat_messages_fts_au'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS "{trigger}"')
+            cursor.execute('DROP TABLE IF EXISTS "chat_messages_fts"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_partition_messages_by_month'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
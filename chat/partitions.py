@@ -0,0 +1,131 @@
+# chat/partitions.py
+
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAME = 'chat_messages'
+DEFAULT_PARTITION = f'{TABLE_NAME}_default'
+
+
+def is_partitioned(conn=None):
+    conn = conn or connection
+    if conn.vendor != 'postgresql':
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [TABLE_NAME]
+        )
+        return cursor.fetchone() is not None
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(value, months):
+    index = value.year * 12 + (value.month - 1) + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(value):
+    return f'{TABLE_NAME}_p{value.year:04d}_{value.month:02d}'
+
+
+def list_partitions(conn=None):
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = %s ORDER BY child.relname",
+            [TABLE_NAME]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def create_partition(start, conn=None):
+    conn = conn or connection
+    start = month_start(start)
+    end = add_months(start, 1)
+    name = partition_name(start)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{TABLE_NAME}" '
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    return name
+
+
+def ensure_partitions(months_ahead=None, start=None, conn=None):
+    """
+    Pre-creates monthly partitions from `start` (default: current month)
+    up to `months_ahead` months into the future. Returns names of the
+    partitions that did not exist before.
+    """
+    conn = conn or connection
+    if months_ahead is None:
+        months_ahead = settings.CHAT_PARTITION_MONTHS_AHEAD
+
+    existing = set(list_partitions(conn))
+    current = month_start(start or timezone.now())
+    last = add_months(month_start(timezone.now()), months_ahead)
+
+    created = []
+    while current <= last:
+        name = partition_name(current)
+        if name not in existing:
+            create_partition(current, conn)
+            created.append(name)
+        current = add_months(current, 1)
+
+    if created:
+        logger.info(f"Chat partitions created | partitions={created}")
+    return created
+
+
+def expired_partitions(retention_months, now=None, conn=None):
+    cutoff = add_months(month_start(now or timezone.now()), -retention_months)
+    expired = []
+    for name in list_partitions(conn):
+        if name == DEFAULT_PARTITION:
+            continue
+        try:
+            year, month = name[len(TABLE_NAME) + 2:].split('_')
+            start = datetime(int(year), int(month), 1, tzinfo=dt_timezone.utc)
+        except ValueError:
+            continue
+        if add_months(start, 1) <= cutoff:
+            expired.append(name)
+    return expired
+
+
+def drop_expired_partitions(retention_months=None, now=None, conn=None):
+    """
+    Detaches and drops every monthly partition whose whole range is older
+    than the retention window. A retention of 0 keeps everything.
+    """
+    conn = conn or connection
+    if retention_months is None:
+        retention_months = settings.CHAT_MESSAGE_RETENTION_MONTHS
+    if not retention_months:
+        return []
+
+    dropped = expired_partitions(retention_months, now=now, conn=conn)
+    with conn.cursor() as cursor:
+        for name in dropped:
+            cursor.execute(f'ALTER TABLE "{TABLE_NAME}" DETACH PARTITION "{name}"')
+            cursor.execute(f'DROP TABLE "{name}"')
+
+    if dropped:
+        logger.info(f"Chat partitions dropped | partitions={dropped}")
+    return dropped
@@ -0,0 +1,87 @@
+# chat/replay.py
+
+import json
+
+from django.conf import settings
+import redis
+import redis.asyncio as aioredis
+import logging
+
+logger = logging.getLogger(__name__)
+
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = aioredis.from_url(settings.CHAT_REPLAY_REDIS_URL, decode_responses=True)
+    return _client
+
+
+async def append(frame):
+    """
+    Appends a broadcast frame to the capped replay stream. MAXLEN uses the
+    approximate (~) form so Redis trims whole macro nodes cheaply.
+    """
+    await get_client().xadd(
+        settings.CHAT_REPLAY_STREAM,
+        {'message_id': str(frame['message_id']), 'frame': json.dumps(frame)},
+        maxlen=settings.CHAT_REPLAY_STREAM_MAXLEN,
+        approximate=True,
+    )
+
+
+async def missed_since(last_message_id, batch_size=100):
+    """
+    Walks the stream backwards from the newest entry and collects messages
+    newer than `last_message_id`, so the cost is proportional to what was
+    missed.
+
+    Consumers append after their message is saved, in whatever order they
+    finish, so stream order is only roughly message id order. The walk goes
+    on for CHAT_REPLAY_REORDER_WINDOW_MS of stream time past the first
+    entry at or below `last_message_id`, and the result is sorted by id.
+
+    Returns (frames oldest first, complete). `complete` is False when the
+    stream does not reach back far enough and the caller must fall back
+    to the database.
+    """
+    client = get_client()
+    frames = {}
+    scanned = 0
+    stop_before = None
+    upper = '+'
+
+    while True:
+        entries = await client.xrevrange(
+            settings.CHAT_REPLAY_STREAM, max=upper, min='-', count=batch_size
+        )
+        for entry_id, fields in entries:
+            entry_ms = int(entry_id.split('-')[0])
+            if stop_before is not None and entry_ms < stop_before:
+                return _ordered(frames), True
+            scanned += 1
+            message_id = int(fields['message_id'])
+            if message_id > last_message_id:
+                frames.setdefault(message_id, json.loads(fields['frame']))
+            elif stop_before is None:
+                stop_before = entry_ms - settings.CHAT_REPLAY_REORDER_WINDOW_MS
+
+        if len(entries) < batch_size:
+            # start of the stream: complete only if nothing can have been trimmed
+            complete = stop_before is not None and scanned < settings.CHAT_REPLAY_STREAM_MAXLEN
+            return _ordered(frames), complete
+        upper = f'({entries[-1][0]}'
+
+
+def _ordered(frames):
+    return [frames[message_id] for message_id in sorted(frames)]
+
+
+def clear():
+    client = redis.Redis.from_url(settings.CHAT_REPLAY_REDIS_URL)
+    try:
+        client.delete(settings.CHAT_REPLAY_STREAM)
+    finally:
+        client.close()
@@ -0,0 +1,117 @@
+# chat/search.py
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Message
+
+FTS_TABLE = 'chat_messages_fts'
+
+# (alias, database name) -> whether that database has the FTS5 table; keyed
+# by name too so the test database is not answered from the real one
+_fts5_available = {}
+
+
+def backend():
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite':
+        key = (connection.alias, connection.settings_dict['NAME'])
+        if key not in _fts5_available:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+                    [FTS_TABLE]
+                )
+                _fts5_available[key] = cursor.fetchone() is not None
+        if _fts5_available[key]:
+            return 'fts5'
+    return 'like'
+
+
+def fts5_query(query):
+    terms = [term.replace('"', '""') for term in query.split()]
+    return ' '.join(f'"{term}"' for term in terms if term)
+
+
+def filter_queryset(queryset, query):
+    """
+    Restricts a Message queryset to rows matching `query` through the
+    search index instead of a LIKE scan.
+    """
+    engine = backend()
+
+    if engine == 'postgresql':
+        return queryset.filter(id__in=RawSQL(
+            'SELECT "id" FROM "chat_messages" '
+            'WHERE "search_vector" @@ websearch_to_tsquery(\'simple\', %s)',
+            [query]
+        ))
+    if engine == 'fts5':
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM "{FTS_TABLE}" WHERE "{FTS_TABLE}" MATCH %s',
+            [fts5_query(query)]
+        ))
+    return queryset.filter(content__icontains=query)
+
+
+def ranked_ids(query, limit, offset=0):
+    """
+    Returns [(message_id, score), ...] best match first. Higher score is
+    a better match on every backend.
+    """
+    engine = backend()
+
+    if engine == 'like':
+        ids = (
+            Message.objects.filter(content__icontains=query)
+            .values_list('id', flat=True)[offset:offset + limit]
+        )
+        return [(message_id, 0.0) for message_id in ids]
+
+    if engine == 'postgresql':
+        sql = (
+            'SELECT m."id", ts_rank(m."search_vector", q) AS score '
+            'FROM "chat_messages" m, websearch_to_tsquery(\'simple\', %s) q '
+            'WHERE m."search_vector" @@ q '
+            'ORDER BY score DESC, m."id" DESC LIMIT %s OFFSET %s'
+        )
+        params = [query, limit, offset]
+    else:
+        sql = (
+            f'SELECT rowid, -bm25("{FTS_TABLE}") AS score FROM "{FTS_TABLE}" '
+            f'WHERE "{FTS_TABLE}" MATCH %s '
+            'ORDER BY score DESC, rowid DESC LIMIT %s OFFSET %s'
+        )
+        params = [fts5_query(query), limit, offset]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [(row[0], float(row[1])) for row in cursor.fetchall()]
+
+
+def search_messages(query, page=1, page_size=20):
+    """
+    Returns (results, has_next) for one page of ranked search results.
+    Fetches one extra id to detect a next page without a COUNT query.
+    """
+    offset = (page - 1) * page_size
+    hits = ranked_ids(query, page_size + 1, offset)
+    has_next = len(hits) > page_size
+    hits = hits[:page_size]
+
+    messages = Message.objects.select_related('user').in_bulk([message_id for message_id, _ in hits])
+
+    results = [
+        {
+            'id': msg.id,
+            'message': msg.content,
+            'username': msg.user.username,
+            'user_id': msg.user.id,
+            'timestamp': msg.timestamp.isoformat(),
+            'score': score,
+        }
+        for message_id, score in hits
+        if (msg := messages.get(message_id)) is not None
+    ]
+    return results, has_next
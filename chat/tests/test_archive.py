@@ -0,0 +1,135 @@
+# chat/tests/test_archive.py
+
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from chat import archive
+from chat.models import Message
+
+User = get_user_model()
+
+
+class ArchiveTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='chat-archive-')
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        archive._cache.clear()
+        archive._indexes.clear()
+
+
+class ArchiveFileTests(ArchiveTestCase):
+
+    def rows(self, ids, start=datetime(2026, 1, 1, tzinfo=dt_timezone.utc)):
+        return [
+            {
+                'id': message_id,
+                'timestamp': start + timedelta(seconds=message_id, microseconds=message_id * 7),
+                'user_id': 1,
+                'username': 'alice',
+                'content': f'message {message_id}',
+            }
+            for message_id in ids
+        ]
+
+    def test_round_trip(self):
+        rows = self.rows(range(1, 3001))
+        archive.write_archive(rows, self.directory)
+
+        read = archive.read_before(None, 3000, self.directory)
+
+        self.assertEqual([row['id'] for row in read], list(range(1, 3001)))
+        self.assertEqual(read[0]['message'], 'message 1')
+        self.assertEqual(read[-1]['username'], 'alice')
+        self.assertEqual(
+            [row['timestamp'] for row in read],
+            [row['timestamp'].isoformat() for row in rows],
+        )
+
+    def test_timestamps_are_exact_to_the_microsecond(self):
+        # beyond 2**53 µs a float timestamp no longer holds every microsecond
+        value = datetime(2300, 6, 1, 12, 0, 0, 123457, tzinfo=dt_timezone.utc)
+        self.assertEqual(archive._from_micros(archive._to_micros(value)), value)
+
+    def test_read_before_spans_files(self):
+        archive.write_archive(self.rows(range(1, 11)), self.directory)
+        archive.write_archive(self.rows(range(11, 21)), self.directory)
+
+        read = archive.read_before(15, 8, self.directory)
+
+        self.assertEqual([row['id'] for row in read], list(range(7, 15)))
+
+    def test_is_archived(self):
+        archive.write_archive(self.rows([1, 2, 5, 8]), self.directory)
+        files = archive.list_files(self.directory)
+
+        self.assertEqual(
+            [archive.is_archived(message_id, files=files) for message_id in range(1, 10)],
+            [True, True, False, False, True, False, False, True, False],
+        )
+
+
+class MessagesPaginationTests(ArchiveTestCase):
+    """
+    get_messages pages through the database and then the archive with
+    `before` / meta.next_before.
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='x')
+        Message.objects.bulk_create(Message(user=self.user, content=f'message {i}') for i in range(30))
+        self.ids = list(Message.objects.order_by('id').values_list('id', flat=True))
+        # the oldest 17 move to the archive
+        Message.objects.filter(id__in=self.ids[:17]).update(timestamp=timezone.now() - timedelta(days=400))
+        with override_settings(CHAT_ARCHIVE_DIR=self.directory):
+            call_command('archive_messages', older_than_days=180, batch_size=10, stdout=open('/dev/null', 'w'))
+        self.client.cookies['__Host-access_token'] = str(AccessToken.for_user(self.user))
+
+    def page(self, before=None, limit=10):
+        params = {'limit': limit}
+        if before is not None:
+            params['before'] = before
+        with override_settings(CHAT_ARCHIVE_DIR=self.directory, CHAT_ARCHIVE_READS_ENABLED=True):
+            response = self.client.get('/api/chat/messages/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        body = response.json()
+        return [message['id'] for message in body['data']], body['meta']['next_before'] if body.get('meta') else None
+
+    def test_archive_holds_the_old_messages(self):
+        self.assertEqual(Message.objects.count(), 13)
+        self.assertEqual(len(archive.list_files(self.directory)), 2)
+
+    def test_pages_cross_from_database_to_archive(self):
+        pages = []
+        before = None
+        while True:
+            ids, before = self.page(before)
+            pages.append(ids)
+            if before is None:
+                break
+
+        # a full last page still carries a cursor; the page after it is empty
+        self.assertEqual(pages, [self.ids[20:30], self.ids[10:20], self.ids[0:10], []])
+
+    def test_page_straddling_the_boundary(self):
+        ids, next_before = self.page(before=self.ids[20], limit=6)
+
+        # 3 rows from the database, 3 from the archive
+        self.assertEqual(ids, self.ids[14:20])
+        self.assertEqual(next_before, self.ids[14])
+
+    def test_last_page_has_no_cursor(self):
+        ids, next_before = self.page(before=self.ids[3], limit=10)
+
+        self.assertEqual(ids, self.ids[0:3])
+        self.assertIsNone(next_before)
@@ -0,0 +1,86 @@
+# chat/tests/test_history.py
+
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import TestCase
+
+from chat import history
+from chat.consumers import ChatConsumer
+from chat.models import Message
+
+User = get_user_model()
+
+
+class RecentMessagesTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='x')
+        Message.objects.bulk_create(Message(user=self.user, content=f'old {i}') for i in range(5))
+
+    def write(self, content):
+        message = Message.objects.create(user=self.user, content=content)
+        history.append([message])
+        return message
+
+    def contents(self, limit=50):
+        return [message['message'] for message in history.recent_messages(limit)]
+
+    def test_write_is_appended_to_the_cached_list(self):
+        self.contents()
+        self.write('new')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.contents(2), ['old 4', 'new'])
+
+    def test_cached_list_is_trimmed(self):
+        Message.objects.bulk_create(Message(user=self.user, content=f'fill {i}') for i in range(95))
+        self.contents()
+        self.write('newest')
+
+        with self.assertNumQueries(0):
+            data = history.recent_messages(history.MAX_CACHED_MESSAGES + 10)
+        self.assertEqual(len(data), history.MAX_CACHED_MESSAGES)
+        self.assertEqual(data[-1]['message'], 'newest')
+
+    def test_reader_racing_a_write_does_not_cache_stale_history(self):
+        serialize = history.serialize_message
+        written = []
+
+        def write_during_read(msg):
+            # another worker saves a message after this reader queried the database
+            if not written:
+                written.append(self.write('raced'))
+            return serialize(msg)
+
+        with mock.patch.object(history, 'serialize_message', side_effect=write_during_read):
+            self.assertNotIn('raced', self.contents())
+
+        self.assertEqual(self.contents()[-1], 'raced')
+
+    def test_write_between_another_write_leaves_the_list_to_readers(self):
+        self.contents()
+        history.invalidate()
+        self.write('after')
+
+        self.assertEqual(self.contents()[-1], 'after')
+
+    def test_invalidate_drops_the_cached_list(self):
+        self.contents()
+        Message.objects.all().delete()
+        history.invalidate()
+
+        self.assertEqual(self.contents(), [])
+
+    def test_write_survives_unreachable_cache(self):
+        outage = ConnectionError('cache down')
+        with mock.patch.object(LocMemCache, 'add', side_effect=outage), \
+                mock.patch.object(LocMemCache, 'set', side_effect=outage):
+            message = async_to_sync(ChatConsumer().create_message)(self.user, 'hello')
+
+        self.assertEqual(message.content, 'hello')
+        self.assertTrue(Message.objects.filter(pk=message.pk).exists())
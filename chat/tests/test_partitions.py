@@ -0,0 +1,181 @@
+# chat/tests/test_partitions.py
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from chat import partitions
+from chat.models import Message
+
+User = get_user_model()
+
+NOW = datetime(2026, 3, 15, 12, 30, tzinfo=dt_timezone.utc)
+
+
+class FakeCursor:
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append(sql)
+        if 'pg_inherits' in sql:
+            self.rows = [(name,) for name in sorted(self.conn.partitions)]
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeConnection:
+    """Records the SQL the partition helpers run against PostgreSQL."""
+
+    vendor = 'postgresql'
+
+    def __init__(self, partitions=()):
+        self.partitions = list(partitions)
+        self.executed = []
+
+    @contextmanager
+    def cursor(self):
+        yield FakeCursor(self)
+
+
+class PartitionRangeTests(SimpleTestCase):
+
+    def test_month_start(self):
+        self.assertEqual(partitions.month_start(NOW), datetime(2026, 3, 1, tzinfo=dt_timezone.utc))
+
+    def test_add_months_crosses_years(self):
+        start = datetime(2026, 11, 1, tzinfo=dt_timezone.utc)
+
+        self.assertEqual(partitions.add_months(start, 2), datetime(2027, 1, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(partitions.add_months(start, -11), datetime(2025, 12, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(partitions.add_months(start, -23), datetime(2024, 12, 1, tzinfo=dt_timezone.utc))
+
+    def test_partition_name(self):
+        self.assertEqual(partitions.partition_name(NOW), 'chat_messages_p2026_03')
+        self.assertEqual(
+            partitions.partition_name(datetime(987, 12, 1, tzinfo=dt_timezone.utc)),
+            'chat_messages_p0987_12',
+        )
+
+    def test_create_partition_covers_one_month(self):
+        conn = FakeConnection()
+
+        name = partitions.create_partition(datetime(2026, 12, 20, tzinfo=dt_timezone.utc), conn=conn)
+
+        self.assertEqual(name, 'chat_messages_p2026_12')
+        self.assertEqual(conn.executed, [
+            'CREATE TABLE IF NOT EXISTS "chat_messages_p2026_12" PARTITION OF "chat_messages" '
+            "FOR VALUES FROM ('2026-12-01T00:00:00+00:00') TO ('2027-01-01T00:00:00+00:00')"
+        ])
+
+    @mock.patch('chat.partitions.timezone.now', return_value=NOW)
+    def test_ensure_partitions_creates_missing_months(self, _now):
+        conn = FakeConnection(['chat_messages_default', 'chat_messages_p2026_04'])
+
+        created = partitions.ensure_partitions(months_ahead=2, conn=conn)
+
+        self.assertEqual(created, ['chat_messages_p2026_03', 'chat_messages_p2026_05'])
+
+    @mock.patch('chat.partitions.timezone.now', return_value=NOW)
+    def test_expired_partitions(self, _now):
+        conn = FakeConnection([
+            'chat_messages_default',
+            'chat_messages_p2025_02',
+            'chat_messages_p2025_03',
+            'chat_messages_p2025_04',
+            'chat_messages_p2026_03',
+            'chat_messages_pbogus',
+        ])
+
+        # 12 months back from March 2026: everything before 2025-03-01 is gone
+        self.assertEqual(partitions.expired_partitions(12, conn=conn), ['chat_messages_p2025_02'])
+        self.assertEqual(
+            partitions.expired_partitions(11, conn=conn),
+            ['chat_messages_p2025_02', 'chat_messages_p2025_03'],
+        )
+
+    @mock.patch('chat.partitions.timezone.now', return_value=NOW)
+    def test_drop_expired_partitions(self, _now):
+        conn = FakeConnection(['chat_messages_default', 'chat_messages_p2024_01', 'chat_messages_p2026_01'])
+
+        dropped = partitions.drop_expired_partitions(retention_months=12, conn=conn)
+
+        self.assertEqual(dropped, ['chat_messages_p2024_01'])
+        self.assertEqual(conn.executed[-2:], [
+            'ALTER TABLE "chat_messages" DETACH PARTITION "chat_messages_p2024_01"',
+            'DROP TABLE "chat_messages_p2024_01"',
+        ])
+
+    def test_zero_retention_keeps_everything(self):
+        conn = FakeConnection(['chat_messages_p2000_01'])
+
+        self.assertEqual(partitions.drop_expired_partitions(retention_months=0, conn=conn), [])
+        self.assertEqual(conn.executed, [])
+
+    def test_sqlite_is_not_partitioned(self):
+        self.assertFalse(partitions.is_partitioned(mock.Mock(vendor='sqlite')))
+
+
+@mock.patch('chat.management.commands.chat_partitions.timezone.now', return_value=NOW)
+class RetentionFallbackTests(TestCase):
+    """On SQLite chat_partitions falls back to a DELETE."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='x')
+        for days, content in ((400, 'old'), (300, 'kept'), (1, 'new')):
+            message = Message.objects.create(user=self.user, content=content)
+            Message.objects.filter(id=message.id).update(timestamp=NOW - timedelta(days=days))
+
+    def run_command(self, *args):
+        out = StringIO()
+        call_command('chat_partitions', *args, stdout=out)
+        return out.getvalue()
+
+    def test_deletes_messages_past_retention(self, _now):
+        with mock.patch('chat.history.invalidate') as invalidate:
+            output = self.run_command('--retention-months=12')
+
+        self.assertEqual(
+            list(Message.objects.order_by('timestamp').values_list('content', flat=True)),
+            ['kept', 'new'],
+        )
+        self.assertIn('Deleted 1 messages older than 2025-03-01', output)
+        invalidate.assert_called_once_with()
+
+    def test_dry_run_deletes_nothing(self, _now):
+        output = self.run_command('--retention-months=12', '--dry-run')
+
+        self.assertEqual(Message.objects.count(), 3)
+        self.assertIn('Would delete 1 messages older than 2025-03-01', output)
+
+    def test_zero_retention_keeps_everything(self, _now):
+        output = self.run_command('--retention-months=0')
+
+        self.assertEqual(Message.objects.count(), 3)
+        self.assertIn('falling back to DELETE', output)
+        self.assertNotIn('Deleted', output)
+
+
+@mock.patch('chat.partitions.timezone.now', return_value=NOW)
+@mock.patch('chat.management.commands.chat_partitions.timezone.now', return_value=NOW)
+@mock.patch('chat.partitions.is_partitioned', return_value=True)
+class PartitionedCommandTests(SimpleTestCase):
+
+    def test_dry_run_reports_changes(self, _partitioned, _now, _partitions_now):
+        existing = ['chat_messages_default', 'chat_messages_p2024_06', 'chat_messages_p2026_03']
+        with mock.patch('chat.partitions.list_partitions', return_value=existing):
+            out = StringIO()
+            call_command('chat_partitions', '--months-ahead=1', '--retention-months=12', '--dry-run', stdout=out)
+
+        self.assertEqual(out.getvalue().splitlines(), [
+            'Would create chat_messages_p2026_04',
+            'Would drop chat_messages_p2024_06',
+        ])
@@ -0,0 +1,86 @@
+# chat/tests/test_replay.py
+
+"""
+missed_since() against an in-memory stand-in for the Redis stream, with
+entries appended out of message id order as concurrent consumers do.
+"""
+
+import json
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, override_settings
+
+from chat import replay
+
+
+class FakeStream:
+
+    def __init__(self):
+        self.entries = []
+
+    def add(self, message_id, ms):
+        sequence = sum(1 for entry_id, _ in self.entries if entry_id.startswith(f'{ms}-'))
+        self.entries.append((f'{ms}-{sequence}', {
+            'message_id': str(message_id),
+            'frame': json.dumps({'message_id': message_id}),
+        }))
+
+    async def xrevrange(self, stream, max='+', min='-', count=None):
+        entries = list(reversed(self.entries))
+        if max != '+':
+            upper = max.lstrip('(')
+            entries = entries[[entry_id for entry_id, _ in entries].index(upper) + 1:]
+        return entries[:count]
+
+
+@override_settings(CHAT_REPLAY_REORDER_WINDOW_MS=1000, CHAT_REPLAY_STREAM_MAXLEN=1000)
+class MissedSinceTests(SimpleTestCase):
+
+    def setUp(self):
+        self.stream = FakeStream()
+        patcher = mock.patch.object(replay, 'get_client', return_value=self.stream)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def missed(self, last_message_id, batch_size=100):
+        frames, complete = async_to_sync(replay.missed_since)(last_message_id, batch_size)
+        return [frame['message_id'] for frame in frames], complete
+
+    def test_in_order_stream(self):
+        for message_id in range(1, 11):
+            self.stream.add(message_id, ms=1000 + message_id)
+        self.assertEqual(self.missed(7), ([8, 9, 10], True))
+
+    def test_lower_id_appended_after_higher_ones(self):
+        # 12 was saved first but appended last
+        for message_id, ms in [(10, 1000), (11, 1001), (13, 1002), (14, 1003), (12, 1004)]:
+            self.stream.add(message_id, ms)
+        self.assertEqual(self.missed(12), ([13, 14], True))
+        self.assertEqual(self.missed(11), ([12, 13, 14], True))
+
+    def test_higher_id_below_the_boundary_entry(self):
+        # 13 committed late and sits under 12 and 11 in the stream
+        for message_id, ms in [(10, 1000), (13, 1500), (11, 1600), (12, 1700)]:
+            self.stream.add(message_id, ms)
+        self.assertEqual(self.missed(11), ([12, 13], True))
+
+    def test_walk_stops_after_the_window(self):
+        for message_id in range(1, 301):
+            self.stream.add(message_id, ms=message_id * 100)
+        with mock.patch.object(self.stream, 'xrevrange', wraps=self.stream.xrevrange) as xrevrange:
+            self.assertEqual(self.missed(295, batch_size=10), ([296, 297, 298, 299, 300], True))
+        self.assertEqual(xrevrange.call_count, 2)
+
+    def test_stream_not_reaching_back_is_incomplete(self):
+        for message_id in range(50, 60):
+            self.stream.add(message_id, ms=1000 + message_id)
+        ids, complete = self.missed(20)
+        self.assertEqual(ids, list(range(50, 60)))
+        self.assertFalse(complete)
+
+    @override_settings(CHAT_REPLAY_STREAM_MAXLEN=5)
+    def test_trimmed_stream_inside_the_window_is_incomplete(self):
+        for message_id in range(1, 6):
+            self.stream.add(message_id, ms=1000 + message_id)
+        self.assertEqual(self.missed(3), ([4, 5], False))
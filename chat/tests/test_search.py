@@ -0,0 +1,164 @@
+# chat/tests/test_search.py
+
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from chat import search
+from chat.models import Message
+
+User = get_user_model()
+
+
+class SearchTestCase(TestCase):
+
+    def setUp(self):
+        search._fts5_available.clear()
+        self.addCleanup(search._fts5_available.clear)
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='x')
+        self.messages = {
+            content: Message.objects.create(user=self.user, content=content)
+            for content in (
+                'deploy the release tonight',
+                'release notes are up',
+                'release release release',
+                'lunch anyone?',
+                'Deployment finished',
+            )
+        }
+
+    def ids(self, *contents):
+        return [self.messages[content].id for content in contents]
+
+    def force_like(self):
+        key = (connection.alias, connection.settings_dict['NAME'])
+        patcher = mock.patch.dict(search._fts5_available, {key: False})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class SearchBackendTests(SearchTestCase):
+
+    def test_sqlite_uses_fts5(self):
+        self.assertEqual(search.backend(), 'fts5')
+
+    def test_fts5_ranks_by_relevance(self):
+        hits = search.ranked_ids('release', limit=10)
+
+        self.assertEqual([message_id for message_id, _ in hits][0], self.messages['release release release'].id)
+        self.assertCountEqual(
+            [message_id for message_id, _ in hits],
+            self.ids('deploy the release tonight', 'release notes are up', 'release release release'),
+        )
+        scores = [score for _, score in hits]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_fts5_matches_whole_terms(self):
+        hits = search.ranked_ids('deploy', limit=10)
+
+        self.assertEqual([message_id for message_id, _ in hits], self.ids('deploy the release tonight'))
+
+    def test_fts5_query_quotes_terms(self):
+        self.assertEqual(search.fts5_query('say "hi" OR x'), '"say" """hi""" "OR" "x"')
+        self.assertTrue(search.ranked_ids('"release', limit=10))
+
+    def test_fts5_index_follows_updates_and_deletes(self):
+        message = self.messages['lunch anyone?']
+        message.content = 'release lunch'
+        message.save()
+        self.messages['release notes are up'].delete()
+
+        hits = search.ranked_ids('release', limit=10)
+
+        self.assertIn(message.id, [message_id for message_id, _ in hits])
+        self.assertNotIn(self.messages['release notes are up'].id, [message_id for message_id, _ in hits])
+
+    def test_like_fallback(self):
+        self.force_like()
+
+        self.assertEqual(search.backend(), 'like')
+        hits = search.ranked_ids('deploy', limit=10)
+        self.assertCountEqual(
+            [message_id for message_id, _ in hits],
+            self.ids('deploy the release tonight', 'Deployment finished'),
+        )
+        self.assertEqual({score for _, score in hits}, {0.0})
+
+    def test_filter_queryset_on_both_backends(self):
+        queryset = search.filter_queryset(Message.objects.all(), 'release')
+        self.assertEqual(queryset.count(), 3)
+
+        self.force_like()
+        queryset = search.filter_queryset(Message.objects.all(), 'deploy')
+        self.assertEqual(queryset.count(), 2)
+
+    def test_availability_is_cached_per_database(self):
+        search.backend()
+        other = ('other', 'other.sqlite3')
+        search._fts5_available[other] = False
+
+        self.assertEqual(search.backend(), 'fts5')
+        with self.assertNumQueries(0):
+            search.backend()
+
+    def test_search_messages_pages(self):
+        results, has_next = search.search_messages('release', page=1, page_size=2)
+        self.assertEqual(len(results), 2)
+        self.assertTrue(has_next)
+        self.assertEqual(results[0]['username'], 'alice')
+
+        results, has_next = search.search_messages('release', page=2, page_size=2)
+        self.assertEqual(len(results), 1)
+        self.assertFalse(has_next)
+
+
+class SearchViewTests(SearchTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.cookies['__Host-access_token'] = str(AccessToken.for_user(self.user))
+
+    def test_search(self):
+        response = self.client.get('/api/chat/search/', {'q': 'release', 'page_size': 2})
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['data'][0]['message'], 'release release release')
+        self.assertEqual(body['meta'], {'page': 1, 'page_size': 2, 'has_next': True})
+
+    def test_search_with_like_fallback(self):
+        self.force_like()
+
+        response = self.client.get('/api/chat/search/', {'q': 'DEPLOY'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertCountEqual(
+            [message['id'] for message in response.json()['data']],
+            self.ids('deploy the release tonight', 'Deployment finished'),
+        )
+
+    def test_query_is_required(self):
+        response = self.client.get('/api/chat/search/', {'q': '  '})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('q', response.json()['errors'])
+
+    def test_query_length_is_limited(self):
+        response = self.client.get('/api/chat/search/', {'q': 'x' * 201})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_pagination(self):
+        response = self.client.get('/api/chat/search/', {'q': 'release', 'page': 'two'})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_requires_authentication(self):
+        self.client.cookies.clear()
+
+        response = self.client.get('/api/chat/search/', {'q': 'release'})
+
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,106 @@
+# chat/tests/test_writer.py
+
+"""
+MessageWriter (CHAT_WRITE_QUEUE): batches commit in one transaction, a
+failing batch is retried row by row, and neither a database nor a cache
+error stops the writer thread or leaves a caller waiting.
+"""
+
+import asyncio
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.test import TransactionTestCase, override_settings
+
+from chat import history
+from chat.models import Message
+from chat.writer import MessageWriter
+
+User = get_user_model()
+
+
+@override_settings(CHAT_WRITE_QUEUE=True, CHAT_WRITE_QUEUE_BATCH=10)
+class MessageWriterTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='x')
+        self.writer = MessageWriter()
+
+    def write(self, rows):
+        """
+        Runs one batch through write() and returns each row's result or exception.
+        """
+        loop = asyncio.new_event_loop()
+        try:
+            futures = [loop.create_future() for _ in rows]
+            self.writer.write([(user, content, loop, future) for (user, content), future in zip(rows, futures)])
+            return loop.run_until_complete(asyncio.gather(*futures, return_exceptions=True))
+        finally:
+            loop.close()
+
+    def save(self, *contents):
+        async def save_all():
+            return await asyncio.gather(*(self.writer.save(self.user, content) for content in contents))
+        return async_to_sync(save_all)()
+
+    def test_batch_commits_in_one_insert(self):
+        with mock.patch.object(Message.objects, 'bulk_create', wraps=Message.objects.bulk_create) as bulk_create, \
+                mock.patch.object(self.writer, 'insert_one') as insert_one:
+            results = self.write([(self.user, f'message {i}') for i in range(3)])
+
+        self.assertEqual(bulk_create.call_count, 1)
+        insert_one.assert_not_called()
+        self.assertEqual([message.content for message in results], ['message 0', 'message 1', 'message 2'])
+        self.assertEqual(Message.objects.count(), 3)
+
+    def test_failed_batch_is_retried_row_by_row(self):
+        ghost = User(id=999999, username='ghost')
+        results = self.write([(self.user, 'first'), (ghost, 'orphan'), (self.user, 'second')])
+
+        self.assertEqual(results[0].content, 'first')
+        self.assertIsInstance(results[1], IntegrityError)
+        self.assertEqual(results[2].content, 'second')
+        self.assertEqual(list(Message.objects.order_by('id').values_list('content', flat=True)), ['first', 'second'])
+
+    def test_cache_failure_after_commit_still_resolves(self):
+        with mock.patch.object(history, 'append', side_effect=ConnectionError('cache down')):
+            results = self.write([(self.user, 'kept')])
+
+        self.assertEqual(results[0].content, 'kept')
+        self.assertTrue(Message.objects.filter(content='kept').exists())
+
+    def test_unexpected_error_fails_the_batch(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        future = loop.create_future()
+        with mock.patch.object(self.writer, 'commit', side_effect=ValueError('boom')), \
+                self.assertRaises(ValueError):
+            self.writer.write([(self.user, 'lost', loop, future)])
+
+        loop.run_until_complete(asyncio.sleep(0))
+        self.assertIsInstance(future.exception(), RuntimeError)
+
+    def test_thread_survives_errors(self):
+        with mock.patch.object(history, 'append', side_effect=ConnectionError('cache down')):
+            first, = self.save('during outage')
+        with mock.patch.object(self.writer, 'commit', side_effect=ValueError('boom')):
+            with self.assertRaises(RuntimeError):
+                self.save('failed')
+        second, = self.save('after outage')
+
+        self.assertTrue(self.writer.thread.is_alive())
+        self.assertEqual((first.content, second.content), ('during outage', 'after outage'))
+
+    def test_dead_thread_is_restarted(self):
+        self.save('first')
+        dead = mock.Mock(is_alive=mock.Mock(return_value=False))
+        self.writer.thread = dead
+
+        message, = self.save('second')
+
+        self.assertIsNot(self.writer.thread, dead)
+        self.assertEqual(message.content, 'second')
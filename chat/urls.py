@@ -8,5 +8,6 @@ app_name = 'chat'
 urlpatterns = [
     path('messages/', views.get_messages, name='get_messages'),
     path('messages/delete-all/', views.delete_all_messages, name='delete_all_messages'),
+    path('search/', views.search_messages, name='search_messages'),
     path('online-users/', views.get_online_users, name='get_online_users'),
 ]
\ No newline at end of file
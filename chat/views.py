@@ -1,44 +1,56 @@
 # chat/views.py
 
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
 from accounts.permissions import IsAdminUser
-from core.responses import success_response, error_response
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from core.async_api import async_api_view
+from core.sql import query_budget
+from core.responses import success_response, error_response, validation_error_response
+from channels.db import database_sync_to_async
+from django.conf import settings
+from . import archive, fanout, history, replay, search
 from .models import Message
 from .consumers import ChatConsumer
 import logging
 
 logger = logging.getLogger(__name__)
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def get_messages(request):
+def load_messages(limit, before=None):
+    if before is None:
+        data = history.recent_messages(limit)
+    else:
+        messages = Message.objects.select_related('user').filter(id__lt=before)[:limit]
+        data = [history.serialize_message(msg) for msg in reversed(messages)]
+    
+    if len(data) < limit and settings.CHAT_ARCHIVE_READS_ENABLED:
+        archive_before = data[0]['id'] if data else before
+        data = archive.read_before(archive_before, limit - len(data)) + data
+    
+    return data
+
+
+@query_budget(2)
+@async_api_view(['GET'])
+async def get_messages(request):
     request_id = getattr(request, 'id', None)
     
     try:
         limit = int(request.GET.get('limit', 50))
         limit = min(limit, 100)
+        before = request.GET.get('before')
+        before = int(before) if before else None
         
-        messages = Message.objects.select_related('user').all()[:limit]
-        
-        data = [
-            {
-                'id': msg.id,
-                'message': msg.content,
-                'username': msg.user.username,
-                'user_id': msg.user.id,
-                'timestamp': msg.timestamp.isoformat(),
-            }
-            for msg in reversed(messages)
-        ]
+        data = await database_sync_to_async(load_messages)(limit, before)
         
-        logger.info(f"Messages retrieved | count={len(data)} | user={request.user.username} | request_id={request_id}")
+        logger.info(
+            "Messages retrieved | count=%s | user=%s | request_id=%s",
+            len(data), request.user.username, request_id,
+            extra={'request_id': request_id}
+        )
         
         return success_response(
             message="Messages retrieved successfully",
             data=data,
+            meta={'next_before': data[0]['id'] if len(data) == limit else None},
             request_id=request_id
         )
         
@@ -51,6 +63,7 @@ def get_messages(request):
         )
 
 
+@query_budget(3)
 @api_view(['DELETE'])
 @permission_classes([IsAdminUser])
 def delete_all_messages(request):
@@ -59,9 +72,15 @@ def delete_all_messages(request):
     try:
         count = Message.objects.count()
         Message.objects.all().delete()
+        history.invalidate()
         
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
+        if settings.CHAT_REPLAY_ENABLED:
+            try:
+                replay.clear()
+            except Exception as e:
+                logger.warning(f"Replay stream clear failed | error={str(e)} | request_id={request_id}")
+        
+        fanout.group_send_sync(
             'global_chat',
             {
                 'type': 'clear_all_messages',
@@ -84,21 +103,19 @@ def delete_all_messages(request):
         )
 
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def get_online_users(request):
+@query_budget(1)
+@async_api_view(['GET'])
+async def get_online_users(request):
     request_id = getattr(request, 'id', None)
     
     try:
-        unique_users = {}
-        for channel_data in ChatConsumer.connected_users.values():
-            user_id = channel_data['user_id']
-            if user_id not in unique_users:
-                unique_users[user_id] = channel_data['username']
-        
-        user_list = list(unique_users.values())
+        user_list = ChatConsumer.online_usernames()
         
-        logger.info(f"Online users retrieved | count={len(user_list)} | request_id={request_id}")
+        logger.info(
+            "Online users retrieved | count=%s | request_id=%s",
+            len(user_list), request_id,
+            extra={'request_id': request_id}
+        )
         
         return success_response(
             message="Online users retrieved successfully",
@@ -112,4 +129,62 @@ def get_online_users(request):
             message="Failed to retrieve online users",
             errors={"detail": str(e)},
             request_id=request_id
+        )
+
+
+@query_budget(4)
+@async_api_view(['GET'])
+async def search_messages(request):
+    request_id = getattr(request, 'id', None)
+    
+    query = request.GET.get('q', '').strip()
+    
+    if not query:
+        return validation_error_response(
+            message="Search query is required",
+            errors={"q": ["This field is required"]},
+            request_id=request_id
+        )
+    
+    if len(query) > 200:
+        return validation_error_response(
+            message="Search query is too long",
+            errors={"q": ["Search query must be at most 200 characters"]},
+            request_id=request_id
+        )
+    
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+        page_size = min(max(int(request.GET.get('page_size', 20)), 1), 50)
+    except ValueError:
+        return validation_error_response(
+            message="Invalid pagination parameters",
+            errors={"page": ["page and page_size must be integers"]},
+            request_id=request_id
+        )
+    
+    try:
+        results, has_next = await database_sync_to_async(search.search_messages)(
+            query, page=page, page_size=page_size
+        )
+        
+        logger.info(
+            "Messages searched | results=%s | page=%s | user=%s | request_id=%s",
+            len(results), page, request.user.username, request_id,
+            extra={'request_id': request_id}
+        )
+        
+        return success_response(
+            message="Search completed successfully",
+            data=results,
+            meta={'page': page, 'page_size': page_size, 'has_next': has_next},
+            request_id=request_id
+        )
+        
+    except Exception as e:
+        logger.error(f"Error searching messages | error={str(e)} | request_id={request_id}")
+        return error_response(
+            message="Failed to search messages",
+            errors={"detail": str(e)},
+            request_id=request_id
         )
\ No newline at end of file
@@ -0,0 +1,138 @@
+# chat/writer.py
+
+"""
+Single writer for chat inserts (CHAT_WRITE_QUEUE).
+
+SQLite allows one writer at a time. Instead of every consumer taking the
+write lock in its own thread, consumers enqueue messages and one thread
+per process inserts whatever has queued up, up to CHAT_WRITE_QUEUE_BATCH
+rows, in a single transaction. Under load many messages share one commit
+and one lock acquisition; the other processes' writers wait on the busy
+timeout.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+
+from core import dbrouting
+from . import history
+from .models import Message
+
+logger = logging.getLogger(__name__)
+
+
+class MessageWriter:
+
+    def __init__(self):
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='chat-writer', daemon=True)
+                self.thread.start()
+
+    async def save(self, user, content):
+        """
+        Returns the saved Message once its batch has committed.
+        """
+        if self.thread is None or not self.thread.is_alive():
+            self.start()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.queue.put((user, content, loop, future))
+        return await future
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < settings.CHAT_WRITE_QUEUE_BATCH:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.write(batch)
+            except Exception as e:
+                # write() resolves the futures itself; keep the thread alive for the next batch
+                logger.error("Chat writer error | size=%s | error=%s", len(batch), e, exc_info=True)
+
+    def write(self, batch):
+        messages = None
+        try:
+            messages = self.commit(batch)
+            self.after_commit(messages)
+        finally:
+            if messages is None:
+                messages = [RuntimeError("Chat write failed")] * len(batch)
+            for (_, _, loop, future), result in zip(batch, messages):
+                try:
+                    loop.call_soon_threadsafe(_resolve, future, result)
+                except RuntimeError:
+                    # the caller's event loop is gone
+                    pass
+
+    def commit(self, batch):
+        """
+        Returns one saved Message or exception per queued row.
+        """
+        try:
+            return self.insert(batch)
+        except DatabaseError as e:
+            # e.g. a user deleted mid-session; find the rows that fail
+            logger.warning("Chat write batch failed, retrying row by row | size=%s | error=%s", len(batch), e)
+            return [self.insert_one(user, content) for user, content, _, _ in batch]
+        except Exception as e:
+            logger.error("Chat write batch failed | size=%s | error=%s", len(batch), e)
+            # start the next batch on a fresh connection
+            connection.close()
+            return [e] * len(batch)
+
+    def after_commit(self, messages):
+        saved = [message for message in messages if not isinstance(message, Exception)]
+        if not saved:
+            return
+        # best effort: the rows are committed whatever happens to the cache
+        try:
+            history.append(saved)
+            for user_id in {message.user_id for message in saved}:
+                dbrouting.record_write(user_id)
+        except Exception as e:
+            logger.warning("Chat write side effects failed | size=%s | error=%s", len(saved), e)
+
+    def insert(self, batch):
+        messages = [Message(user=user, content=content) for user, content, _, _ in batch]
+        with transaction.atomic():
+            if connection.features.can_return_rows_from_bulk_insert:
+                Message.objects.bulk_create(messages)
+            else:
+                for message in messages:
+                    message.save()
+        return messages
+
+    def insert_one(self, user, content):
+        try:
+            with transaction.atomic():
+                return Message.objects.create(user=user, content=content)
+        except DatabaseError as e:
+            logger.error("Chat write failed | user_id=%s | error=%s", user.id, e)
+            return e
+
+
+def _resolve(future, result):
+    if future.cancelled():
+        return
+    if isinstance(result, Exception):
+        future.set_exception(result)
+    else:
+        future.set_result(result)
+
+
+writer = MessageWriter()
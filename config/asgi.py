@@ -6,19 +6,30 @@ import django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.security.websocket import AllowedHostsOriginValidator
+from chat import drain
 from chat.middleware import JWTAuthMiddleware
 from chat.routing import websocket_urlpatterns
+from core.loopmonitor import LoopMonitorMiddleware
+from core.profiling import install_signal_handler
+from core.redischeck import log_startup_report, warn_unshared_cache
 
 django_asgi_app = get_asgi_application()
+install_signal_handler()
+drain.install_signal_handler()
 
-application = ProtocolTypeRouter({
+if settings.REDIS_STARTUP_CHECK:
+    log_startup_report()
+warn_unshared_cache()
+
+application = LoopMonitorMiddleware(ProtocolTypeRouter({
     "http": django_asgi_app,
     "websocket": AllowedHostsOriginValidator(
         JWTAuthMiddleware(
             URLRouter(websocket_urlpatterns)
         )
     ),
-})
+}))
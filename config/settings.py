@@ -34,8 +34,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'core.middleware.RequestIDMiddleware',
+    'core.middleware.LoadSheddingMiddleware',
+    'core.middleware.TracingMiddleware',
+    'core.middleware.QueryStatsMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'core.middleware.SecurityHeadersMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -83,21 +88,96 @@ TEMPLATES = [
 WSGI_APPLICATION = 'config.wsgi.application'
 ASGI_APPLICATION = 'config.asgi.application'
 
+# Redis topology, shared by the channel layer, the cache (throttling, chat history),
+# the replay stream and local fan-out. Lists are comma-separated.
+REDIS_URL = os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/0')
+# channel layer shards; channels and groups are consistent-hashed across them
+REDIS_CHANNEL_HOSTS = [url.strip() for url in os.getenv('REDIS_CHANNEL_HOSTS', REDIS_URL).split(',') if url.strip()]
+# with sentinels set, each master name is one shard and REDIS_CHANNEL_HOSTS is ignored
+REDIS_SENTINELS = [
+    (host, int(port))
+    for host, port in (entry.strip().rsplit(':', 1) for entry in os.getenv('REDIS_SENTINELS', '').split(',') if entry.strip())
+]
+REDIS_SENTINEL_MASTERS = [name.strip() for name in os.getenv('REDIS_SENTINEL_MASTERS', 'mymaster').split(',') if name.strip()]
+# connections per pool, per process
+REDIS_POOL_SIZE = int(os.getenv('REDIS_POOL_SIZE', '50'))
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', '5'))
+REDIS_STARTUP_CHECK = os.getenv('REDIS_STARTUP_CHECK', 'True') == 'True'
+
+if REDIS_SENTINELS:
+    _channel_hosts = [
+        {'sentinels': REDIS_SENTINELS, 'master_name': name, 'max_connections': REDIS_POOL_SIZE}
+        for name in REDIS_SENTINEL_MASTERS
+    ]
+else:
+    _channel_hosts = [{'address': url, 'max_connections': REDIS_POOL_SIZE} for url in REDIS_CHANNEL_HOSTS]
+
 CHANNEL_LAYERS = {
     'default': {
         'BACKEND': 'channels_redis.core.RedisChannelLayer',
         'CONFIG': {
-            'hosts': [('127.0.0.1', 6379)],
+            'hosts': _channel_hosts,
+            'capacity': int(os.getenv('CHANNEL_LAYER_CAPACITY', '100')),
+            'expiry': int(os.getenv('CHANNEL_LAYER_EXPIRY', '60')),
+            'group_expiry': int(os.getenv('CHANNEL_LAYER_GROUP_EXPIRY', '86400')),
         },
     },
 }
 
+# first URL takes writes, the others serve reads (replicas). Throttle counters and
+# chat history invalidation live here, so every worker must share it; an empty
+# REDIS_CACHE_URL keeps a per-process memory cache (single worker only)
+REDIS_CACHE_URLS = [url.strip() for url in os.getenv('REDIS_CACHE_URL', REDIS_URL).split(',') if url.strip()]
+if REDIS_CACHE_URLS:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URLS,
+            'KEY_PREFIX': 'chat',
+            'OPTIONS': {
+                'max_connections': REDIS_POOL_SIZE,
+                'socket_timeout': REDIS_SOCKET_TIMEOUT,
+                'socket_connect_timeout': REDIS_SOCKET_TIMEOUT,
+            },
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+
 DATABASE_URL = os.getenv('DATABASE_URL')
+
+# psycopg 3 connection pool, shared by all threads of a worker process. Every
+# sync_to_async thread would otherwise keep its own persistent connection.
+# Keep DB_POOL_MAX_SIZE x worker processes below Postgres max_connections.
+DB_POOL_ENABLED = os.getenv('DB_POOL_ENABLED', 'True') == 'True'
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '2'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+DB_POOL_MAX_IDLE = float(os.getenv('DB_POOL_MAX_IDLE', '300'))
+
 if DATABASE_URL and DATABASE_URL.startswith('postgresql'):
     import dj_database_url
-    DATABASES = {
-        'default': dj_database_url.config(default=DATABASE_URL, conn_max_age=60)
-    }
+    from importlib.util import find_spec
+
+    if DB_POOL_ENABLED and find_spec('psycopg_pool'):
+        # pooled connections go back to the pool at the end of each request / database_sync_to_async call
+        DATABASES = {
+            'default': dj_database_url.config(default=DATABASE_URL, conn_max_age=0)
+        }
+        DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+            'min_size': DB_POOL_MIN_SIZE,
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': DB_POOL_TIMEOUT,
+            'max_idle': DB_POOL_MAX_IDLE,
+        }
+    else:
+        DATABASES = {
+            'default': dj_database_url.config(default=DATABASE_URL, conn_max_age=60)
+        }
 else:
     DATABASES = {
         'default': {
@@ -106,6 +186,87 @@ else:
         }
     }
 
+# Single-node SQLite profile: WAL lets readers run alongside the writer,
+# synchronous=NORMAL fsyncs at checkpoints instead of every commit, and
+# BEGIN IMMEDIATE takes the write lock up front so writers wait on the busy
+# timeout instead of failing with "database is locked" on lock upgrade.
+SQLITE_TUNED = os.getenv('SQLITE_TUNED', 'True') == 'True'
+SQLITE_BUSY_TIMEOUT = float(os.getenv('SQLITE_BUSY_TIMEOUT', '20'))
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', '65536'))
+SQLITE_TUNED_OPTIONS = {
+    'timeout': SQLITE_BUSY_TIMEOUT,
+    'transaction_mode': 'IMMEDIATE',
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        f'PRAGMA mmap_size={SQLITE_MMAP_SIZE};'
+        f'PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB};'
+        'PRAGMA temp_store=MEMORY;'
+    ),
+}
+if SQLITE_TUNED and DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default']['OPTIONS'] = dict(SQLITE_TUNED_OPTIONS)
+
+# Chat inserts from WebSocket consumers go through one writer thread per
+# process that commits them in batches; on by default for SQLite
+CHAT_WRITE_QUEUE = os.getenv(
+    'CHAT_WRITE_QUEUE', str(DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3')
+) == 'True'
+CHAT_WRITE_QUEUE_BATCH = int(os.getenv('CHAT_WRITE_QUEUE_BATCH', '100'))
+
+# Optional read replica, e.g. postgresql://... or sqlite:///replica.sqlite3 for local testing
+DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL')
+if DATABASE_REPLICA_URL:
+    import dj_database_url
+    DATABASES['replica'] = dj_database_url.parse(
+        DATABASE_REPLICA_URL, conn_max_age=DATABASES['default'].get('CONN_MAX_AGE', 0)
+    )
+    if 'pool' in DATABASES['default'].get('OPTIONS', {}) and DATABASE_REPLICA_URL.startswith('postgresql'):
+        DATABASES['replica'].setdefault('OPTIONS', {})['pool'] = DATABASES['default']['OPTIONS']['pool']
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['core.dbrouting.ReplicaRouter']
+DB_REPLICA_READ_YOUR_WRITES = int(os.getenv('DB_REPLICA_READ_YOUR_WRITES', '10'))
+DB_REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', '2'))
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv('DB_REPLICA_CHECK_INTERVAL', '5'))
+
+CHAT_PARTITION_MONTHS_AHEAD = int(os.getenv('CHAT_PARTITION_MONTHS_AHEAD', '3'))
+CHAT_MESSAGE_RETENTION_MONTHS = int(os.getenv('CHAT_MESSAGE_RETENTION_MONTHS', '0'))
+
+CHAT_ARCHIVE_DIR = os.getenv('CHAT_ARCHIVE_DIR', str(BASE_DIR / 'archive' / 'chat'))
+CHAT_ARCHIVE_AFTER_DAYS = int(os.getenv('CHAT_ARCHIVE_AFTER_DAYS', '180'))
+CHAT_ARCHIVE_READS_ENABLED = os.getenv('CHAT_ARCHIVE_READS_ENABLED', 'True') == 'True'
+# decompressed id/timestamp columns kept in memory (about 8 bytes per archived row each)
+CHAT_ARCHIVE_INDEX_CACHE = int(os.getenv('CHAT_ARCHIVE_INDEX_CACHE', '64'))
+
+CHAT_HISTORY_CACHE_TIMEOUT = int(os.getenv('CHAT_HISTORY_CACHE_TIMEOUT', '30'))
+
+CHAT_REPLAY_ENABLED = os.getenv('CHAT_REPLAY_ENABLED', 'True') == 'True'
+CHAT_REPLAY_REDIS_URL = REDIS_URL
+CHAT_REPLAY_STREAM = 'chat:global_chat:stream'
+CHAT_REPLAY_STREAM_MAXLEN = int(os.getenv('CHAT_REPLAY_STREAM_MAXLEN', '1000'))
+CHAT_REPLAY_MAX_MESSAGES = int(os.getenv('CHAT_REPLAY_MAX_MESSAGES', '500'))
+# how far out of message id order stream entries can be (appends happen after each save)
+CHAT_REPLAY_REORDER_WINDOW_MS = int(os.getenv('CHAT_REPLAY_REORDER_WINDOW_MS', '5000'))
+
+# 'channel_layer': one group member per socket; 'local': one Redis pub/sub subscription per process and room
+CHAT_FANOUT = os.getenv('CHAT_FANOUT', 'channel_layer')
+CHAT_FANOUT_REDIS_URL = REDIS_URL
+CHAT_FANOUT_PREFIX = 'chat:fanout:'
+
+# 0 disables a limit
+CHAT_MAX_CONNECTIONS_PER_USER = int(os.getenv('CHAT_MAX_CONNECTIONS_PER_USER', '5'))
+CHAT_MAX_CONNECTIONS_PER_PROCESS = int(os.getenv('CHAT_MAX_CONNECTIONS_PER_PROCESS', '5000'))
+
+# server pings every interval; a socket is reaped after this many unanswered pings
+CHAT_HEARTBEAT_INTERVAL = float(os.getenv('CHAT_HEARTBEAT_INTERVAL', '25'))
+CHAT_HEARTBEAT_MAX_MISSED = int(os.getenv('CHAT_HEARTBEAT_MAX_MISSED', '2'))
+
+# drain (SIGUSR1): close open sockets spread over the window, clients wait up to the jitter to reconnect
+CHAT_DRAIN_WINDOW = float(os.getenv('CHAT_DRAIN_WINDOW', '30'))
+CHAT_DRAIN_RECONNECT_JITTER_MS = int(os.getenv('CHAT_DRAIN_RECONNECT_JITTER_MS', '5000'))
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
@@ -137,6 +298,8 @@ STATICFILES_DIRS = [BASE_DIR / "front" / "client" / "dist"]
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+API_FAST_JSON = os.getenv('API_FAST_JSON', 'True') == 'True'
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'core.authentication.CookieJWTAuthentication',
@@ -145,10 +308,10 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'core.renderers.UJSONRenderer' if API_FAST_JSON else 'rest_framework.renderers.JSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'core.parsers.UJSONParser' if API_FAST_JSON else 'rest_framework.parsers.JSONParser',
     ],
     'EXCEPTION_HANDLER': 'core.exceptions.custom_exception_handler',
     'DEFAULT_THROTTLE_CLASSES': [
@@ -212,22 +375,58 @@ else:
         LOG_FILE_PATH = LOGS_DIR / 'django.log'
         USE_FILE_LOGGING = True
 
+LOG_JSON = os.getenv('LOG_JSON', 'False' if DEBUG else 'True') == 'True'
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(1024 * 1024 * 20)))
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', '1.0' if DEBUG else '0.1'))
+LOG_SAMPLED_MESSAGES = [
+    'Request started',
+    'Request completed',
+    'Messages retrieved',
+    'Online users retrieved',
+    'Messages searched',
+    'Token refresh attempt',
+    'Token refreshed',
+    'SQL stats',
+]
+
 handlers_config = {
     'console': {
-        'class': 'logging.StreamHandler',
-        'formatter': 'verbose' if DEBUG else 'simple',
+        '()': 'core.log.QueuedHandler',
+        'target': 'logging.StreamHandler',
+        'queue_size': LOG_QUEUE_SIZE,
+        'formatter': 'json' if LOG_JSON else ('verbose' if DEBUG else 'simple'),
+        'filters': ['sample_routine'],
     },
 }
 
 if USE_FILE_LOGGING:
     handlers_config['file'] = {
-        'class': 'logging.handlers.RotatingFileHandler',
+        '()': 'core.log.QueuedHandler',
+        'target': 'logging.handlers.RotatingFileHandler',
+        'queue_size': LOG_QUEUE_SIZE,
         'filename': LOG_FILE_PATH,
-        'maxBytes': 1024 * 1024 * 1,
+        'maxBytes': LOG_MAX_BYTES,
         'backupCount': 4,
-        'formatter': 'verbose',
+        'formatter': 'json' if LOG_JSON else 'verbose',
+        'filters': ['sample_routine'],
     }
 
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'True') == 'True'
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '1.0' if DEBUG else '0.01'))
+TRACE_FILE_PATH = os.getenv('TRACE_FILE_PATH', str(Path(LOG_FILE_PATH).parent / 'traces.ndjson'))
+
+handlers_config['traces'] = {
+    '()': 'core.log.QueuedHandler',
+    'target': 'logging.handlers.RotatingFileHandler',
+    'queue_size': LOG_QUEUE_SIZE,
+    'filename': TRACE_FILE_PATH,
+    'maxBytes': LOG_MAX_BYTES,
+    'backupCount': 2,
+    'delay': True,
+    'formatter': 'raw',
+}
+
 if DEBUG:
     active_handlers = ['console']
 else:
@@ -245,6 +444,20 @@ LOGGING = {
             'format': '[{levelname}] {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'core.log.JSONFormatter',
+        },
+        'raw': {
+            'format': '{message}',
+            'style': '{',
+        },
+    },
+    'filters': {
+        'sample_routine': {
+            '()': 'core.log.SamplingFilter',
+            'rate': LOG_SAMPLE_RATE,
+            'prefixes': LOG_SAMPLED_MESSAGES,
+        },
     },
     'handlers': handlers_config,
     'root': {
@@ -262,6 +475,16 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'core.sql': {
+            'handlers': active_handlers,
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'core.tracing': {
+            'handlers': ['traces'],
+            'level': 'INFO',
+            'propagate': False,
+        },
         'core.exceptions': {
             'handlers': active_handlers,
             'level': 'ERROR',
@@ -280,6 +503,38 @@ LOGGING = {
     },
 }
 
+SQL_SLOW_QUERY_MS = float(os.getenv('SQL_SLOW_QUERY_MS', '200'))
+SQL_BUDGET_ENFORCE = os.getenv('SQL_BUDGET_ENFORCE', 'False') == 'True'
+
+LOAD_SHED_ROUTE_CLASSES = [
+    ('admin', '/api/chat/messages/delete-all/'),
+    ('auth', '/api/auth/'),
+    ('chat-read', '/api/chat/'),
+    ('admin', '/dobrojutro/'),
+]
+LOAD_SHED_LIMITS = {
+    'auth': int(os.getenv('LOAD_SHED_AUTH_LIMIT', '32')),
+    'chat-read': int(os.getenv('LOAD_SHED_CHAT_READ_LIMIT', '128')),
+}
+LOAD_SHED_EXEMPT_PATHS = ['/api/metrics/', '/api/profile/']
+LOAD_SHED_MAX_QUEUE_DEPTH = int(os.getenv('LOAD_SHED_MAX_QUEUE_DEPTH', '64'))
+LOAD_SHED_RETRY_AFTER = int(os.getenv('LOAD_SHED_RETRY_AFTER', '2'))
+
+LOOP_MONITOR_ENABLED = os.getenv('LOOP_MONITOR_ENABLED', 'True') == 'True'
+LOOP_MONITOR_INTERVAL = float(os.getenv('LOOP_MONITOR_INTERVAL', '0.05'))
+LOOP_STALL_THRESHOLD_MS = float(os.getenv('LOOP_STALL_THRESHOLD_MS', '200'))
+
+PROFILE_DIR = os.getenv('PROFILE_DIR', str(Path(LOG_FILE_PATH).parent / 'profiles'))
+# pid files of workers that handle SIGUSR1 (drain) / SIGUSR2 (profile)
+WORKER_REGISTRY_DIR = os.getenv('WORKER_REGISTRY_DIR', str(Path(PROFILE_DIR) / 'workers'))
+PROFILE_DEFAULT_SECONDS = float(os.getenv('PROFILE_DEFAULT_SECONDS', '30'))
+PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', '300'))
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', '0.01'))
+
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
 AUTHENTICATION_BACKENDS = [
@@ -0,0 +1,25 @@
+# config/test_settings.py
+
+"""
+Settings for the test suite. manage.py uses them for the test command;
+other runners need DJANGO_SETTINGS_MODULE=config.test_settings.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+# per-process cache, so the suite does not need Redis
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+# a view over its @query_budget fails the test instead of logging a warning
+SQL_BUDGET_ENFORCE = True
+
+# the router tests run against a replica alias that mirrors default
+DATABASES.setdefault('replica', {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}})
+
+# other tests read from default: no measured lag is low enough for the
+# replica. The router tests override this and set the lag they need.
+DB_REPLICA_MAX_LAG = -1
@@ -3,10 +3,13 @@
 from django.contrib import admin
 from django.urls import path, include, re_path
 from front.views import index
+from core.views import metrics_view, profile_view
 
 urlpatterns = [
     path("dobrojutro/", admin.site.urls),
     path("api/auth/", include('accounts.urls')),
     path("api/chat/", include('chat.urls')),
+    path("api/metrics/", metrics_view, name='metrics'),
+    path("api/profile/", profile_view, name='profile'),
     re_path(r'^.*$', index, name='index'),
 ]
\ No newline at end of file
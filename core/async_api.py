@@ -0,0 +1,89 @@
+# core/async_api.py
+
+from functools import wraps
+from http import HTTPStatus
+
+from channels.db import database_sync_to_async
+from rest_framework.exceptions import APIException
+from rest_framework.settings import api_settings
+
+from .authentication import CookieJWTAuthentication
+from .responses import (
+    as_json_response,
+    error_response,
+    rate_limit_response,
+    unauthorized_response,
+)
+
+
+def _authenticate_and_throttle(request, throttle_classes):
+    """
+    Runs the blocking part of a request (JWT user lookup and throttle
+    cache access) in one call, so an async view needs a single thread hop
+    for it. Thread-sensitive: under the ASGI handler each request has its
+    own sync thread, which the sync middleware already uses, so the request
+    keeps one thread and one database connection. Returns (user, error_response).
+    """
+    request_id = getattr(request, 'id', None)
+    
+    try:
+        result = CookieJWTAuthentication().authenticate(request)
+    except APIException as e:
+        return None, unauthorized_response(message=str(e.detail), request_id=request_id)
+    
+    if result is None:
+        return None, unauthorized_response(
+            message="Authentication credentials were not provided.",
+            request_id=request_id
+        )
+    
+    request.user = result[0]
+    
+    for throttle_class in throttle_classes:
+        throttle = throttle_class()
+        if not throttle.allow_request(request, None):
+            wait = throttle.wait()
+            wait = int(wait) + 1 if wait is not None else None
+            return None, rate_limit_response(
+                message=f"Too many requests. Try again in {wait} seconds." if wait else "Too many requests",
+                errors={"wait": wait} if wait else None,
+                request_id=request_id
+            )
+    
+    return result[0], None
+
+
+def async_api_view(methods=('GET',), throttle_classes=None):
+    """
+    Decorator for async function views that speak the same JSON envelope
+    as the DRF views, authenticated with the JWT cookie and throttled with
+    the default DRF throttles.
+    
+    Example:
+        @async_api_view(['GET'])
+        async def get_online_users(request):
+            return success_response(data=[...], request_id=request.id)
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return as_json_response(error_response(
+                    message=f"Method '{request.method}' not allowed",
+                    status=HTTPStatus.METHOD_NOT_ALLOWED,
+                    code="METHOD_NOT_ALLOWED",
+                    request_id=getattr(request, 'id', None)
+                ))
+            
+            throttles = throttle_classes
+            if throttles is None:
+                throttles = api_settings.DEFAULT_THROTTLE_CLASSES
+            
+            user, failure = await database_sync_to_async(_authenticate_and_throttle)(request, throttles)
+            if failure is not None:
+                return as_json_response(failure)
+            
+            response = await view_func(request, *args, **kwargs)
+            return as_json_response(response)
+        return wrapper
+    return decorator
@@ -1,14 +1,26 @@
 # core/authentication.py
 
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+
+from . import tracing
+from .metrics import AUTH_RESULTS
 
 class CookieJWTAuthentication(JWTAuthentication):
     def authenticate(self, request):
         cookie_token = request.COOKIES.get('__Host-access_token')
         
         if cookie_token is None:
+            AUTH_RESULTS.inc(transport='http', result='anonymous')
             return None
         
-        validated_token = self.get_validated_token(cookie_token)
-        return self.get_user(validated_token), validated_token
\ No newline at end of file
+        try:
+            with tracing.span('auth.jwt', transport='http'):
+                validated_token = self.get_validated_token(cookie_token)
+                user = self.get_user(validated_token)
+        except (InvalidToken, AuthenticationFailed):
+            AUTH_RESULTS.inc(transport='http', result='invalid')
+            raise
+        
+        AUTH_RESULTS.inc(transport='http', result='success')
+        return user, validated_token
\ No newline at end of file
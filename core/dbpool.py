@@ -0,0 +1,56 @@
+# core/dbpool.py
+
+"""
+Metrics for Django's psycopg 3 connection pools (DATABASES OPTIONS 'pool').
+
+psycopg_pool keeps its own counters; sample() reads and resets them and
+turns them into gauges for pool size / usage and counters for checkouts
+and time spent waiting, so the mean wait is
+rate(db_pool_wait_seconds_total) / rate(db_pool_checkouts_total).
+The loop monitor's watchdog thread calls it on every tick.
+"""
+
+from django.db import connections
+
+from .metrics import (
+    DB_POOL_CHECKOUTS,
+    DB_POOL_CONNECTIONS,
+    DB_POOL_UTILIZATION,
+    DB_POOL_WAIT_SECONDS,
+    DB_POOL_WAITING,
+)
+
+
+def open_pools():
+    """
+    Returns {alias: pool} for pools that already exist in this process.
+    Looks at the backend's class-level registry instead of
+    connection.pool, which would open a pool as a side effect.
+    """
+    pools = {}
+    for alias in connections:
+        if 'pool' not in connections.settings[alias].get('OPTIONS', {}):
+            continue
+        pool = getattr(connections[alias], '_connection_pools', {}).get(alias)
+        if pool is not None:
+            pools[alias] = pool
+    return pools
+
+
+def sample():
+    for alias, pool in open_pools().items():
+        stats = pool.pop_stats()
+        size = stats.get('pool_size', 0)
+        idle = stats.get('pool_available', 0)
+        in_use = size - idle
+
+        DB_POOL_CONNECTIONS.set(in_use, alias=alias, state='in_use')
+        DB_POOL_CONNECTIONS.set(idle, alias=alias, state='idle')
+        DB_POOL_WAITING.set(stats.get('requests_waiting', 0), alias=alias)
+        DB_POOL_UTILIZATION.set(in_use / pool.max_size if pool.max_size else 0.0, alias=alias)
+
+        errors = stats.get('requests_errors', 0)
+        DB_POOL_CHECKOUTS.inc(stats.get('requests_num', 0) - errors, alias=alias, result='ok')
+        if errors:
+            DB_POOL_CHECKOUTS.inc(errors, alias=alias, result='timeout')
+        DB_POOL_WAIT_SECONDS.inc(stats.get('requests_wait_ms', 0) / 1000, alias=alias)
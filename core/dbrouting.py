@@ -0,0 +1,252 @@
+# core/dbrouting.py
+
+"""
+Read-replica routing.
+
+When DATABASES has a 'replica' alias, ReplicaRouter sends reads of
+GET/HEAD/OPTIONS requests to it and everything else to the primary.
+Reads stay on the primary:
+- for the rest of a request once it has written anything;
+- for DB_REPLICA_READ_YOUR_WRITES seconds after the same user wrote
+  (remembered in the cache, so it holds across workers);
+- while the replica lags more than DB_REPLICA_MAX_LAG seconds or cannot
+  be reached, as measured by a background thread every
+  DB_REPLICA_CHECK_INTERVAL seconds;
+- for views decorated with @use_database('primary');
+- for the AUTH_USER_MODEL table: authentication looks the user up before
+  request.user is known, so read-your-writes cannot cover it, and a new
+  or deactivated user must not depend on replica lag.
+
+Outside a request (consumers, commands) reads use the primary unless
+wrapped in replica_reads().
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils.functional import SimpleLazyObject, empty
+
+from .metrics import DB_READ_ROUTES, DB_REPLICA_LAG_SECONDS
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+REPLICA = 'replica'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_current = ContextVar('db_read_route', default=None)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def use_database(alias):
+    """
+    Pins a view's reads to 'primary' or lets them use the 'replica' even
+    when the request method would not. Put it above @api_view /
+    @async_api_view, or on a class-based view.
+
+        @use_database('primary')
+        @api_view(['GET'])
+        def account_status(request): ...
+    """
+    if alias not in ('primary', 'replica'):
+        raise ValueError("use_database() takes 'primary' or 'replica'")
+
+    def decorator(view):
+        view.database = alias
+        return view
+    return decorator
+
+
+def database_for(view_func):
+    database = getattr(view_func, 'database', None)
+    if database is None:
+        view_class = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+        database = getattr(view_class, 'database', None)
+    return database
+
+
+def _write_key(user_id):
+    return f'db:recent_write:{user_id}'
+
+
+def record_write(user_id):
+    if user_id is None or not replica_configured():
+        return
+    try:
+        cache.set(_write_key(user_id), True, settings.DB_REPLICA_READ_YOUR_WRITES)
+    except Exception as e:
+        # the write has committed; at worst the user's next reads may lag
+        logger.warning("Recording write for read-your-writes failed | user_id=%s | error=%s", user_id, e)
+
+
+def request_user_id(request):
+    user = request.__dict__.get('user')
+    if isinstance(user, SimpleLazyObject):
+        # resolving it here would run the session lookup from inside the router
+        user = user._wrapped if user._wrapped is not empty else None
+    if user is None or not user.is_authenticated:
+        return None
+    return user.pk
+
+
+class ReadRoute:
+    """
+    Routing state of one request, or of a replica_reads() block.
+    """
+
+    def __init__(self, request=None, user_id=None):
+        self.request = request
+        self.user_id = user_id
+        self.wrote = False
+        self.recent_write = None
+
+    def user_wrote_recently(self):
+        if self.recent_write is None:
+            user_id = self.user_id
+            if user_id is None and self.request is not None:
+                user_id = request_user_id(self.request)
+            if user_id is None:
+                # not authenticated yet; look again on the next read
+                return False
+            self.user_id = user_id
+            self.recent_write = bool(cache.get(_write_key(user_id)))
+        return self.recent_write
+
+    def read_database(self):
+        if self.wrote:
+            return PRIMARY, 'request_wrote'
+
+        override = None
+        if self.request is not None:
+            match = getattr(self.request, 'resolver_match', None)
+            override = database_for(match.func) if match is not None else None
+            if override == 'primary':
+                return PRIMARY, 'override'
+            if override is None and self.request.method not in SAFE_METHODS:
+                return PRIMARY, 'method'
+
+        if self.user_wrote_recently():
+            return PRIMARY, 'recent_write'
+        if not health.usable():
+            return PRIMARY, 'replica_lagging'
+        return REPLICA, 'override' if override else 'read_only'
+
+
+def start(request):
+    state = ReadRoute(request)
+    return state, _current.set(state)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+@contextmanager
+def replica_reads(user_id=None):
+    """
+    Lets reads in this block (including database_sync_to_async calls made
+    from it) use the replica, with the same read-your-writes and lag rules
+    as a read-only request.
+    """
+    token = _current.set(ReadRoute(user_id=user_id))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+class ReplicaHealth:
+    """
+    Replica lag probed from a daemon thread, so the request path only
+    reads a float.
+    """
+
+    def __init__(self):
+        self.lag = None
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def usable(self):
+        if self.thread is None:
+            self.start()
+        return self.lag is not None and self.lag <= settings.DB_REPLICA_MAX_LAG
+
+    def start(self):
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self._run, name='replica-lag', daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while True:
+            self.lag = self.probe()
+            DB_REPLICA_LAG_SECONDS.set(-1 if self.lag is None else self.lag)
+            time.sleep(settings.DB_REPLICA_CHECK_INTERVAL)
+
+    def probe(self):
+        """
+        Seconds since the last replayed transaction on a PostgreSQL standby
+        (0 when it is idle and caught up); 0 for other backends, which only
+        get a connectivity check. None when the replica is unreachable.
+        """
+        connection = connections[REPLICA]
+        try:
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    cursor.execute(
+                        "SELECT CASE"
+                        " WHEN NOT pg_is_in_recovery()"
+                        "  OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+                        " ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+                    )
+                else:
+                    cursor.execute("SELECT 0")
+                lag = float(cursor.fetchone()[0] or 0)
+        except Exception as e:
+            if self.lag is not None:
+                logger.warning("Replica unreachable, reading from primary: %s", e)
+            return None
+        finally:
+            connection.close()
+
+        if lag > settings.DB_REPLICA_MAX_LAG and (self.lag or 0) <= settings.DB_REPLICA_MAX_LAG:
+            logger.warning("Replica lagging, reading from primary | lag_s=%.1f", lag)
+        return lag
+
+
+health = ReplicaHealth()
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = _current.get()
+        if state is None or not replica_configured():
+            return PRIMARY
+        if model._meta.label == settings.AUTH_USER_MODEL:
+            database, reason = PRIMARY, 'auth_user'
+        else:
+            database, reason = state.read_database()
+        DB_READ_ROUTES.inc(database=database, reason=reason)
+        return database
+
+    def db_for_write(self, model, **hints):
+        state = _current.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if {obj1._state.db, obj2._state.db} <= {PRIMARY, REPLICA}:
+            return True
+        return None
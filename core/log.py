@@ -0,0 +1,156 @@
+# core/log.py
+
+from datetime import datetime, timezone
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import threading
+import time
+import zlib
+
+from django.utils.module_loading import import_string
+
+_RESERVED_ATTRS = frozenset(vars(logging.makeLogRecord({})).keys()) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per line. Anything passed through `extra=` (request_id,
+    user_id, ...) is emitted as a top-level key.
+    """
+
+    def format(self, record):
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                payload[key] = value
+
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+
+        return json.dumps(payload, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a fraction of routine INFO records whose message template
+    starts with one of `prefixes`. Records carrying a request_id are
+    sampled by hashing it, so all sampled lines of a request are kept or
+    dropped together.
+    """
+
+    def __init__(self, rate=1.0, prefixes=()):
+        super().__init__()
+        self.rate = rate
+        self.prefixes = tuple(prefixes)
+        self.threshold = int(rate * 10000)
+
+    def filter(self, record):
+        if self.rate >= 1.0 or record.levelno != logging.INFO:
+            return True
+        if not isinstance(record.msg, str) or not record.msg.startswith(self.prefixes):
+            return True
+
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            return zlib.crc32(str(request_id).encode()) % 10000 < self.threshold
+        return random.random() < self.rate
+
+
+class QueuedHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to a bounded in-memory queue drained by a QueueListener
+    thread that owns the real (blocking) handler. Request threads and the
+    event loop never touch the disk or the console.
+
+    Records are enqueued unformatted; message interpolation and JSON
+    encoding happen on the listener thread. When the queue is full the
+    record is dropped and counted instead of blocking the caller, and a
+    warning with the drop count is logged once the queue has room again.
+
+    Configure it with the '()' factory key so dictConfig passes `target`
+    and the target's keyword arguments straight through:
+
+        'file': {
+            '()': 'core.log.QueuedHandler',
+            'target': 'logging.handlers.RotatingFileHandler',
+            'filename': LOG_FILE_PATH,
+            'formatter': 'json',
+        }
+    """
+
+    def __init__(self, target='logging.StreamHandler', queue_size=10000, **target_kwargs):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.target = import_string(target)(**target_kwargs)
+        self.dropped = 0
+        self.dropped_total = 0
+        self._drop_lock = threading.Lock()
+        self.listener = logging.handlers.QueueListener(self.queue, self.target)
+        self.listener.start()
+        self._stopped = False
+        atexit.register(self.stop)
+
+    def setFormatter(self, fmt):
+        super().setFormatter(fmt)
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            if self.dropped:
+                self._report_drops()
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._drop_lock:
+                self.dropped += 1
+                self.dropped_total += 1
+
+    def _report_drops(self):
+        with self._drop_lock:
+            dropped, self.dropped = self.dropped, 0
+        try:
+            self.queue.put_nowait(logging.makeLogRecord({
+                'name': __name__,
+                'levelno': logging.WARNING,
+                'levelname': 'WARNING',
+                'msg': "Log queue full, dropped %d records",
+                'args': (dropped,),
+            }))
+        except queue.Full:
+            with self._drop_lock:
+                self.dropped += dropped
+            raise
+
+    def flush(self, timeout=5.0):
+        """
+        Waits until the listener has handed every queued record to the
+        target, then flushes the target.
+        """
+        if self._stopped:
+            return
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.target.flush()
+
+    def stop(self):
+        if self._stopped:
+            return
+        self._stopped = True
+        self.listener.stop()
+        self.target.close()
+
+    def close(self):
+        self.stop()
+        super().close()
@@ -0,0 +1,182 @@
+# core/loopmonitor.py
+
+"""
+Event-loop lag and sync thread-pool saturation monitor for ASGI workers.
+
+A probe coroutine sleeps LOOP_MONITOR_INTERVAL seconds in a loop,
+records how late it wakes up and samples the asgiref executors, whose
+state belongs to the loop thread. A watchdog thread samples the database
+connection pools and, when the probe has not run for
+LOOP_STALL_THRESHOLD_MS, logs the stack the event-loop thread is stuck
+in together with the coroutine that is running, both read from that
+thread's frames rather than from the loop.
+
+Wrap the ASGI application with LoopMonitorMiddleware; the monitor starts
+on the first connection, when the worker's loop is running.
+"""
+
+import asyncio
+import inspect
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from asgiref.sync import SyncToAsync
+from django.conf import settings
+
+from . import dbpool
+from .metrics import (
+    EVENT_LOOP_LAG_SECONDS,
+    EVENT_LOOP_STALLS,
+    EXECUTOR_QUEUE_DEPTH,
+    EXECUTOR_THREADS,
+    PROCESS_THREADS,
+)
+
+logger = logging.getLogger(__name__)
+
+_monitor = None
+
+
+class LoopMonitor:
+
+    def __init__(self, loop, interval, threshold):
+        self.loop = loop
+        self.loop_thread_id = threading.get_ident()
+        self.interval = interval
+        self.threshold = threshold
+        self.last_tick = time.monotonic()
+        self.reported_tick = None
+        self.task = None
+        self.watchdog = threading.Thread(target=self._watch, name='loop-monitor', daemon=True)
+
+    def start(self):
+        self.task = self.loop.create_task(self._probe())
+        self.watchdog.start()
+
+    async def _probe(self):
+        while True:
+            started = self.loop.time()
+            await asyncio.sleep(self.interval)
+            EVENT_LOOP_LAG_SECONDS.observe(max(0.0, self.loop.time() - started - self.interval))
+            self.last_tick = time.monotonic()
+            try:
+                self.sample_executors()
+            except Exception as e:
+                logger.warning("Loop monitor executor sample failed: %s", e)
+
+    def _watch(self):
+        while not self.loop.is_closed():
+            time.sleep(self.interval)
+            try:
+                PROCESS_THREADS.set(threading.active_count())
+                dbpool.sample()
+                self.check_stall()
+            except Exception as e:
+                logger.warning("Loop monitor sample failed: %s", e)
+
+    def check_stall(self):
+        last_tick = self.last_tick
+        stalled = time.monotonic() - last_tick - self.interval
+        if stalled < self.threshold or self.reported_tick == last_tick:
+            return
+
+        # one report per stall
+        self.reported_tick = last_tick
+        EVENT_LOOP_STALLS.inc()
+
+        frame = sys._current_frames().get(self.loop_thread_id)
+        stack = ''.join(traceback.format_stack(frame, limit=25)) if frame else '<unavailable>'
+
+        logger.warning(
+            "Event loop stalled | lag_ms=%.0f | coro=%s\n%s",
+            stalled * 1000,
+            running_coroutine(frame),
+            stack,
+        )
+
+    def sample_executors(self):
+        """
+        Runs in the loop thread, which owns the executors' bookkeeping.
+        """
+        for name, (queued, threads) in executor_usage(self.loop).items():
+            EXECUTOR_QUEUE_DEPTH.set(queued, executor=name)
+            EXECUTOR_THREADS.set(threads, executor=name)
+
+
+def running_coroutine(frame):
+    """
+    Qualified name of the outermost coroutine on a stack, i.e. the task a
+    stuck loop thread is running, or None.
+    """
+    coroutine = None
+    while frame is not None:
+        code = frame.f_code
+        if code.co_flags & (inspect.CO_COROUTINE | inspect.CO_ASYNC_GENERATOR):
+            coroutine = getattr(code, 'co_qualname', code.co_name)
+        frame = frame.f_back
+    return coroutine
+
+
+def default_queue_depth(loop):
+    default = getattr(loop, '_default_executor', None)
+    return default._work_queue.qsize() if default else 0
+
+
+def executor_usage(loop):
+    """
+    Returns {'default': (queued, threads), 'thread_sensitive': (queued, threads)}
+    for the loop's default executor (thread_sensitive=False calls) and the
+    single-thread executors used by thread-sensitive calls: one per request
+    context in Django's ASGIHandler plus asgiref's shared fallback.
+    """
+    default = getattr(loop, '_default_executor', None)
+    try:
+        executors = list(SyncToAsync.context_to_thread_executor.values())
+    except RuntimeError:
+        # a request context was collected while copying; next sample
+        executors = []
+    executors.append(SyncToAsync.single_thread_executor)
+    return {
+        'default': (
+            default_queue_depth(loop),
+            len(default._threads) if default else 0,
+        ),
+        'thread_sensitive': (
+            sum(executor._work_queue.qsize() for executor in executors),
+            sum(len(executor._threads) for executor in executors),
+        ),
+    }
+
+
+def ensure_started():
+    global _monitor
+    if _monitor is not None or not settings.LOOP_MONITOR_ENABLED:
+        return
+
+    _monitor = LoopMonitor(
+        asyncio.get_running_loop(),
+        settings.LOOP_MONITOR_INTERVAL,
+        settings.LOOP_STALL_THRESHOLD_MS / 1000,
+    )
+    _monitor.start()
+    logger.info(
+        "Loop monitor started | interval_ms=%.0f | stall_threshold_ms=%.0f",
+        settings.LOOP_MONITOR_INTERVAL * 1000, settings.LOOP_STALL_THRESHOLD_MS
+    )
+
+
+class LoopMonitorMiddleware:
+    """
+    ASGI middleware that starts the monitor in the worker's event loop.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if _monitor is None:
+            ensure_started()
+        return await self.app(scope, receive, send)
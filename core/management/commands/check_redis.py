@@ -0,0 +1,35 @@
+# core/management/commands/check_redis.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import redischeck
+
+
+class Command(BaseCommand):
+    help = (
+        "Pings every configured Redis endpoint (channel layer shards, cache "
+        "servers, replay/fan-out) and reports round-trip latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=20, help='Pings per endpoint')
+
+    def handle(self, *args, **options):
+        results = redischeck.report(options['samples'])
+        if not results:
+            self.stdout.write("No Redis endpoints configured")
+            return
+
+        for result in results:
+            if result['ok']:
+                self.stdout.write(
+                    f"{result['role']:<20} {result['target']:<40} {result['latency_ms']:8.2f} ms"
+                )
+            else:
+                self.stdout.write(self.style.ERROR(
+                    f"{result['role']:<20} {result['target']:<40} unreachable: {result['error']}"
+                ))
+
+        failed = [result for result in results if not result['ok']]
+        if failed:
+            raise CommandError(f"{len(failed)} of {len(results)} Redis endpoints unreachable")
@@ -0,0 +1,74 @@
+# core/management/commands/profile_worker.py
+
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import profiling, workers
+
+
+class Command(BaseCommand):
+    help = (
+        "Starts a time-limited sampling profiler inside a running Daphne worker "
+        "and waits for its collapsed-stack output (for flamegraph.pl / speedscope)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('pid', type=int, help='PID of the worker to profile')
+        parser.add_argument(
+            '--seconds',
+            type=float,
+            default=settings.PROFILE_DEFAULT_SECONDS,
+            help='How long to sample',
+        )
+        parser.add_argument(
+            '--interval-ms',
+            type=float,
+            default=settings.PROFILE_INTERVAL * 1000,
+            help='Sampling interval in milliseconds',
+        )
+        parser.add_argument(
+            '--include-idle',
+            action='store_true',
+            help='Keep samples of threads parked in wait/select',
+        )
+        parser.add_argument(
+            '--no-wait',
+            action='store_true',
+            help='Return right after signalling the worker',
+        )
+
+    def handle(self, *args, **options):
+        pid = options['pid']
+        seconds = options['seconds']
+
+        if not 0 < seconds <= settings.PROFILE_MAX_SECONDS:
+            raise CommandError(f"--seconds must be between 0 and {settings.PROFILE_MAX_SECONDS:g}")
+
+        try:
+            output_path = profiling.request_profile(
+                pid, seconds, options['interval_ms'] / 1000, options['include_idle']
+            )
+        except workers.UnknownWorker as e:
+            raise CommandError(str(e))
+        except ProcessLookupError:
+            raise CommandError(f"No process with pid {pid}")
+        except PermissionError:
+            raise CommandError(f"Not allowed to signal pid {pid}")
+
+        self.stdout.write(f"Profiling pid {pid} for {seconds:g}s, output: {output_path}")
+        if options['no_wait']:
+            return
+
+        deadline = time.monotonic() + seconds + 10
+        while time.monotonic() < deadline:
+            if os.path.exists(output_path):
+                self.stdout.write(self.style.SUCCESS(f"Profile written to {output_path}"))
+                return
+            time.sleep(0.5)
+
+        raise CommandError(
+            f"No profile at {output_path}; is pid {pid} a worker started from config.asgi?"
+        )
@@ -0,0 +1,461 @@
+# core/metrics.py
+
+"""
+In-process counters, gauges and histograms with Prometheus text output.
+
+Updates only touch a dict under a lock. When METRICS_DIR is set, a
+daemon thread periodically writes this process's snapshot to
+METRICS_DIR/metrics-<pid>.json, and the metrics endpoint merges the
+snapshots of all live worker processes. Histograms use fixed buckets,
+so they merge by summing and p50/p95/p99 are estimated from the merged
+buckets. When a worker dies its counters and histograms are folded into
+METRICS_DIR/metrics-retired.json, so totals never go backwards; its
+gauges are dropped.
+"""
+
+from bisect import bisect_left
+from contextlib import contextmanager
+import fcntl
+import json
+import math
+import os
+import threading
+import time
+
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.samples = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def describe(self):
+        return {
+            'kind': self.kind,
+            'help': self.documentation,
+            'labelnames': list(self.labelnames),
+        }
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self.samples[key] = self.samples.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    `mode` controls how values from several processes are combined:
+    'sum' adds them, 'max' keeps the largest, 'all' keeps one series per
+    process with a `pid` label.
+    """
+    kind = 'gauge'
+
+    def __init__(self, registry, name, documentation, labelnames=(), mode='sum'):
+        super().__init__(registry, name, documentation, labelnames)
+        self.mode = mode
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self.samples[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self.samples[key] = self.samples.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def describe(self):
+        return {**super().describe(), 'mode': self.mode}
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self.registry.lock:
+            sample = self.samples.get(key)
+            if sample is None:
+                # per-bucket counts (last slot is +Inf), then sum
+                sample = self.samples[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            sample[index] += 1
+            sample[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def describe(self):
+        return {**super().describe(), 'buckets': list(self.buckets)}
+
+
+class Registry:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self._flusher = None
+
+    def _register(self, metric):
+        existing = self.metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self.metrics[metric.name] = metric
+        self.start_flusher()
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), mode='sum'):
+        return self._register(Gauge(self, name, documentation, labelnames, mode=mode))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, documentation, labelnames, buckets=buckets))
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: {
+                    **metric.describe(),
+                    'samples': [
+                        [list(key), list(value) if isinstance(value, list) else value]
+                        for key, value in metric.samples.items()
+                    ],
+                }
+                for name, metric in self.metrics.items()
+            }
+
+    def start_flusher(self):
+        directory = getattr(settings, 'METRICS_DIR', None)
+        if not directory or self._flusher is not None:
+            return
+        self._flusher = threading.Thread(
+            target=self._flush_loop, args=(directory,), name='metrics-flusher', daemon=True
+        )
+        self._flusher.start()
+
+    def _flush_loop(self, directory):
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            try:
+                self.flush(directory)
+            except OSError as e:
+                logger.warning("Metrics flush failed: %s", e)
+
+    def flush(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'metrics-{os.getpid()}.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as fh:
+            json.dump(self.snapshot(), fh)
+        os.replace(tmp_path, path)
+
+
+registry = Registry()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+RETIRED = 'metrics-retired.json'
+
+
+def collect():
+    """
+    Returns [(pid, snapshot), ...] for this process and every live worker
+    that has flushed to METRICS_DIR, plus ('retired', snapshot) with the
+    counters and histograms of workers that have exited.
+    """
+    own_pid = os.getpid()
+    snapshots = [(own_pid, registry.snapshot())]
+    directory = getattr(settings, 'METRICS_DIR', None)
+
+    if not directory or not os.path.isdir(directory):
+        return snapshots
+
+    dead = []
+    for name in os.listdir(directory):
+        if not (name.startswith('metrics-') and name.endswith('.json')):
+            continue
+        try:
+            pid = int(name[len('metrics-'):-len('.json')])
+        except ValueError:
+            continue
+        if pid == own_pid:
+            continue
+        path = os.path.join(directory, name)
+        if not _pid_alive(pid):
+            dead.append(path)
+            continue
+        try:
+            with open(path) as fh:
+                snapshots.append((pid, json.load(fh)))
+        except (OSError, ValueError):
+            continue
+
+    try:
+        retired = retire(directory, dead)
+    except OSError as e:
+        logger.warning("Retiring dead worker metrics failed: %s", e)
+        retired = None
+    if retired:
+        snapshots.append(('retired', retired))
+    return snapshots
+
+
+def retire(directory, paths):
+    """
+    Folds the counters and histograms of dead workers' files into the
+    retired snapshot, removes the files and returns the retired snapshot.
+    """
+    path = os.path.join(directory, RETIRED)
+    with open(f'{path}.lock', 'a') as lock:
+        # another process may be collecting the same dead workers
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        retired = _load(path) or {}
+        if not paths:
+            return retired
+
+        snapshots = [('retired', retired)]
+        for dead_path in paths:
+            snapshot = _load(dead_path)
+            if snapshot:
+                snapshots.append(('dead', {
+                    name: family for name, family in snapshot.items() if family['kind'] != 'gauge'
+                }))
+
+        retired = {
+            name: {**family, 'samples': [[list(key), value] for key, value in family['samples'].items()]}
+            for name, family in merge(snapshots).items()
+        }
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as fh:
+            json.dump(retired, fh)
+        os.replace(tmp_path, path)
+
+        for dead_path in paths:
+            try:
+                os.remove(dead_path)
+            except FileNotFoundError:
+                pass
+        return retired
+
+
+def _load(path):
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        logger.warning("Unreadable metrics file: %s", path)
+        return None
+
+
+def merge(snapshots):
+    merged = {}
+    for pid, snapshot in snapshots:
+        for name, family in snapshot.items():
+            target = merged.setdefault(name, {**family, 'samples': {}})
+            labelnames = family['labelnames']
+            mode = family.get('mode')
+            if mode == 'all' and 'pid' not in target['labelnames']:
+                target['labelnames'] = labelnames + ['pid']
+
+            for key, value in family['samples']:
+                key = tuple(key) + ((str(pid),) if mode == 'all' else ())
+                current = target['samples'].get(key)
+                if current is None:
+                    target['samples'][key] = list(value) if isinstance(value, list) else value
+                elif family['kind'] == 'histogram':
+                    target['samples'][key] = [a + b for a, b in zip(current, value)]
+                elif mode == 'max':
+                    target['samples'][key] = max(current, value)
+                else:
+                    target['samples'][key] = current + value
+    return merged
+
+
+def estimate_quantile(buckets, counts, q):
+    total = sum(counts)
+    if not total:
+        return math.nan
+    rank = q * total
+    cumulative = 0
+    for index, count in enumerate(counts):
+        if cumulative + count >= rank:
+            if index >= len(buckets):
+                return buckets[-1]
+            lower = buckets[index - 1] if index else 0.0
+            upper = buckets[index]
+            fraction = (rank - cumulative) / count if count else 0.0
+            return lower + (upper - lower) * fraction
+        cumulative += count
+    return buckets[-1]
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labelnames, key, extra=None):
+    pairs = list(zip(labelnames, key)) + list((extra or {}).items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if isinstance(value, float) and math.isnan(value):
+        return 'NaN'
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(merged):
+    lines = []
+    for name in sorted(merged):
+        family = merged[name]
+        labelnames = family['labelnames']
+        lines.append(f'# HELP {name} {family["help"]}')
+        lines.append(f'# TYPE {name} {family["kind"]}')
+
+        if family['kind'] != 'histogram':
+            for key, value in sorted(family['samples'].items()):
+                lines.append(f'{name}{_labels(labelnames, key)} {_number(value)}')
+            continue
+
+        buckets = family['buckets']
+        quantile_lines = []
+        for key, value in sorted(family['samples'].items()):
+            counts, total_sum = value[:-1], value[-1]
+            cumulative = 0
+            for bound, count in zip(list(buckets) + [math.inf], counts):
+                cumulative += count
+                le = '+Inf' if bound == math.inf else _number(float(bound))
+                lines.append(f'{name}_bucket{_labels(labelnames, key, {"le": le})} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labelnames, key)} {_number(float(total_sum))}')
+            lines.append(f'{name}_count{_labels(labelnames, key)} {cumulative}')
+            for q in QUANTILES:
+                estimate = estimate_quantile(buckets, counts, q)
+                quantile_lines.append(
+                    f'{name}_quantile{_labels(labelnames, key, {"quantile": q})} {_number(estimate)}'
+                )
+
+        if quantile_lines:
+            lines.append(f'# HELP {name}_quantile {family["help"]} (estimated from buckets)')
+            lines.append(f'# TYPE {name}_quantile gauge')
+            lines.extend(quantile_lines)
+
+    return '\n'.join(lines) + '\n'
+
+
+def export():
+    return render(merge(collect()))
+
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    'http_request_duration_seconds', 'HTTP request latency', ('route', 'method', 'status')
+)
+WS_CONNECTIONS = registry.counter(
+    'ws_connections_total', 'WebSocket connection events', ('event',)
+)
+WS_ACTIVE_CONNECTIONS = registry.gauge(
+    'ws_active_connections', 'Open WebSocket connections'
+)
+WS_MESSAGES = registry.counter(
+    'ws_messages_total', 'WebSocket frames received and sent', ('direction',)
+)
+CHAT_SAVE_SECONDS = registry.histogram(
+    'chat_save_message_seconds', 'Time spent persisting a chat message'
+)
+CHAT_GROUP_SEND_SECONDS = registry.histogram(
+    'chat_group_send_seconds', 'Time spent in channel layer group_send', ('event',)
+)
+AUTH_RESULTS = registry.counter(
+    'auth_results_total', 'JWT authentication outcomes', ('transport', 'result')
+)
+EVENT_LOOP_LAG_SECONDS = registry.histogram(
+    'event_loop_lag_seconds', 'Delay between a scheduled and actual event loop wakeup'
+)
+EVENT_LOOP_STALLS = registry.counter(
+    'event_loop_stalls_total', 'Event loop stalls longer than LOOP_STALL_THRESHOLD_MS'
+)
+EXECUTOR_QUEUE_DEPTH = registry.gauge(
+    'asgiref_executor_queue_depth', 'sync_to_async calls waiting for a thread', ('executor',)
+)
+EXECUTOR_THREADS = registry.gauge(
+    'asgiref_executor_threads', 'Threads started by the sync_to_async executors', ('executor',)
+)
+PROCESS_THREADS = registry.gauge(
+    'process_threads', 'Live threads in the worker process'
+)
+IN_FLIGHT_REQUESTS = registry.gauge(
+    'http_in_flight_requests', 'HTTP requests being processed', ('route_class',)
+)
+SHED_REQUESTS = registry.counter(
+    'http_shed_requests_total', 'Requests rejected by load shedding', ('route_class', 'reason')
+)
+DB_POOL_CONNECTIONS = registry.gauge(
+    'db_pool_connections', 'Connections held by the database pool', ('alias', 'state')
+)
+DB_POOL_WAITING = registry.gauge(
+    'db_pool_waiting_requests', 'Threads waiting for a pooled database connection', ('alias',)
+)
+DB_POOL_UTILIZATION = registry.gauge(
+    'db_pool_utilization', 'Pooled connections in use / pool max_size', ('alias',), mode='all'
+)
+DB_POOL_CHECKOUTS = registry.counter(
+    'db_pool_checkouts_total', 'Connection requests made to the database pool', ('alias', 'result')
+)
+DB_POOL_WAIT_SECONDS = registry.counter(
+    'db_pool_wait_seconds_total', 'Time spent waiting for a pooled database connection', ('alias',)
+)
+DB_READ_ROUTES = registry.counter(
+    'db_read_routes_total', 'Database read routing decisions', ('database', 'reason')
+)
+DB_REPLICA_LAG_SECONDS = registry.gauge(
+    'db_replica_lag_seconds', 'Replication lag of the read replica (-1 when unreachable)', mode='max'
+)
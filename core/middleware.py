@@ -1,31 +1,103 @@
 # core/middleware.py
 
+import asyncio
+import threading
+import time
 import uuid
 import logging
 
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.conf import settings
 
+from . import dbrouting, sql, tracing
+from .loopmonitor import default_queue_depth
+from .metrics import HTTP_REQUEST_SECONDS, IN_FLIGHT_REQUESTS, SHED_REQUESTS
+from .responses import as_json_response, service_unavailable_response
+
 logger = logging.getLogger(__name__)
 
 
-class RequestIDMiddleware:
+class HybridMiddleware:
+    """
+    Base for middleware that runs natively under both WSGI and ASGI.
+    
+    Under ASGI, Django runs sync-only middleware (and the process_* hooks
+    of MiddlewareMixin) through sync_to_async, costing a thread hop per
+    hook. Subclasses here only implement non-blocking process_request /
+    process_response hooks, which are called inline on the event loop.
+    As with MiddlewareMixin, a response returned from process_request
+    short-circuits the rest of the chain.
+    """
+    sync_capable = True
+    async_capable = True
     
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
     
     def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.process_request(request)
+        if response is None:
+            response = self.get_response(request)
+        return self.process_response(request, response)
+    
+    async def __acall__(self, request):
+        response = self.process_request(request)
+        if response is None:
+            response = await self.get_response(request)
+        return self.process_response(request, response)
+    
+    def process_request(self, request):
+        pass
+    
+    def process_response(self, request, response):
+        return response
+
+
+class MetricsMiddleware(HybridMiddleware):
+    """
+    Records request latency per route pattern, method and status code
+    """
+    
+    def process_request(self, request):
+        request._metrics_started = time.perf_counter()
+    
+    def process_response(self, request, response):
+        match = getattr(request, 'resolver_match', None)
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - request._metrics_started,
+            route=match.route if match else 'unmatched',
+            method=request.method,
+            status=response.status_code,
+        )
+        
+        return response
+
+
+class RequestIDMiddleware(HybridMiddleware):
+    
+    def process_request(self, request):
         request_id = request.headers.get('X-Request-ID', str(uuid.uuid4()))
         request.id = request_id
         
         logger.info(
-            f"Request started | request_id={request_id} | {request.method} {request.path} | IP: {self.get_client_ip(request)}"
+            "Request started | request_id=%s | %s %s | IP: %s",
+            request_id, request.method, request.path, self.get_client_ip(request),
+            extra={'request_id': request_id}
         )
-        
-        response = self.get_response(request)
+    
+    def process_response(self, request, response):
+        request_id = request.id
         response['X-Request-ID'] = request_id
         
         logger.info(
-            f"Request completed | request_id={request_id} | status={response.status_code}"
+            "Request completed | request_id=%s | status=%s",
+            request_id, response.status_code,
+            extra={'request_id': request_id}
         )
         
         return response
@@ -39,17 +111,171 @@ class RequestIDMiddleware:
             ip = request.META.get('REMOTE_ADDR')
         return ip
 
-class SecurityHeadersMiddleware:
+
+class LoadSheddingMiddleware(HybridMiddleware):
     """
-    Dodaje security headers na svaki response
+    Admission control. Counts in-flight requests per route class
+    (LOAD_SHED_ROUTE_CLASSES, first matching path prefix wins) and
+    rejects a request with 503 and Retry-After as soon as its class is at
+    its LOAD_SHED_LIMITS entry, or, under ASGI, when more than
+    LOAD_SHED_MAX_QUEUE_DEPTH sync_to_async calls are already waiting for
+    a thread. Classes without a limit (admin) and paths in
+    LOAD_SHED_EXEMPT_PATHS are never rejected.
     """
     
     def __init__(self, get_response):
-        self.get_response = get_response
+        super().__init__(get_response)
+        self.in_flight = {}
+        self.lock = threading.Lock()
+    
+    @staticmethod
+    def route_class(path):
+        if path.startswith(tuple(settings.LOAD_SHED_EXEMPT_PATHS)):
+            return None
+        for name, prefix in settings.LOAD_SHED_ROUTE_CLASSES:
+            if path.startswith(prefix):
+                return name
+        return None
+    
+    def process_request(self, request):
+        route_class = self.route_class(request.path)
+        if route_class is None:
+            return None
+        
+        limit = settings.LOAD_SHED_LIMITS.get(route_class)
+        reason = None
+        
+        with self.lock:
+            in_flight = self.in_flight.get(route_class, 0)
+            if limit and in_flight >= limit:
+                reason = 'in_flight'
+            elif limit and self.async_mode and self.queue_full():
+                reason = 'queue_depth'
+            else:
+                self.in_flight[route_class] = in_flight + 1
+        
+        if reason is not None:
+            SHED_REQUESTS.inc(route_class=route_class, reason=reason)
+            logger.warning(
+                "Request shed | request_id=%s | class=%s | reason=%s | in_flight=%s",
+                request.id, route_class, reason, in_flight,
+                extra={'request_id': request.id}
+            )
+            response = as_json_response(service_unavailable_response(
+                message="Server is busy, please retry shortly",
+                request_id=request.id
+            ))
+            response['Retry-After'] = str(settings.LOAD_SHED_RETRY_AFTER)
+            return response
+        
+        request._route_class = route_class
+        IN_FLIGHT_REQUESTS.inc(route_class=route_class)
+        return None
     
     def __call__(self, request):
-        response = self.get_response(request)
+        if self.async_mode:
+            return self.__acall__(request)
+        try:
+            return super().__call__(request)
+        finally:
+            self.release(request)
+    
+    async def __acall__(self, request):
+        # released in finally so cancelled (disconnected) requests are not leaked
+        try:
+            return await super().__acall__(request)
+        finally:
+            self.release(request)
+    
+    def release(self, request):
+        route_class = request.__dict__.pop('_route_class', None)
+        if route_class is not None:
+            with self.lock:
+                self.in_flight[route_class] -= 1
+            IN_FLIGHT_REQUESTS.dec(route_class=route_class)
+    
+    @staticmethod
+    def queue_full():
+        max_depth = settings.LOAD_SHED_MAX_QUEUE_DEPTH
+        return bool(max_depth) and default_queue_depth(asyncio.get_running_loop()) >= max_depth
+
+
+class TracingMiddleware(HybridMiddleware):
+    """
+    Opens the root span of a sampled request, using the request ID as the
+    trace ID. Must come after RequestIDMiddleware.
+    """
+    
+    def process_request(self, request):
+        request._trace_span, request._trace_token = tracing.start(
+            request.id, 'http.request', method=request.method, path=request.path
+        )
+    
+    def process_response(self, request, response):
+        span = request._trace_span
+        if span is not None:
+            match = getattr(request, 'resolver_match', None)
+            span.set(status=response.status_code, route=match.route if match else None)
+            tracing.finish(span, request._trace_token)
+        
+        return response
+
+
+class QueryStatsMiddleware(HybridMiddleware):
+    """
+    Counts queries and DB time per request, logs them under the request ID
+    and checks them against the view's @query_budget. In DEBUG the numbers
+    are also returned in Server-Timing and X-DB-Queries headers.
+    """
+    
+    def process_request(self, request):
+        request._query_stats, request._query_stats_token = sql.start(
+            f"{request.method} {request.path}", getattr(request, 'id', None)
+        )
+    
+    def process_response(self, request, response):
+        stats = request._query_stats
+        sql.stop(request._query_stats_token)
+        
+        if settings.DEBUG:
+            response['Server-Timing'] = f'db;dur={stats.duration_ms:.1f};desc="{stats.count} queries"'
+            response['X-DB-Queries'] = str(stats.count)
+        
+        stats.log()
         
+        match = getattr(request, 'resolver_match', None)
+        if match is not None:
+            stats.check_budget(sql.budget_for(match.func))
+        
+        return response
+
+
+class ReplicaRoutingMiddleware(HybridMiddleware):
+    """
+    Binds the request to ReplicaRouter and, when the request wrote to the
+    database, keeps the user's reads on the primary for the
+    read-your-writes window.
+    """
+    
+    def process_request(self, request):
+        request._read_route, request._read_route_token = dbrouting.start(request)
+    
+    def process_response(self, request, response):
+        state = request._read_route
+        dbrouting.stop(request._read_route_token)
+        
+        if state.wrote:
+            dbrouting.record_write(state.user_id or dbrouting.request_user_id(request))
+        
+        return response
+
+
+class SecurityHeadersMiddleware(HybridMiddleware):
+    """
+    Dodaje security headers na svaki response
+    """
+    
+    def process_response(self, request, response):
         ws_url = 'ws://localhost:8000' if settings.DEBUG else 'wss://mladenapp.duckdns.org'
         
         response['Content-Security-Policy'] = (
@@ -0,0 +1,38 @@
+# core/parsers.py
+
+from io import BytesIO
+import codecs
+
+from django.conf import settings
+import ujson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .renderers import UJSONRenderer
+
+
+class UJSONParser(JSONParser):
+    """
+    JSONParser that decodes with ujson. ujson accepts NaN and Infinity, so
+    in strict mode bodies containing them are handed to the stock parser,
+    which rejects them with the usual ParseError.
+    """
+    renderer_class = UJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        raw = stream.read()
+        if self.strict and (b'NaN' in raw or b'Infinity' in raw):
+            return self.parse_stock(raw, media_type, parser_context)
+
+        try:
+            if codecs.lookup(encoding).name != 'utf-8':
+                raw = raw.decode(encoding)
+            return ujson.loads(raw)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+    def parse_stock(self, raw, media_type, parser_context):
+        return super().parse(BytesIO(raw), media_type, parser_context)
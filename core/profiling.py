@@ -0,0 +1,207 @@
+# core/profiling.py
+
+"""
+On-demand stack-sampling profiler for live workers.
+
+A daemon thread snapshots the stacks of every other thread in the
+process (the event loop and the sync_to_async / database_sync_to_async
+executor threads) at a fixed interval for a limited time, then writes
+them in collapsed-stack format ("frame;frame;frame count" per line),
+which flamegraph.pl, speedscope and inferno read directly.
+
+Another worker on the same host is asked to profile itself by writing
+PROFILE_DIR/request-<pid>.json and sending it SIGUSR2; see
+request_profile() and the profile_worker management command. Only
+workers that installed the handler (see core.workers) are signalled.
+"""
+
+from collections import Counter
+from datetime import datetime
+import json
+import logging
+import os
+import re
+import signal
+import sys
+import threading
+import time
+
+from django.conf import settings
+
+from . import workers
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_active = None
+
+# innermost frames of threads that are parked, not working
+IDLE_FRAMES = {
+    ('threading.py', 'wait'),
+    ('selectors.py', 'select'),
+    ('queue.py', 'get'),
+    ('thread.py', '_worker'),
+}
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+class SamplingProfiler:
+
+    def __init__(self, seconds, interval, output_path, include_idle=False):
+        self.seconds = seconds
+        self.interval = interval
+        self.output_path = output_path
+        self.include_idle = include_idle
+        self.stacks = Counter()
+        self.samples = 0
+        self.thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def _run(self):
+        global _active
+        deadline = time.monotonic() + self.seconds
+        try:
+            while time.monotonic() < deadline:
+                self._sample()
+                time.sleep(self.interval)
+            self._write()
+            logger.info(
+                "Profile written | path=%s | samples=%s | stacks=%s",
+                self.output_path, self.samples, len(self.stacks)
+            )
+        except Exception as e:
+            logger.error("Profiler failed: %s", e)
+        finally:
+            with _lock:
+                _active = None
+
+    def _sample(self):
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((os.path.basename(code.co_filename), code.co_name, code.co_firstlineno))
+                frame = frame.f_back
+
+            if not stack or (not self.include_idle and stack[0][:2] in IDLE_FRAMES):
+                continue
+
+            thread_name = re.sub(r'_\d+$', '', names.get(ident, str(ident)))
+            frames = [f'{name} ({filename}:{line})' for filename, name, line in reversed(stack)]
+            self.stacks[';'.join([thread_name] + frames)] += 1
+
+        self.samples += 1
+
+    def _write(self):
+        os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
+        tmp_path = f'{self.output_path}.tmp'
+        with open(tmp_path, 'w') as fh:
+            for stack, count in self.stacks.most_common():
+                fh.write(f'{stack} {count}\n')
+        os.replace(tmp_path, self.output_path)
+
+
+def output_path_for(pid):
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    return os.path.join(settings.PROFILE_DIR, f'profile-{pid}-{stamp}.folded')
+
+
+def start(seconds, interval, output_path=None, include_idle=False):
+    """
+    Starts profiling this process. Raises ProfilerBusy if a profile is
+    already running. Returns the path the output will be written to.
+    """
+    global _active
+    seconds = max(0.1, min(float(seconds), settings.PROFILE_MAX_SECONDS))
+    interval = max(0.001, float(interval))
+    output_path = output_path or output_path_for(os.getpid())
+
+    with _lock:
+        if _active is not None:
+            raise ProfilerBusy(f"Profiler already running, writing {_active.output_path}")
+        _active = SamplingProfiler(seconds, interval, output_path, include_idle)
+        _active.start()
+
+    logger.warning(
+        "Profiler started | pid=%s | seconds=%s | interval_ms=%s | path=%s",
+        os.getpid(), seconds, interval * 1000, output_path
+    )
+    return output_path
+
+
+def _request_path(pid):
+    return os.path.join(settings.PROFILE_DIR, f'request-{pid}.json')
+
+
+def request_profile(pid, seconds, interval, include_idle=False):
+    """
+    Profiles worker `pid`: this process directly, any other local worker
+    through a request file and SIGUSR2. Returns the output path. Raises
+    workers.UnknownWorker if `pid` has not installed the SIGUSR2 handler.
+    """
+    if pid == os.getpid():
+        return start(seconds, interval, include_idle=include_idle)
+    if not workers.is_registered(pid, 'SIGUSR2'):
+        raise workers.UnknownWorker(f"pid {pid} is not a worker started from config.asgi")
+
+    output_path = output_path_for(pid)
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    with open(_request_path(pid), 'w') as fh:
+        json.dump({
+            'seconds': seconds,
+            'interval': interval,
+            'include_idle': include_idle,
+            'output_path': output_path,
+        }, fh)
+    try:
+        workers.send(pid, signal.SIGUSR2)
+    except (OSError, workers.UnknownWorker):
+        os.remove(_request_path(pid))
+        raise
+    return output_path
+
+
+def _handle_signal(signum, frame):
+    # keep the handler trivial: file I/O and logging happen off the main thread
+    threading.Thread(target=_start_requested, name='profile-request', daemon=True).start()
+
+
+def _start_requested():
+    path = _request_path(os.getpid())
+    try:
+        with open(path) as fh:
+            options = json.load(fh)
+        os.remove(path)
+    except (OSError, ValueError):
+        options = {}
+
+    try:
+        start(
+            options.get('seconds', settings.PROFILE_DEFAULT_SECONDS),
+            options.get('interval', settings.PROFILE_INTERVAL),
+            options.get('output_path'),
+            options.get('include_idle', False),
+        )
+    except ProfilerBusy as e:
+        logger.warning("%s", e)
+
+
+def install_signal_handler():
+    """
+    Lets this process be profiled with SIGUSR2. Must be called from the
+    main thread, e.g. from the ASGI entry point.
+    """
+    if hasattr(signal, 'SIGUSR2') and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR2, _handle_signal)
+        workers.register('SIGUSR2')
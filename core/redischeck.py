@@ -0,0 +1,117 @@
+# core/redischeck.py
+
+"""
+Reachability and round-trip latency of every Redis endpoint the
+configuration points at: each channel layer shard, each cache server,
+and the replay / fan-out server. Run at worker startup (logged) and by
+the check_redis management command.
+"""
+
+import logging
+import re
+import statistics
+import time
+
+from django.conf import settings
+import redis
+from redis.sentinel import Sentinel
+
+logger = logging.getLogger(__name__)
+
+
+def redact(url):
+    return re.sub(r'://[^@/]*@', '://***@', url)
+
+
+def endpoints():
+    """
+    Returns [(role, target, client factory)], one per distinct endpoint and role.
+    """
+    timeouts = {
+        'socket_timeout': settings.REDIS_SOCKET_TIMEOUT,
+        'socket_connect_timeout': settings.REDIS_SOCKET_TIMEOUT,
+    }
+    found = []
+
+    layer = settings.CHANNEL_LAYERS.get('default', {})
+    if layer.get('BACKEND', '').startswith('channels_redis'):
+        for index, host in enumerate(layer.get('CONFIG', {}).get('hosts', [])):
+            if 'master_name' in host:
+                sentinel = Sentinel(host['sentinels'], **timeouts)
+                target = f"sentinel master {host['master_name']}"
+                found.append((f'channel_layer[{index}]', target,
+                              lambda sentinel=sentinel, name=host['master_name']: sentinel.master_for(name, **timeouts)))
+            else:
+                address = host['address'] if isinstance(host, dict) else f'redis://{host[0]}:{host[1]}'
+                found.append((f'channel_layer[{index}]', redact(address),
+                              lambda address=address: redis.Redis.from_url(address, **timeouts)))
+
+    cache = settings.CACHES.get('default', {})
+    if cache.get('BACKEND', '').endswith('RedisCache'):
+        locations = cache['LOCATION']
+        for index, location in enumerate([locations] if isinstance(locations, str) else locations):
+            role = 'cache' if index == 0 else f'cache replica[{index}]'
+            found.append((role, redact(location), lambda location=location: redis.Redis.from_url(location, **timeouts)))
+
+    if settings.CHAT_REPLAY_ENABLED or settings.CHAT_FANOUT == 'local':
+        url = settings.CHAT_REPLAY_REDIS_URL
+        found.append(('replay/fan-out', redact(url), lambda: redis.Redis.from_url(url, **timeouts)))
+
+    return found
+
+
+def measure(client_factory, samples=5):
+    """
+    Median PING round trip in milliseconds.
+    """
+    client = client_factory()
+    try:
+        client.ping()
+        timings = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            client.ping()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+    finally:
+        client.close()
+
+
+def report(samples=5):
+    results = []
+    for role, target, client_factory in endpoints():
+        try:
+            results.append({'role': role, 'target': target, 'ok': True,
+                            'latency_ms': measure(client_factory, samples), 'error': None})
+        except Exception as e:
+            results.append({'role': role, 'target': target, 'ok': False, 'latency_ms': None, 'error': str(e)})
+    return results
+
+
+def log_startup_report():
+    for result in report(samples=3):
+        if result['ok']:
+            logger.info(
+                "Redis reachable | role=%s | target=%s | ping_ms=%.2f",
+                result['role'], result['target'], result['latency_ms']
+            )
+        else:
+            logger.warning(
+                "Redis unreachable | role=%s | target=%s | error=%s",
+                result['role'], result['target'], result['error']
+            )
+
+
+def warn_unshared_cache():
+    """
+    Chat history is cached and invalidated through the cache; with a
+    per-process cache other workers keep serving stale history for up to
+    CHAT_HISTORY_CACHE_TIMEOUT seconds, and throttles count per worker.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if backend.endswith('LocMemCache') and settings.CHAT_HISTORY_CACHE_TIMEOUT > 0:
+        logger.warning(
+            "Cache is per-process; with several workers chat history goes stale and throttles "
+            "are per worker. Set REDIS_CACHE_URL or CHAT_HISTORY_CACHE_TIMEOUT=0 | history_timeout_s=%s",
+            settings.CHAT_HISTORY_CACHE_TIMEOUT
+        )
@@ -0,0 +1,40 @@
+# core/renderers.py
+
+import ujson
+from rest_framework.renderers import JSONRenderer
+
+
+class UJSONRenderer(JSONRenderer):
+    """
+    Drop-in JSONRenderer that encodes with ujson. Types ujson does not
+    know (datetimes, UUIDs, lazy strings, ...) go through DRF's
+    JSONEncoder.default, so output matches the stock renderer. Falls back
+    to the stock renderer for non-compact output, which ujson cannot
+    produce, and for anything ujson rejects.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+
+        if indent is None and not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = ujson.dumps(
+                data,
+                default=self.encoder_class().default,
+                indent=indent or 0,
+                ensure_ascii=self.ensure_ascii,
+                allow_nan=not self.strict,
+                escape_forward_slashes=False,
+                reject_bytes=False,
+            )
+        except (TypeError, OverflowError):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+        return ret.encode()
@@ -2,7 +2,9 @@
 
 from http import HTTPStatus
 from typing import Any, Dict, Optional, Union
+from django.http import HttpResponse
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
 
 def _build_body(
@@ -173,6 +175,21 @@ def server_error_response(
     )
 
 
+def service_unavailable_response(
+    message: str = "Service temporarily overloaded",
+    errors: Optional[Union[Dict, list]] = None,
+    request_id: Optional[str] = None
+) -> Response:
+
+    return error_response(
+        message=message,
+        errors=errors,
+        status=HTTPStatus.SERVICE_UNAVAILABLE,
+        code="SERVICE_UNAVAILABLE",
+        request_id=request_id
+    )
+
+
 def rate_limit_response(
     message: str = "Too many requests",
     errors: Optional[Union[Dict, list]] = None,
@@ -185,4 +202,22 @@ def rate_limit_response(
         status=HTTPStatus.TOO_MANY_REQUESTS,
         code="RATE_LIMIT_EXCEEDED",
         request_id=request_id
-    )
\ No newline at end of file
+    )
+
+
+def as_json_response(response: Response) -> HttpResponse:
+    """
+    Renders an envelope Response with the first configured DRF renderer
+    into a plain HttpResponse, for views that bypass DRF's response
+    machinery (the async views in core.async_api).
+    """
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    http_response = HttpResponse(
+        renderer.render(response.data),
+        status=response.status_code,
+        content_type=renderer.media_type,
+    )
+    for header, value in response.items():
+        if header.lower() != 'content-type':
+            http_response[header] = value
+    return http_response
@@ -0,0 +1,152 @@
+# core/sql.py
+
+"""
+Per-request / per-WebSocket-event SQL accounting.
+
+A database execute wrapper is installed on every connection as it is
+created. It reports to the QueryStats bound to the current context, so
+queries run from database_sync_to_async worker threads are attributed to
+the request or event that awaited them.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('sql_query_stats', default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryStats:
+
+    def __init__(self, label, request_id=None):
+        self.label = label
+        self.request_id = request_id
+        self.count = 0
+        self.duration = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def duration_ms(self):
+        return self.duration * 1000
+
+    def record(self, sql, duration):
+        with self._lock:
+            # BEGIN IMMEDIATE (SQLite profile) is transaction control, not a query
+            # of the view's; its lock wait still counts as DB time
+            if not sql.startswith('BEGIN'):
+                self.count += 1
+            self.duration += duration
+
+        if duration * 1000 >= settings.SQL_SLOW_QUERY_MS:
+            logger.warning(
+                "Slow query | %s | duration_ms=%.1f | sql=%s | request_id=%s",
+                self.label, duration * 1000, sql[:500], self.request_id,
+                extra={'request_id': self.request_id}
+            )
+
+    def check_budget(self, budget):
+        if budget is None or self.count <= budget:
+            return
+
+        message = f"Query budget exceeded | {self.label} | queries={self.count} | budget={budget}"
+        if settings.SQL_BUDGET_ENFORCE:
+            raise QueryBudgetExceeded(message)
+        logger.warning(
+            "%s | request_id=%s", message, self.request_id,
+            extra={'request_id': self.request_id}
+        )
+
+    def log(self):
+        logger.info(
+            "SQL stats | %s | queries=%s | db_ms=%.1f | request_id=%s",
+            self.label, self.count, self.duration_ms, self.request_id,
+            extra={'request_id': self.request_id}
+        )
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.record(sql, time.perf_counter() - started)
+
+
+def _install_wrapper(sender, connection, **kwargs):
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+connection_created.connect(_install_wrapper, dispatch_uid='core.sql.install_wrapper')
+for _connection in connections.all(initialized_only=True):
+    _install_wrapper(None, _connection)
+
+
+@contextmanager
+def track_queries(label, request_id=None, budget=None):
+    """
+    Counts queries run in this context (including in sync_to_async threads
+    started from it) and checks them against `budget` on exit.
+
+        with track_queries('ws:chat_message', request_id) as stats:
+            ...
+    """
+    stats = QueryStats(label, request_id)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+    stats.log()
+    stats.check_budget(budget)
+
+
+def start(label, request_id=None):
+    stats = QueryStats(label, request_id)
+    return stats, _current.set(stats)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def query_budget(max_queries):
+    """
+    Declares the maximum number of queries a view may run. Put it above
+    @api_view / @async_api_view, or on a class-based view.
+
+        @query_budget(3)
+        @api_view(['GET'])
+        def get_messages(request): ...
+
+    Exceeding it logs a warning, or raises QueryBudgetExceeded when
+    SQL_BUDGET_ENFORCE is on (as in tests).
+    """
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def budget_for(view_func):
+    budget = getattr(view_func, 'query_budget', None)
+    if budget is None:
+        view_class = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+        budget = getattr(view_class, 'query_budget', None)
+    return budget
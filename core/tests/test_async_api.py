@@ -0,0 +1,99 @@
+# core/tests/test_async_api.py
+
+"""
+async_api_view: cookie JWT authentication, DRF throttles and the JSON
+envelope, through the test client and the full middleware stack.
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import path
+from rest_framework.throttling import UserRateThrottle
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.async_api import async_api_view
+from core.responses import success_response
+
+User = get_user_model()
+
+
+class TwoPerMinuteThrottle(UserRateThrottle):
+    scope = 'async_api_test'
+    rate = '2/min'
+
+
+@async_api_view(['GET'], throttle_classes=[])
+async def whoami(request):
+    return success_response(message="ok", data={'username': request.user.username})
+
+
+@async_api_view(['GET'], throttle_classes=[TwoPerMinuteThrottle])
+async def throttled(request):
+    return success_response(message="ok")
+
+
+urlpatterns = [
+    path('whoami/', whoami),
+    path('throttled/', throttled),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncApiViewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='x')
+
+    def login(self, token=None):
+        self.client.cookies['__Host-access_token'] = token or str(AccessToken.for_user(self.user))
+
+    def test_authenticated_request_sees_user(self):
+        self.login()
+        response = self.client.get('/whoami/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data'], {'username': 'alice'})
+
+    def test_missing_cookie_is_unauthorized(self):
+        response = self.client.get('/whoami/')
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['code'], 'UNAUTHORIZED')
+
+    def test_invalid_token_is_unauthorized(self):
+        self.login('not-a-token')
+        response = self.client.get('/whoami/')
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['status'], 'error')
+
+    def test_inactive_user_is_unauthorized(self):
+        self.login()
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.client.get('/whoami/').status_code, 401)
+
+    def test_disallowed_method(self):
+        self.login()
+        response = self.client.post('/whoami/')
+
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response.json()['code'], 'METHOD_NOT_ALLOWED')
+
+    def test_throttle_limits_requests(self):
+        self.login()
+        statuses = [self.client.get('/throttled/').status_code for _ in range(3)]
+
+        self.assertEqual(statuses, [200, 200, 429])
+        body = self.client.get('/throttled/').json()
+        self.assertEqual(body['code'], 'RATE_LIMIT_EXCEEDED')
+        self.assertGreater(body['errors']['wait'], 0)
+
+    def test_unauthenticated_requests_are_not_throttled_as_the_user(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get('/throttled/').status_code, 401)
+        self.login()
+        self.assertEqual(self.client.get('/throttled/').status_code, 200)
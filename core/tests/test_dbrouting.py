@@ -0,0 +1,185 @@
+# core/tests/test_dbrouting.py
+
+"""
+ReplicaRouter decisions through the middleware and test client.
+config.test_settings adds a 'replica' alias that mirrors 'default' (TEST['MIRROR']).
+The tests share default's connection with it, so replica reads see the
+test transaction's rows, and look at which alias each read was routed to.
+"""
+
+from contextlib import contextmanager
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.urls import path
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework_simplejwt.tokens import AccessToken
+
+from chat.models import Message
+from core import dbrouting
+from core.dbrouting import ReplicaRouter, use_database
+from core.responses import success_response
+
+User = get_user_model()
+
+
+def read_messages(request):
+    # authenticates, as DRF does lazily on first access
+    request.user
+    list(Message.objects.all()[:1])
+    if 'write' in request.GET:
+        Message.objects.create(user=request.user, content='written')
+        list(Message.objects.all()[:1])
+    return success_response(message="ok")
+
+
+messages_view = api_view(['GET', 'POST'])(permission_classes([AllowAny])(read_messages))
+primary_view = use_database('primary')(api_view(['GET'])(permission_classes([AllowAny])(read_messages)))
+replica_post_view = use_database('replica')(api_view(['POST'])(permission_classes([AllowAny])(read_messages)))
+
+urlpatterns = [
+    path('messages/', messages_view),
+    path('primary/', primary_view),
+    path('replica-post/', replica_post_view),
+]
+
+
+@contextmanager
+def recorded_reads():
+    """
+    Yields a list of (model label, alias) for every routed read.
+    """
+    reads = []
+    db_for_read = ReplicaRouter.db_for_read
+
+    def recording(self, model, **hints):
+        database = db_for_read(self, model, **hints)
+        reads.append((model._meta.label, database))
+        return database
+
+    with mock.patch.object(ReplicaRouter, 'db_for_read', recording):
+        yield reads
+
+
+def message_reads(reads):
+    return [database for label, database in reads if label == Message._meta.label]
+
+
+@override_settings(ROOT_URLCONF=__name__, DB_REPLICA_MAX_LAG=2, DB_REPLICA_READ_YOUR_WRITES=10)
+class ReplicaRouterTests(TestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        # a second connection to the in-memory database would be locked out
+        # by the test transaction (TestCase opens one on mirrors too)
+        connections['replica'] = connections['default']
+        cls.addClassCleanup(connections.__delitem__, 'replica')
+        super().setUpClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='x')
+        self.other = User.objects.create_user(username='bob', email='bob@example.com', password='x')
+        Message.objects.create(user=self.user, content='hello')
+        # no probe thread; each test sets the lag it needs
+        self.health = mock.patch.multiple(dbrouting.health, thread=object(), lag=0.0)
+        self.health.start()
+        self.addCleanup(self.health.stop)
+
+    def login(self, user):
+        self.client.cookies['__Host-access_token'] = str(AccessToken.for_user(user))
+
+    def test_replica_alias_is_configured(self):
+        self.assertTrue(dbrouting.replica_configured())
+
+    def test_safe_methods_read_from_replica(self):
+        with recorded_reads() as reads:
+            self.client.get('/messages/')
+        self.assertEqual(message_reads(reads), ['replica'])
+
+    def test_unsafe_methods_read_from_primary(self):
+        with recorded_reads() as reads:
+            self.client.post('/messages/')
+        self.assertEqual(message_reads(reads), ['default'])
+
+    def test_no_request_reads_from_primary(self):
+        self.assertEqual(Message.objects.all().db, 'default')
+
+    def test_request_write_pins_later_reads_to_primary(self):
+        self.login(self.user)
+        with recorded_reads() as reads:
+            self.client.get('/messages/', {'write': 1})
+        self.assertEqual(message_reads(reads), ['replica', 'default'])
+
+    def test_read_your_writes_window(self):
+        self.login(self.user)
+        self.client.get('/messages/', {'write': 1})
+
+        with recorded_reads() as reads:
+            self.client.get('/messages/')
+        self.assertEqual(message_reads(reads), ['default'])
+
+        # other users are not affected
+        self.login(self.other)
+        with recorded_reads() as reads:
+            self.client.get('/messages/')
+        self.assertEqual(message_reads(reads), ['replica'])
+
+    def test_read_your_writes_window_expires(self):
+        dbrouting.record_write(self.user.id)
+        self.login(self.user)
+        with recorded_reads() as reads:
+            self.client.get('/messages/')
+        self.assertEqual(message_reads(reads), ['default'])
+
+        cache.delete(dbrouting._write_key(self.user.id))
+        with recorded_reads() as reads:
+            self.client.get('/messages/')
+        self.assertEqual(message_reads(reads), ['replica'])
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        dbrouting.health.lag = 5.0
+        with recorded_reads() as reads:
+            self.client.get('/messages/')
+        self.assertEqual(message_reads(reads), ['default'])
+
+    def test_unreachable_replica_falls_back_to_primary(self):
+        dbrouting.health.lag = None
+        with recorded_reads() as reads:
+            self.client.get('/messages/')
+        self.assertEqual(message_reads(reads), ['default'])
+
+    def test_use_database_primary(self):
+        with recorded_reads() as reads:
+            self.client.get('/primary/')
+        self.assertEqual(message_reads(reads), ['default'])
+
+    def test_use_database_replica_on_unsafe_method(self):
+        with recorded_reads() as reads:
+            self.client.post('/replica-post/')
+        self.assertEqual(message_reads(reads), ['replica'])
+
+    def test_use_database_rejects_unknown_alias(self):
+        with self.assertRaises(ValueError):
+            use_database('secondary')
+
+    def test_auth_user_reads_use_primary(self):
+        self.login(self.user)
+        with recorded_reads() as reads:
+            self.client.get('/messages/')
+        user_reads = [database for label, database in reads if label == User._meta.label]
+        self.assertTrue(user_reads)
+        self.assertEqual(set(user_reads), {'default'})
+        self.assertEqual(message_reads(reads), ['replica'])
+
+    def test_replica_reads_block(self):
+        with dbrouting.replica_reads(self.user.id):
+            self.assertEqual(Message.objects.all().db, 'replica')
+            dbrouting.record_write(self.user.id)
+        with dbrouting.replica_reads(self.user.id):
+            self.assertEqual(Message.objects.all().db, 'default')
@@ -0,0 +1,63 @@
+# core/tests/test_loopmonitor.py
+
+import asyncio
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from core.loopmonitor import LoopMonitor, executor_usage
+
+
+async def blocking_handler(started, release):
+    started.set()
+    # a sync call stuck on the event loop
+    release.wait(5)
+
+
+class LoopMonitorTests(SimpleTestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.addCleanup(self.stop_loop)
+
+    def stop_loop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+
+    def in_loop(self, func):
+        async def call():
+            return func()
+        return asyncio.run_coroutine_threadsafe(call(), self.loop).result(5)
+
+    def test_stall_reports_the_blocking_coroutine(self):
+        monitor = self.in_loop(lambda: LoopMonitor(self.loop, interval=0.01, threshold=0.05))
+        started, release = threading.Event(), threading.Event()
+        asyncio.run_coroutine_threadsafe(blocking_handler(started, release), self.loop)
+        self.assertTrue(started.wait(5))
+        monitor.last_tick = time.monotonic() - 1
+
+        try:
+            with self.assertLogs('core.loopmonitor', 'WARNING') as logs:
+                monitor.check_stall()
+        finally:
+            release.set()
+
+        self.assertIn('coro=blocking_handler', logs.output[0])
+        self.assertIn('release.wait(5)', logs.output[0])
+
+    def test_one_report_per_stall(self):
+        monitor = self.in_loop(lambda: LoopMonitor(self.loop, interval=0.01, threshold=0.05))
+        monitor.last_tick = time.monotonic() - 1
+        with self.assertLogs('core.loopmonitor', 'WARNING') as logs:
+            monitor.check_stall()
+            monitor.check_stall()
+        self.assertEqual(len(logs.output), 1)
+
+    def test_executor_usage_in_loop_thread(self):
+        usage = self.in_loop(lambda: executor_usage(self.loop))
+        self.assertEqual(set(usage), {'default', 'thread_sensitive'})
+        self.assertEqual(usage['default'], (0, 0))
@@ -0,0 +1,172 @@
+# core/tests/test_query_budgets.py
+
+"""
+Runs the budgeted HTTP endpoints and WebSocket events against a cold cache
+with SQL_BUDGET_ENFORCE on (config.test_settings), so a change that adds
+queries fails here. Database work happens in sync_to_async threads, hence
+TransactionTestCase.
+"""
+
+from contextlib import contextmanager
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+from django.urls import path
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from chat.consumers import ChatConsumer
+from chat.middleware import JWTAuthMiddleware
+from chat.models import Message
+from chat.routing import websocket_urlpatterns
+from core.responses import success_response
+from core.sql import QueryBudgetExceeded, QueryStats, query_budget
+
+User = get_user_model()
+
+
+@query_budget(1)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def over_budget_view(request):
+    list(User.objects.all())
+    list(Message.objects.all())
+    return success_response(message="ok")
+
+
+urlpatterns = [
+    path('over-budget/', over_budget_view),
+]
+
+
+@contextmanager
+def recorded_budgets():
+    """
+    Yields a list that collects (label, queries, budget) for every budget
+    check, while still enforcing it.
+    """
+    checks = []
+    check_budget = QueryStats.check_budget
+
+    def recording(self, budget):
+        checks.append((self.label, self.count, budget))
+        return check_budget(self, budget)
+
+    with mock.patch.object(QueryStats, 'check_budget', recording):
+        yield checks
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    # Redis-backed / off-thread paths are not part of the request's queries
+    CHAT_REPLAY_ENABLED=False,
+    CHAT_WRITE_QUEUE=False,
+    CHAT_ARCHIVE_READS_ENABLED=False,
+)
+class QueryBudgetTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='x')
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='x', role=User.Role.ADMIN
+        )
+        Message.objects.bulk_create(Message(user=self.user, content=f'hello {i}') for i in range(60))
+
+    def login(self, user):
+        self.client.cookies['__Host-access_token'] = str(AccessToken.for_user(user))
+
+    def assertWithinBudget(self, checks, label):
+        matching = [check for check in checks if check[0] == label]
+        self.assertTrue(matching, f"no budget check for {label}")
+        for _, count, budget in matching:
+            self.assertIsNotNone(budget, f"{label} has no budget")
+            self.assertLessEqual(count, budget, f"{label}: {count} queries, budget {budget}")
+
+    def test_http_endpoints_stay_within_budget(self):
+        self.login(self.user)
+        requests = [
+            ('get', '/api/chat/messages/', {'limit': 50}),
+            ('get', '/api/chat/messages/', {'limit': 50, 'before': Message.objects.order_by('-id')[10].id}),
+            ('get', '/api/chat/online-users/', {}),
+            ('get', '/api/chat/search/', {'q': 'hello'}),
+        ]
+        with recorded_budgets() as checks:
+            for method, url, params in requests:
+                response = getattr(self.client, method)(url, params)
+                self.assertEqual(response.status_code, 200, response.content)
+                self.assertWithinBudget(checks, f"{method.upper()} {url}")
+
+    def test_admin_delete_stays_within_budget(self):
+        self.login(self.admin)
+        with recorded_budgets() as checks:
+            response = self.client.delete('/api/chat/messages/delete-all/')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertWithinBudget(checks, 'DELETE /api/chat/messages/delete-all/')
+
+    def test_logout_stays_within_budget(self):
+        self.client.cookies['__Host-refresh_token'] = str(RefreshToken.for_user(self.user))
+        with recorded_budgets() as checks:
+            response = self.client.post('/api/auth/logout/')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertWithinBudget(checks, 'POST /api/auth/logout/')
+
+    def test_login_stays_within_budget(self):
+        with recorded_budgets() as checks:
+            response = self.client.post(
+                '/api/auth/login/', {'username': 'alice', 'password': 'x'}, content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertWithinBudget(checks, 'POST /api/auth/login/')
+
+    def test_register_stays_within_budget(self):
+        with recorded_budgets() as checks:
+            response = self.client.post(
+                '/api/auth/register/',
+                {'username': 'carol', 'email': 'carol@example.com', 'password': 'long enough'},
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertWithinBudget(checks, 'POST /api/auth/register/')
+
+    def test_budgets_are_enforced_in_tests(self):
+        self.assertTrue(settings.SQL_BUDGET_ENFORCE)
+
+    @override_settings(ROOT_URLCONF=__name__)
+    def test_over_budget_view_raises(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get('/over-budget/')
+
+    def test_websocket_events_stay_within_budget(self):
+        ChatConsumer.connected_users.clear()
+        token = str(AccessToken.for_user(self.user))
+        application = JWTAuthMiddleware(URLRouter(websocket_urlpatterns))
+
+        async def session():
+            communicator = WebsocketCommunicator(
+                application, '/ws/chat/?history=50',
+                headers=[(b'cookie', f'__Host-access_token={token}'.encode())],
+            )
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            await communicator.send_json_to({'message': 'budgeted'})
+            while True:
+                frame = await communicator.receive_json_from(timeout=5)
+                if frame.get('action') == 'new_message':
+                    break
+            self.assertEqual(frame['message'], 'budgeted')
+            await communicator.disconnect()
+
+        with recorded_budgets() as checks:
+            async_to_sync(session)()
+
+        self.assertWithinBudget(checks, 'ws:connect')
+        self.assertWithinBudget(checks, 'ws:chat_message')
+        self.assertTrue(Message.objects.filter(content='budgeted').exists())
@@ -0,0 +1,146 @@
+# core/tracing.py
+
+"""
+Minimal request-scoped tracing.
+
+A trace is identified by the request ID (X-Request-ID for HTTP, the
+handshake's request ID or a per-message ID for WebSocket events). Spans
+are kept in a ContextVar, so they nest across awaits and into
+sync_to_async threads. Finished spans are written as one JSON object per
+line through the 'core.tracing' logger, whose queued handler does the
+serialization and file I/O off the request thread.
+
+    with tracing.trace(request_id, 'ws.chat_message'):
+        with tracing.span('db.save_message'):
+            ...
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+import json
+import logging
+import os
+import time
+import uuid
+import zlib
+
+from django.conf import settings
+
+exporter = logging.getLogger(__name__)
+
+_current = ContextVar('trace_span', default=None)
+
+
+class Span:
+    """
+    Rendered lazily: the exporting handler calls str() on the listener
+    thread.
+    """
+    __slots__ = (
+        'trace_id', 'span_id', 'parent_id', 'name', 'attributes',
+        'start', '_started', 'duration_ms', 'status',
+    )
+
+    def __init__(self, trace_id, name, parent_id=None, attributes=None):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes or {}
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms = None
+        self.status = 'ok'
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self, error=None):
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+        if error is not None:
+            self.status = 'error'
+            self.attributes['error'] = type(error).__name__
+        exporter.info(self)
+
+    def __str__(self):
+        return json.dumps({
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start,
+            'duration_ms': round(self.duration_ms, 3),
+            'status': self.status,
+            'pid': os.getpid(),
+            'attributes': self.attributes,
+        }, default=str)
+
+
+def is_sampled(trace_id):
+    """
+    Same decision for the same trace ID in every process, so spans of one
+    message emitted by different consumers are kept or dropped together.
+    """
+    rate = settings.TRACE_SAMPLE_RATE
+    if rate >= 1.0:
+        return True
+    return zlib.crc32(str(trace_id).encode()) % 10000 < int(rate * 10000)
+
+
+def current_trace_id():
+    span = _current.get()
+    return span.trace_id if span is not None else None
+
+
+def start(trace_id, name, sampled=None, **attributes):
+    """
+    Opens a root span. Returns (span, token), or (None, None) when tracing
+    is off or the trace is not sampled. Close it with finish().
+    """
+    if not settings.TRACING_ENABLED or not trace_id:
+        return None, None
+    if not (sampled if sampled is not None else is_sampled(trace_id)):
+        return None, None
+
+    span = Span(trace_id, name, attributes=attributes)
+    return span, _current.set(span)
+
+
+def finish(span, token, error=None):
+    if span is None:
+        return
+    _current.reset(token)
+    span.finish(error)
+
+
+@contextmanager
+def trace(trace_id, name, sampled=None, **attributes):
+    span, token = start(trace_id, name, sampled, **attributes)
+    try:
+        yield span
+    except BaseException as e:
+        finish(span, token, e)
+        raise
+    finish(span, token)
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Child of the current span; a no-op outside a sampled trace.
+    """
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(parent.trace_id, name, parent_id=parent.span_id, attributes=attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        _current.reset(token)
+        child.finish(e)
+        raise
+    _current.reset(token)
+    child.finish()
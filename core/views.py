@@ -0,0 +1,95 @@
+# core/views.py
+
+import hmac
+import json
+import os
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import APIException
+
+from accounts.permissions import IsAdminUser
+from . import profiling, workers
+from .authentication import CookieJWTAuthentication
+from .metrics import export
+from .responses import (
+    _build_body,
+    conflict_response,
+    forbidden_response,
+    not_found_response,
+    success_response,
+    validation_error_response,
+)
+
+
+def _metrics_authorized(request):
+    token = settings.METRICS_TOKEN
+    header = request.headers.get('Authorization', '')
+    if token and header.startswith('Bearer '):
+        return hmac.compare_digest(header[len('Bearer '):], token)
+    
+    try:
+        result = CookieJWTAuthentication().authenticate(request)
+    except APIException:
+        return False
+    return bool(result) and result[0].is_admin
+
+
+@require_GET
+def metrics_view(request):
+    if not _metrics_authorized(request):
+        body = _build_body(
+            "error", "Metrics access denied",
+            code="FORBIDDEN", request_id=getattr(request, 'id', None)
+        )
+        return HttpResponse(json.dumps(body), status=403, content_type='application/json')
+    
+    return HttpResponse(export(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def profile_view(request):
+    """
+    Starts a time-limited sampling profile of this worker, or of another
+    worker on the same host when `pid` is given. The collapsed-stack
+    output lands in PROFILE_DIR on that host.
+    """
+    request_id = getattr(request, 'id', None)
+    
+    try:
+        pid = int(request.data.get('pid') or os.getpid())
+        seconds = float(request.data.get('seconds', settings.PROFILE_DEFAULT_SECONDS))
+        interval = float(request.data.get('interval_ms', settings.PROFILE_INTERVAL * 1000)) / 1000
+    except (TypeError, ValueError):
+        return validation_error_response(
+            message="Invalid profiling parameters",
+            errors={"detail": "pid, seconds and interval_ms must be numbers"},
+            request_id=request_id
+        )
+    
+    if seconds <= 0 or seconds > settings.PROFILE_MAX_SECONDS or interval <= 0:
+        return validation_error_response(
+            message="Invalid profiling parameters",
+            errors={"seconds": [f"Must be between 0 and {settings.PROFILE_MAX_SECONDS:g}"]},
+            request_id=request_id
+        )
+    
+    try:
+        output_path = profiling.request_profile(
+            pid, seconds, interval, include_idle=bool(request.data.get('include_idle'))
+        )
+    except profiling.ProfilerBusy as e:
+        return conflict_response(message=str(e), request_id=request_id)
+    except (workers.UnknownWorker, ProcessLookupError):
+        return not_found_response(message=f"No worker with pid {pid}", request_id=request_id)
+    except PermissionError:
+        return forbidden_response(message=f"Not allowed to signal pid {pid}", request_id=request_id)
+    
+    return success_response(
+        message="Profiler started",
+        data={'pid': pid, 'seconds': seconds, 'output': output_path},
+        request_id=request_id
+    )
@@ -0,0 +1,105 @@
+# core/workers.py
+
+"""
+Registry of the local worker processes that handle control signals.
+
+The default action of SIGUSR1 and SIGUSR2 is to terminate the process,
+so tools that signal another process (profile_worker, drain_worker,
+POST /api/profile/) only signal a pid that registered a handler for
+that signal. A worker records its handlers in
+WORKER_REGISTRY_DIR/worker-<pid>.json together with its start time,
+so a dead worker's file does not vouch for a process that reused its pid.
+"""
+
+import atexit
+import json
+import logging
+import os
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_signals = set()
+
+
+class UnknownWorker(LookupError):
+    pass
+
+
+def _path(pid):
+    return os.path.join(settings.WORKER_REGISTRY_DIR, f'worker-{pid}.json')
+
+
+def _start_time(pid):
+    """
+    Process start time in clock ticks since boot (Linux), or None.
+    """
+    try:
+        with open(f'/proc/{pid}/stat') as fh:
+            # the command name may contain spaces; fields after it are fixed
+            return int(fh.read().rsplit(')', 1)[1].split()[19])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def register(signal_name):
+    """
+    Records that this process handles `signal_name` (e.g. 'SIGUSR2').
+    """
+    first = not _signals
+    _signals.add(signal_name)
+
+    pid = os.getpid()
+    try:
+        os.makedirs(settings.WORKER_REGISTRY_DIR, exist_ok=True)
+        tmp_path = f'{_path(pid)}.tmp'
+        with open(tmp_path, 'w') as fh:
+            json.dump({'pid': pid, 'started': _start_time(pid), 'signals': sorted(_signals)}, fh)
+        os.replace(tmp_path, _path(pid))
+    except OSError as e:
+        logger.warning("Worker registration failed: %s", e)
+        return
+
+    if first:
+        atexit.register(unregister)
+
+
+def unregister():
+    try:
+        os.remove(_path(os.getpid()))
+    except OSError:
+        pass
+
+
+def is_registered(pid, signal_name):
+    try:
+        with open(_path(pid)) as fh:
+            record = json.load(fh)
+    except (OSError, ValueError):
+        return False
+
+    if signal_name not in record.get('signals', ()):
+        return False
+    started = _start_time(pid)
+    if started is not None or record.get('started') is not None:
+        return started == record.get('started')
+
+    # no /proc: fall back to a liveness check
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def send(pid, signum):
+    """
+    Sends `signum` to a registered worker. Raises UnknownWorker for any
+    other pid, or the OSError from os.kill.
+    """
+    if not is_registered(pid, signum.name):
+        raise UnknownWorker(f"pid {pid} is not a registered worker handling {signum.name}")
+    os.kill(pid, signum)
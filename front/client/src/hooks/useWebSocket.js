@@ -2,12 +2,14 @@
 
 import { useEffect, useRef, useState, useCallback } from 'react';
 
-const useWebSocket = (onMessage, onClearAll, onUserListUpdate) => {
+const useWebSocket = (onMessage, onClearAll, onUserListUpdate, onSnapshot, historyLimit = 50) => {
   const ws = useRef(null);
   const [isConnected, setIsConnected] = useState(false);
   const reconnectTimeout = useRef(null);
   const reconnectAttempts = useRef(0);
   const shouldReconnect = useRef(true);
+  const lastMessageId = useRef(null);
+  const reconnectAfter = useRef(null);
 
   const connect = useCallback(() => {
     if (!shouldReconnect.current) return;
@@ -18,7 +20,10 @@ const useWebSocket = (onMessage, onClearAll, onUserListUpdate) => {
 
     const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
     const host = import.meta.env.DEV ? 'localhost:8000' : window.location.host;
-    const wsUrl = `${protocol}//${host}/ws/chat/`;
+    const query = lastMessageId.current
+      ? `?last_message_id=${lastMessageId.current}`
+      : `?history=${historyLimit}`;
+    const wsUrl = `${protocol}//${host}/ws/chat/${query}`;
 
     ws.current = new WebSocket(wsUrl);
 
@@ -30,18 +35,46 @@ const useWebSocket = (onMessage, onClearAll, onUserListUpdate) => {
     ws.current.onmessage = (event) => {
       const data = JSON.parse(event.data);
       
-      if (data.action === 'clear_all') {
+      if (data.action === 'ping') {
+        ws.current?.send(JSON.stringify({ action: 'pong' }));
+      } else if (data.action === 'reconnect') {
+        reconnectAfter.current = data.after_ms;
+      } else if (data.action === 'clear_all') {
+        lastMessageId.current = null;
         onClearAll();
       } else if (data.action === 'new_message') {
+        lastMessageId.current = Math.max(lastMessageId.current || 0, data.message_id);
         onMessage(data);
+      } else if (data.action === 'replay') {
+        data.messages.forEach((msg) => {
+          lastMessageId.current = Math.max(lastMessageId.current || 0, msg.message_id);
+          onMessage(msg);
+        });
+      } else if (data.action === 'snapshot') {
+        if (data.messages.length) {
+          lastMessageId.current = data.messages[data.messages.length - 1].id;
+        }
+        onSnapshot?.(data.messages, data.users);
       } else if (data.action === 'user_list_update') {
         onUserListUpdate(data.users);
       }
     };
 
-    ws.current.onclose = () => {
+    ws.current.onclose = (event) => {
       setIsConnected(false);
       
+      // 4429: this user already has too many chat tabs open
+      if (event.code === 4429) return;
+      
+      // 1012: the server is restarting and picked a jittered delay for us
+      if (event.code === 1012 && shouldReconnect.current) {
+        const delay = reconnectAfter.current ?? Math.random() * 5000;
+        reconnectAfter.current = null;
+        reconnectAttempts.current = 0;
+        reconnectTimeout.current = setTimeout(connect, delay);
+        return;
+      }
+      
       if (shouldReconnect.current && reconnectAttempts.current < 5) {
         const delay = Math.min(1000 * Math.pow(2, reconnectAttempts.current), 30000);
         reconnectTimeout.current = setTimeout(() => {
@@ -54,7 +87,7 @@ const useWebSocket = (onMessage, onClearAll, onUserListUpdate) => {
     ws.current.onerror = () => {
       ws.current?.close();
     };
-  }, [onMessage, onClearAll, onUserListUpdate]);
+  }, [onMessage, onClearAll, onUserListUpdate, onSnapshot, historyLimit]);
 
   const disconnect = useCallback(() => {
     shouldReconnect.current = false;
@@ -13,7 +13,9 @@ function Chat() {
   const { user } = useAuth();
 
   const handleNewMessage = (data) => {
-    setMessages(prev => [...prev, data]);
+    setMessages(prev => (
+      prev.some(msg => (msg.message_id || msg.id) === data.message_id) ? prev : [...prev, data]
+    ));
   };
 
   const handleClearAll = () => {
@@ -22,21 +24,33 @@ function Chat() {
 
   const handleUserListUpdate = () => {};
 
-  const { isConnected, sendMessage } = useWebSocket(handleNewMessage, handleClearAll, handleUserListUpdate);
+  const snapshotReceived = useRef(false);
+
+  const handleSnapshot = (snapshotMessages) => {
+    snapshotReceived.current = true;
+    setMessages(snapshotMessages);
+    setLoading(false);
+  };
+
+  const { isConnected, sendMessage } = useWebSocket(
+    handleNewMessage, handleClearAll, handleUserListUpdate, handleSnapshot, 50
+  );
 
   useEffect(() => {
-    const loadMessages = async () => {
+    // The socket pushes history as its first frame; fall back to REST if it does not arrive.
+    const fallback = setTimeout(async () => {
+      if (snapshotReceived.current) return;
       try {
         const data = await chatService.getMessages(50);
-        setMessages(data);
+        if (!snapshotReceived.current) setMessages(data);
       } catch (error) {
         console.error('Failed to load messages:', error);
       } finally {
         setLoading(false);
       }
-    };
+    }, 3000);
 
-    loadMessages();
+    return () => clearTimeout(fallback);
   }, []);
 
   useEffect(() => {